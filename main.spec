@@ -2,7 +2,7 @@
 
 
 a = Analysis(
-    ['src\\modules\\main.py','src\\modules\\functions.py','src\\modules\\ui_logic.py','src\\modules\\main_view.py','src\\modules\\log_view.py','src\\modules\\clicking_functions.py','src\\modules\\process_view.py'],
+    ['src\\modules\\main.py','src\\modules\\functions.py','src\\modules\\ui_logic.py','src\\modules\\main_view.py','src\\modules\\log_view.py','src\\modules\\clicking_functions.py','src\\modules\\process_view.py','src\\modules\\capture.py','src\\modules\\adb_session.py','src\\modules\\adb_client.py','src\\modules\\template_cache.py','src\\modules\\template_matching.py','src\\modules\\feature_matching.py','src\\modules\\polling.py','src\\modules\\pixel_probe.py','src\\modules\\mouse.py'],
     pathex=[],
     binaries=[],
     datas=[('ADB', 'ADB')],
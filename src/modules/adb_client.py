@@ -0,0 +1,269 @@
+import asyncio
+import os
+import socket
+import subprocess
+import threading
+
+# Windows 上避免呼叫 adb 時跳出主控台視窗
+_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+ADB_HOST = '127.0.0.1'
+ADB_PORT = 5037
+# 長時間使用的串流（常駐 shell、screenrecord）每次讀取的逾時(秒)，超過時視為連線中斷
+STREAM_TIMEOUT = 30.0
+
+def _default_port():
+    # 與 adb 執行檔相同，可用 ANDROID_ADB_SERVER_PORT 指定 server 埠號
+    return int(os.environ.get('ANDROID_ADB_SERVER_PORT', ADB_PORT))
+
+class ADBError(Exception):
+    """ADB server 回應 FAIL 或連線異常"""
+
+def _encode_request(request):
+    """ADB 請求格式：4 位十六進位長度 + 內容"""
+    payload = request.encode('utf-8')
+    return f"{len(payload):04x}".encode('ascii') + payload
+
+def _transport_request(serial):
+    return f"host:transport:{serial}" if serial else "host:transport-any"
+
+def _parse_devices(text):
+    """解析 host:devices 的回應，返回 [(序號, 狀態), ...]"""
+    devices = []
+    for line in text.splitlines():
+        parts = line.split('\t')
+        if len(parts) >= 2:
+            devices.append((parts[0], parts[1].strip()))
+    return devices
+
+class ADBStream:
+    """已連上設備服務（shell:、exec:）的 socket，提供類似檔案的讀寫介面"""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._file = sock.makefile('rwb')
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def read1(self, size=-1):
+        return self._file.read1(size)
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+    def readline(self):
+        return self._file.readline()
+
+    def write(self, data):
+        self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def settimeout(self, timeout):
+        """變更之後每次讀寫的逾時(秒)"""
+        self._sock.settimeout(timeout)
+
+    def close(self):
+        # 先 shutdown 讓其他執行緒中阻塞的讀取立即返回
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class ADBClient:
+    """
+    直接以 socket 和本機 ADB server (預設 127.0.0.1:5037) 溝通的客戶端，
+    不需要每次操作都啟動 adb 執行檔。
+
+    支援 host:devices、host:connect、host:transport 以及設備上的 shell: 與 exec: 服務。
+    需要長時間使用同一條連線時（例如常駐 shell），使用 open_stream() 取得的串流。
+    """
+
+    def __init__(self, host=ADB_HOST, port=None, timeout=10):
+        self.host = host
+        self.port = port or _default_port()
+        self.timeout = timeout
+        self._server_started = False
+
+    def _connect(self, timeout=None):
+        try:
+            return socket.create_connection((self.host, self.port), timeout or self.timeout)
+        except ConnectionRefusedError:
+            # ADB server 尚未啟動時只嘗試啟動一次
+            if self._server_started:
+                raise
+            self.start_server()
+            return socket.create_connection((self.host, self.port), timeout or self.timeout)
+
+    def start_server(self):
+        """啟動 ADB server（server 未運行時無法用 socket 溝通，只能呼叫執行檔）"""
+        self._server_started = True
+        subprocess.run(['adb', 'start-server'], capture_output=True, creationflags=_NO_WINDOW)
+
+    @staticmethod
+    def _recv_exactly(sock, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ADBError("ADB server 中斷連線")
+            data += chunk
+        return bytes(data)
+
+    def _read_length_prefixed(self, sock):
+        length = int(self._recv_exactly(sock, 4), 16)
+        return self._recv_exactly(sock, length).decode('utf-8', errors='replace')
+
+    def _request(self, sock, request):
+        """送出請求並確認回應為 OKAY"""
+        sock.sendall(_encode_request(request))
+        status = self._recv_exactly(sock, 4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            raise ADBError(self._read_length_prefixed(sock))
+        raise ADBError(f"未知的 ADB 回應: {status!r}")
+
+    def host_query(self, request, timeout=None):
+        """執行 host: 服務並返回長度前綴的回應內容"""
+        with self._connect(timeout) as sock:
+            self._request(sock, request)
+            return self._read_length_prefixed(sock)
+
+    def version(self):
+        return int(self.host_query('host:version'), 16)
+
+    def devices(self):
+        """返回 [(序號, 狀態), ...]，狀態為 device 表示可用"""
+        return _parse_devices(self.host_query('host:devices'))
+
+    def connect(self, address, timeout=None):
+        """連線到網路 ADB 設備，返回 ADB server 的訊息"""
+        return self.host_query(f'host:connect:{address}', timeout)
+
+    def disconnect(self, address):
+        return self.host_query(f'host:disconnect:{address}')
+
+    def kill_server(self):
+        try:
+            with self._connect() as sock:
+                sock.sendall(_encode_request('host:kill'))
+        except OSError:
+            pass
+        self._server_started = False
+
+    def open_stream(self, serial, service, timeout=STREAM_TIMEOUT):
+        """
+        切換到設備並開啟服務
+
+        Args:
+            serial (str): 設備序號，None 表示唯一連線的設備
+            service (str): 例如 'shell:ls'、'exec:screencap'
+            timeout (float): 開啟後每次讀寫的 socket 逾時(秒)，None 表示阻塞讀取；
+                開啟時的連線與請求使用 self.timeout
+
+        Returns:
+            ADBStream: 可讀寫的串流
+        """
+        sock = self._connect()
+        try:
+            self._request(sock, _transport_request(serial))
+            self._request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        sock.settimeout(timeout)
+        return ADBStream(sock)
+
+    def exec_out(self, serial, command):
+        """以 exec: 執行指令並返回未經轉換的二進位輸出"""
+        with self.open_stream(serial, f'exec:{command}', self.timeout) as stream:
+            return stream.read()
+
+    def shell(self, serial, command):
+        """以 shell: 執行指令並返回文字輸出"""
+        with self.open_stream(serial, f'shell:{command}', self.timeout) as stream:
+            return stream.read().decode('utf-8', errors='replace')
+
+class AsyncADBClient:
+    """ADBClient 的 asyncio 版本，適合同時操作多台設備"""
+
+    def __init__(self, host=ADB_HOST, port=None, timeout=10):
+        self.host = host
+        self.port = port or _default_port()
+        self.timeout = timeout
+
+    async def _request(self, reader, writer, request):
+        writer.write(_encode_request(request))
+        await writer.drain()
+        status = await reader.readexactly(4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            length = int(await reader.readexactly(4), 16)
+            raise ADBError((await reader.readexactly(length)).decode('utf-8', errors='replace'))
+        raise ADBError(f"未知的 ADB 回應: {status!r}")
+
+    async def host_query(self, request):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            await self._request(reader, writer, request)
+            length = int(await reader.readexactly(4), 16)
+            return (await reader.readexactly(length)).decode('utf-8', errors='replace')
+        finally:
+            writer.close()
+
+    async def devices(self):
+        return _parse_devices(await self.host_query('host:devices'))
+
+    async def connect(self, address):
+        return await self.host_query(f'host:connect:{address}')
+
+    async def open_stream(self, serial, service):
+        """返回 (StreamReader, StreamWriter)，使用完畢需自行關閉 writer；連線與請求超過 self.timeout 時拋出 TimeoutError"""
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            await asyncio.wait_for(self._request(reader, writer, _transport_request(serial)), self.timeout)
+            await asyncio.wait_for(self._request(reader, writer, service), self.timeout)
+        except Exception:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def exec_out(self, serial, command):
+        reader, writer = await self.open_stream(serial, f'exec:{command}')
+        try:
+            return await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+
+    async def shell(self, serial, command):
+        reader, writer = await self.open_stream(serial, f'shell:{command}')
+        try:
+            return (await asyncio.wait_for(reader.read(), self.timeout)).decode('utf-8', errors='replace')
+        finally:
+            writer.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """取得共用的 ADBClient"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ADBClient()
+        return _default_client
@@ -0,0 +1,234 @@
+import threading
+import uuid
+from adb_client import get_client, STREAM_TIMEOUT
+from capture import decode_raw_screencap
+
+_sessions = {}  # 每個設備共用一個 shell 連線
+_sessions_lock = threading.Lock()
+
+# 每個 input tap 在設備上執行所需的時間上限(秒)，用來估計多次點擊的讀取逾時
+TAP_SECONDS = 1.0
+
+class ADBShellSession:
+    """
+    每個設備維持一條常駐的 shell 連線（ADB server 上的 `exec:sh` 串流）。
+
+    指令寫入 shell 的 stdin，並在每個指令後面加上 echo 分隔標記，
+    讀到標記即代表該指令結束並取得其結束碼。shell 中斷時會自動重新啟動。
+    """
+
+    def __init__(self, device_id=None):
+        """
+        Args:
+            device_id (str): ADB 設備 ID，None 表示使用預設設備
+        """
+        self.device_id = device_id
+        self._stream = None
+        self._lock = threading.Lock()
+        self._sdk_version = None
+        self._capture_buffer = None
+
+    def _start(self):
+        # exec: 不配置 pty，輸出才能是未經轉換的二進位資料
+        self._stream = get_client().open_stream(self.device_id, 'exec:sh')
+
+    def _ensure_started(self):
+        if self._stream is None:
+            self._start()
+
+    def _drop(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.close()
+
+    def close(self):
+        """結束 shell 連線"""
+        with self._lock:
+            if self._stream is not None:
+                try:
+                    self._write('exit\n')
+                except OSError:
+                    pass
+            self._drop()
+
+    def is_alive(self):
+        return self._stream is not None
+
+    def _write(self, script):
+        self._stream.write(script.encode('utf-8'))
+        self._stream.flush()
+
+    def _read_until_marker(self, marker):
+        """讀取輸出直到分隔標記，返回 (結束碼, 輸出文字)"""
+        lines = []
+        while True:
+            line = self._stream.readline()
+            if not line:
+                raise ConnectionError("adb shell 已中斷")
+            text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+            if text.startswith(marker):
+                return int(text[len(marker):].strip() or -1), '\n'.join(lines)
+            lines.append(text)
+
+    def _execute(self, send, receive, timeout=None):
+        """
+        執行一次操作：寫入指令後讀取結果
+
+        啟動 shell 或寫入失敗時指令尚未送出，重新啟動並重試一次；
+        指令送出後的錯誤（例如讀取逾時）直接拋出，避免設備重複執行同一個指令（例如重複點擊）。
+
+        Args:
+            send (function): 寫入指令
+            receive (function): 讀取結果並返回
+            timeout (float): 這次讀取的逾時(秒)，None 表示使用串流的預設值
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    self._ensure_started()
+                    send()
+                    break
+                except (OSError, ConnectionError, ValueError):
+                    self._drop()
+                    if attempt == 1:
+                        raise
+            stream = self._stream
+            try:
+                if timeout is not None:
+                    stream.settimeout(timeout)
+                result = receive()
+                if timeout is not None:
+                    stream.settimeout(STREAM_TIMEOUT)
+                return result
+            except (OSError, ConnectionError, ValueError):
+                # 輸出可能只讀到一半，之後的讀取無法對齊，重新啟動 shell
+                self._drop()
+                raise
+
+    def run(self, command, timeout=None):
+        """
+        在常駐 shell 中執行指令
+
+        Args:
+            command (str): shell 指令，可用 ; 串接多個指令
+            timeout (float): 等待指令結束的逾時(秒)，None 表示使用串流的預設值
+
+        Returns:
+            tuple: (結束碼, 輸出文字)
+        """
+        marker = f"__AUTOGAME_{uuid.uuid4().hex}__"
+        return self._execute(
+            lambda: self._write(f"{command} 2>&1\necho {marker}$?\n"),
+            lambda: self._read_until_marker(marker),
+            timeout,
+        )
+
+    def tap(self, x, y):
+        """在指定座標點擊，成功時返回 True"""
+        return self.tap_many([(x, y)])
+
+    def tap_many(self, points, interval=0):
+        """
+        一次寫入多個點擊指令
+
+        讀取逾時包含所有點擊之間的間隔，點擊已送出後不會因逾時而重送。
+
+        Args:
+            points (list): [(x, y), ...] 座標列表
+            interval (float): 每次點擊之間的間隔(秒)
+
+        Returns:
+            bool: 所有點擊是否成功
+        """
+        if not points:
+            return True
+        commands = [f"input tap {int(x)} {int(y)}" for x, y in points]
+        separator = f" && sleep {interval} && " if interval > 0 else " && "
+        timeout = STREAM_TIMEOUT + len(points) * TAP_SECONDS + (len(points) - 1) * interval
+        exit_code, output = self.run(separator.join(commands), timeout)
+        if exit_code != 0:
+            print(f"ADB 點擊失敗: {output}")
+        return exit_code == 0
+
+    @property
+    def sdk_version(self):
+        """設備的 Android SDK 版本，用來判斷 screencap 標頭長度"""
+        if self._sdk_version is None:
+            _, output = self.run('getprop ro.build.version.sdk')
+            self._sdk_version = int(output.strip() or 0)
+        return self._sdk_version
+
+    def screencap(self, out=None):
+        """
+        透過常駐 shell 讀取 screencap 的原始 framebuffer
+
+        Args:
+            out (numpy.ndarray): 可重複使用的 BGR 輸出陣列
+
+        Returns:
+            numpy.ndarray: OpenCV 格式的圖片
+        """
+        header_size = 16 if self.sdk_version >= 28 else 12
+        marker = f"__AUTOGAME_{uuid.uuid4().hex}__"
+
+        def receive():
+            stream = self._stream
+            header = stream.read(header_size)
+            if len(header) != header_size:
+                raise ConnectionError("adb shell 已中斷")
+            width = int.from_bytes(header[0:4], 'little')
+            height = int.from_bytes(header[4:8], 'little')
+            total = header_size + width * height * 4
+            if self._capture_buffer is None or len(self._capture_buffer) != total:
+                self._capture_buffer = bytearray(total)
+            view = memoryview(self._capture_buffer)
+            view[:header_size] = header
+            received = header_size
+            while received < total:
+                count = stream.readinto(view[received:])
+                if not count:
+                    raise ConnectionError("adb shell 已中斷")
+                received += count
+            self._read_until_marker(marker)
+            return decode_raw_screencap(self._capture_buffer, out)
+        return self._execute(lambda: self._write(f"screencap\necho {marker}$?\n"), receive)
+
+class ADBShellCaptureSource:
+    """使用常駐 shell 截圖的 ADB 截圖來源，不需要每次重新建立連線"""
+
+    def __init__(self, device_id=None):
+        self.device_id = device_id
+        self._bgr_buffer = None
+
+    def open(self):
+        return self
+
+    def close(self):
+        self._bgr_buffer = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def grab(self):
+        self._bgr_buffer = get_shell_session(self.device_id).screencap(self._bgr_buffer)
+        return self._bgr_buffer
+
+def get_shell_session(device_id=None):
+    """取得指定設備共用的 shell 連線，不存在時建立"""
+    with _sessions_lock:
+        session = _sessions.get(device_id)
+        if session is None:
+            session = ADBShellSession(device_id)
+            _sessions[device_id] = session
+        return session
+
+def close_all_sessions():
+    """關閉所有常駐 shell 連線"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
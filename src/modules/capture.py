@@ -0,0 +1,890 @@
+import os
+import socket
+import struct
+import threading
+import time
+import weakref
+import cv2
+import numpy as np
+import mss
+from adb_client import get_client
+
+# screencap 原始輸出的像素格式 (android PixelFormat)
+_RAW_PIXEL_FORMATS = {
+    1: cv2.COLOR_RGBA2BGR,  # RGBA_8888
+    2: cv2.COLOR_RGBA2BGR,  # RGBX_8888
+    5: cv2.COLOR_BGRA2BGR,  # BGRA_8888
+}
+
+def clip_region(region, width, height):
+    """
+    將搜尋範圍限制在畫面內
+
+    Args:
+        region: [x, y, 寬, 高]，相對於完整畫面的左上角，None 表示整個畫面
+        width, height (int): 完整畫面的大小
+
+    Returns:
+        tuple or None: 修正後的 (x, y, 寬, 高)，範圍與畫面沒有交集時返回 None
+    """
+    if region is None:
+        return (0, 0, width, height)
+    x, y, w, h = (int(v) for v in region)
+    left, top = max(0, x), max(0, y)
+    right, bottom = min(width, x + w), min(height, y + h)
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right - left, bottom - top)
+
+
+def crop_region(image, region):
+    """
+    從完整畫面裁出搜尋範圍（NumPy 視圖，不複製）
+
+    Returns:
+        tuple: (裁切後的圖片, (x, y) 範圍左上角在完整畫面中的座標)
+    """
+    height, width = image.shape[:2]
+    clipped = clip_region(region, width, height)
+    if clipped is None:
+        raise ValueError(f"搜尋範圍 {region} 超出畫面 {width}x{height}")
+    x, y, w, h = clipped
+    return image[y:y + h, x:x + w], (x, y)
+
+
+def decode_raw_screencap(data, out=None):
+    """
+    解析 `screencap`（不加 -p）輸出的原始 framebuffer
+
+    標頭為 width、height、format 三個 uint32，Android 9 以後多一個 colorspace，
+    因此由總長度推算標頭大小。
+
+    Args:
+        data (bytes): screencap 的原始輸出
+        out (numpy.ndarray): 可重複使用的 BGR 輸出陣列
+
+    Returns:
+        numpy.ndarray: OpenCV 格式的圖片
+    """
+    width, height, pixel_format = struct.unpack_from('<III', data, 0)
+    pixel_bytes = width * height * 4
+    header_size = len(data) - pixel_bytes
+    if header_size not in (12, 16):
+        raise ValueError(f"screencap 資料長度不符: {len(data)} ({width}x{height})")
+    if pixel_format not in _RAW_PIXEL_FORMATS:
+        raise ValueError(f"不支援的像素格式: {pixel_format}")
+
+    pixels = np.frombuffer(data, dtype=np.uint8, count=pixel_bytes, offset=header_size)
+    pixels = pixels.reshape(height, width, 4)
+    if out is None or out.shape[:2] != (height, width):
+        out = np.empty((height, width, 3), dtype=np.uint8)
+    cv2.cvtColor(pixels, _RAW_PIXEL_FORMATS[pixel_format], dst=out)
+    return out
+
+
+class MSSCaptureSource:
+    """
+    Windows 模式的截圖來源，整個流程只開啟一次 mss。
+
+    每次截圖都直接把 mss 的 BGRA 原始資料包成 NumPy 視圖（不複製），
+    再把 BGR 轉換寫入預先配置好的輸出陣列，避免每次輪詢都重新配置記憶體。
+
+    注意：grab() 回傳的陣列會在下一次 grab() 時被覆寫，
+    如需保留請自行 copy()。
+    """
+
+    supports_region = True  # grab() 可以只擷取部分範圍
+
+    def __init__(self, monitor_index=0):
+        """
+        Args:
+            monitor_index (int): mss 的螢幕編號，0 表示所有螢幕
+        """
+        self.monitor_index = monitor_index
+        self._sct = None
+        self._sct_thread = None  # 開啟 mss 的執行緒
+        self._bgr_buffer = None  # 預先配置的 BGR 輸出緩衝區
+
+    def open(self):
+        """
+        開啟 mss，重複呼叫不會重新開啟
+
+        mss 在 Windows 上的資源與建立它的執行緒綁定，
+        因此換到其他執行緒（例如 FrameProducer）擷取時會在該執行緒重新開啟。
+        """
+        current = threading.get_ident()
+        if self._sct is not None and self._sct_thread != current:
+            self._sct.close()
+            self._sct = None
+        if self._sct is None:
+            self._sct = mss.mss()
+            self._sct_thread = current
+        return self
+
+    def close(self):
+        """關閉 mss 並釋放緩衝區"""
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+        self._bgr_buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def monitor(self):
+        """目前擷取的螢幕範圍"""
+        self.open()
+        return self._sct.monitors[self.monitor_index]
+
+    def region_rect(self, region):
+        """
+        將相對於螢幕畫面的搜尋範圍轉為 mss 的擷取範圍
+
+        Returns:
+            tuple: (mss 擷取範圍 dict, (x, y) 範圍在畫面中的左上角)
+        """
+        monitor = self.monitor
+        clipped = clip_region(region, monitor['width'], monitor['height'])
+        if clipped is None:
+            raise ValueError(f"搜尋範圍 {region} 超出螢幕 {monitor['width']}x{monitor['height']}")
+        x, y, w, h = clipped
+        rect = {'left': monitor['left'] + x, 'top': monitor['top'] + y, 'width': w, 'height': h}
+        return rect, (x, y)
+
+    def grab_bgra(self, region=None):
+        """
+        擷取螢幕並回傳 BGRA 的零複製視圖
+
+        Args:
+            region: [x, y, 寬, 高] 只擷取這個範圍，None 表示整個螢幕
+
+        Returns:
+            numpy.ndarray: 形狀為 (高, 寬, 4) 的 uint8 陣列
+        """
+        self.open()
+        rect = self.monitor if region is None else self.region_rect(region)[0]
+        shot = self._sct.grab(rect)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def grab(self, region=None):
+        """
+        擷取螢幕並轉為 BGR，結果寫入重複使用的緩衝區
+
+        Args:
+            region: [x, y, 寬, 高] 只擷取這個範圍，None 表示整個螢幕
+
+        Returns:
+            numpy.ndarray: OpenCV 格式的圖片
+        """
+        bgra = self.grab_bgra(region)
+        height, width = bgra.shape[:2]
+        if self._bgr_buffer is None or self._bgr_buffer.shape[:2] != (height, width):
+            self._bgr_buffer = np.empty((height, width, 3), dtype=np.uint8)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._bgr_buffer)
+        return self._bgr_buffer
+
+
+class ADBScreencapSource:
+    """
+    ADB 模式的截圖來源，透過 ADB server 的 `exec:screencap` 直接把畫面讀進記憶體。
+
+    手機與電腦上都不會產生暫存檔。raw 模式讀取未壓縮的 RGBA framebuffer，
+    兩端都不需要 PNG 編解碼；png 模式則在記憶體中解碼 `screencap -p` 的輸出。
+    """
+
+    def __init__(self, device_id=None, raw=True):
+        """
+        Args:
+            device_id (str): ADB 設備 ID，None 表示使用預設設備
+            raw (bool): 是否使用未壓縮的原始格式
+        """
+        self.device_id = device_id
+        self.raw = raw
+        self._bgr_buffer = None
+
+    def open(self):
+        return self
+
+    def close(self):
+        self._bgr_buffer = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_screencap(self):
+        """執行 screencap 並回傳 stdout 的原始位元組"""
+        command = 'screencap' if self.raw else 'screencap -p'
+        return get_client().exec_out(self.device_id, command)
+
+    def grab(self):
+        """
+        擷取設備畫面
+
+        Returns:
+            numpy.ndarray: OpenCV 格式的圖片（raw 模式下會重複使用同一個緩衝區）
+        """
+        data = self.read_screencap()
+        if self.raw:
+            self._bgr_buffer = decode_raw_screencap(data, self._bgr_buffer)
+            return self._bgr_buffer
+
+        screenshot = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if screenshot is None:
+            raise ValueError("無法解碼 screencap 的 PNG 資料")
+        return screenshot
+
+
+class ADBStreamCaptureSource:
+    """
+    ADB 模式的連續影像來源，以 `screenrecord --output-format=h264` 串流取代逐張截圖。
+
+    每個設備只維持一條 `exec:screenrecord` 串流，背景執行緒透過本機 TCP
+    轉送給 OpenCV 的 FFmpeg 後端持續解碼，grab() 永遠回傳最新解碼完成的畫面。
+    screenrecord 有時間上限，串流結束後會自動重新開啟。
+
+    stream_opener 可替換資料來源（例如事先錄好的 .h264 檔），方便在沒有設備時測試。
+    """
+
+    def __init__(self, device_id=None, bit_rate=8000000, stream_opener=None, frame_timeout=5.0):
+        """
+        Args:
+            device_id (str): ADB 設備 ID，None 表示使用預設設備
+            bit_rate (int): screenrecord 的位元率
+            stream_opener (callable): 回傳可讀取的二進位串流，預設為開啟設備上的 screenrecord
+            frame_timeout (float): 等待第一張畫面的最長時間(秒)
+        """
+        self.device_id = device_id
+        self.bit_rate = bit_rate
+        self.stream_opener = stream_opener or self._open_screenrecord
+        self.frame_timeout = frame_timeout
+        self.frame_index = 0  # 已解碼的畫面數
+        self._latest = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stream = None
+
+    @classmethod
+    def from_file(cls, video_path, **kwargs):
+        """以錄好的影像檔代替設備，用於測試"""
+        return cls(stream_opener=lambda: open(video_path, 'rb'), **kwargs)
+
+    def _open_screenrecord(self):
+        return get_client().open_stream(
+            self.device_id,
+            f'exec:screenrecord --output-format=h264 --bit-rate={self.bit_rate} -'
+        )
+
+    def open(self):
+        """啟動背景解碼執行緒，重複呼叫不會重新啟動"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """停止串流與解碼執行緒"""
+        self._stopped.set()
+        self._close_stream()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._latest = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _close_stream(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _relay(stream, server):
+        """把串流資料轉送給連上本機埠的 FFmpeg"""
+        try:
+            server.settimeout(10)
+            connection, _ = server.accept()
+        except OSError:
+            stream.close()
+            return
+        read = getattr(stream, 'read1', stream.read)
+        with connection:
+            try:
+                while True:
+                    chunk = read(65536)
+                    if not chunk:
+                        break
+                    connection.sendall(chunk)
+            except OSError:
+                pass
+            finally:
+                stream.close()
+
+    def _decode_loop(self):
+        # 讓解碼器一解出畫面就交出去，不等待 B 幀重排
+        os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', 'flags;low_delay')
+        while not self._stopped.is_set():
+            try:
+                stream = self._stream = self.stream_opener()
+            except Exception as e:
+                print(f"開啟影像串流時發生錯誤: {str(e)}")
+                self._stopped.wait(1)
+                continue
+
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+                server.bind(('127.0.0.1', 0))
+                server.listen(1)
+                port = server.getsockname()[1]
+                relay = threading.Thread(target=self._relay, args=(stream, server), daemon=True)
+                relay.start()
+
+                capture = cv2.VideoCapture(f'tcp://127.0.0.1:{port}', cv2.CAP_FFMPEG)
+                while not self._stopped.is_set():
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    with self._condition:
+                        self._latest = frame
+                        self.frame_index += 1
+                        self._condition.notify_all()
+                capture.release()
+
+            self._close_stream()
+            relay.join(timeout=1)
+            # screenrecord 達到時間上限或中斷時，稍候重新開啟串流
+            self._stopped.wait(0.2)
+
+    def grab(self):
+        """
+        取得最新解碼完成的畫面
+
+        Returns:
+            numpy.ndarray: OpenCV 格式的圖片
+        """
+        self.open()
+        deadline = time.monotonic() + self.frame_timeout
+        with self._condition:
+            while self._latest is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("等待影像串流畫面逾時")
+                self._condition.wait(remaining)
+            return self._latest
+
+
+class MatchContext:
+    """
+    匹配時重複使用的輸出緩衝區。
+
+    每種用途保存一塊連續的記憶體，需要的大小不超過它時直接取前段 reshape 成所需的形狀，
+    再透過 OpenCV 的 dst / result 參數寫入；畫面與模板大小不變時，每次輪詢都不會再配置大型陣列。
+
+    緩衝區同時只屬於一個擁有者 (FrameViews)：被另一張畫面取用時，先釋放前一張畫面的衍生結果，
+    避免讀到已被覆寫的內容。不指定擁有者的緩衝區（例如匹配結果）只在單次呼叫內有效。
+
+    配置次數只計算大小與畫面相關的陣列。以下不經過 MatchContext，也不計入：
+    大小與命中數或格子數成正比的小型暫存（match_all 的候選座標、預篩選的區塊索引、顏色確認的 4x4 小圖）、
+    只在模板第一次使用時計算並快取的模板頻譜與縮放模板，以及 OpenCV 內部的暫存記憶體。
+    """
+
+    def __init__(self):
+        self.allocations = 0            # 總配置次數
+        self.polls = 0                  # 已結束的輪詢次數
+        self.steady_polls = 0           # 沒有任何配置的輪詢次數
+        self.last_poll_allocations = 0  # 最近一次輪詢的配置次數
+        self._poll_allocations = 0
+        self._buffers = {}              # (用途, dtype) -> [一維陣列, 擁有者弱參照]
+        self._lock = threading.Lock()
+
+    def buffer(self, name, shape, dtype=np.uint8, owner=None):
+        """
+        取得指定形狀的緩衝區，內容未初始化
+
+        Args:
+            name: 用途，不同用途的緩衝區可以同時使用
+            shape (tuple): 形狀
+            dtype: 資料型別
+            owner (FrameViews): 保存結果的擁有者，None 表示只在這次呼叫內使用
+
+        Returns:
+            numpy.ndarray: 連續的陣列
+        """
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        key = (name, dtype.str)
+        previous = None
+        with self._lock:
+            entry = self._buffers.get(key)
+            if entry is None or entry[0].size < size:
+                entry = self._buffers[key] = [np.empty(size, dtype=dtype), None]
+                self.allocations += 1
+                self._poll_allocations += 1
+            elif entry[1] is not None:
+                previous = entry[1]()
+            entry[1] = weakref.ref(owner) if owner is not None else None
+        if previous is not None and previous is not owner:
+            previous.clear()
+        return entry[0][:size].reshape(shape)
+
+    def result(self, image_shape, template_shape, name='result'):
+        """matchTemplate 的輸出緩衝區 (float32)"""
+        return self.buffer(name, (image_shape[0] - template_shape[0] + 1, image_shape[1] - template_shape[1] + 1),
+                           np.float32)
+
+    def end_poll(self):
+        """
+        結束一次輪詢的配置計數
+
+        Returns:
+            int: 這次輪詢的配置次數
+        """
+        with self._lock:
+            allocations, self._poll_allocations = self._poll_allocations, 0
+            self.polls += 1
+            self.steady_polls += allocations == 0
+            self.last_poll_allocations = allocations
+        return allocations
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(entry[0].nbytes for entry in self._buffers.values())
+
+    def summary(self):
+        if not self.polls:
+            return f"匹配緩衝區：配置 {self.allocations} 次"
+        return (f"匹配緩衝區：{self.polls} 次輪詢共配置 {self.allocations} 次"
+                f"（平均每次 {self.allocations / self.polls:.2f}，{self.steady_polls} 次輪詢沒有配置），"
+                f"佔用 {self.nbytes / 1024 / 1024:.1f} MB")
+
+
+class FrameViews:
+    """
+    同一張畫面的衍生表示：灰階、縮圖、搜尋範圍裁切與積分圖。
+
+    第一次使用時才計算並保存，同一張畫面上的所有模板與匹配方式共用，不必各自重新轉換。
+    畫面的緩衝區被重新使用前必須呼叫 clear()，否則會取得舊畫面的結果。
+
+    提供 context (MatchContext) 時，衍生結果寫入其中重複使用的緩衝區，匹配函式也從中取得輸出緩衝區。
+    """
+
+    def __init__(self, image, context=None, namespace=()):
+        """
+        Args:
+            image (numpy.ndarray): 畫面
+            context (MatchContext): 重複使用的緩衝區，None 表示每次配置新的陣列
+            namespace (tuple): 緩衝區用途的前綴，讓裁切出的子畫面不與完整畫面共用緩衝區
+        """
+        self.image = image
+        self.context = context
+        self._namespace = namespace
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, build):
+        with self._lock:
+            view = self._views.get(key)
+        if view is None:
+            view = build()
+            with self._lock:
+                view = self._views.setdefault(key, view)
+        return view
+
+    def has(self, key):
+        """衍生結果是否已經計算過，例如 'integral'、'change_integrals'"""
+        with self._lock:
+            return key in self._views
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        """由 context 取得屬於這張畫面的緩衝區，沒有 context 時返回 None 讓 OpenCV 自行配置"""
+        if self.context is None:
+            return None
+        return self.context.buffer(self._namespace + (name,), shape, dtype, owner=self)
+
+    def gray(self):
+        """單通道灰階畫面"""
+        if self.image.ndim == 2:
+            return self.image
+        return self._get('gray', lambda: cv2.cvtColor(
+            self.image, cv2.COLOR_BGR2GRAY, dst=self._buffer('gray', self.image.shape[:2])
+        ))
+
+    def gray_views(self):
+        """灰階畫面的衍生表示，灰階匹配時縮圖與積分圖都由灰階畫面計算"""
+        if self.image.ndim == 2:
+            return self
+        return self._get('gray_views', lambda: FrameViews(self.gray(), self.context, self._namespace + ('gray',)))
+
+    def downscaled(self, scale):
+        """以 INTER_AREA 縮小的畫面，例如 0.5、0.25"""
+        def build():
+            # 與 OpenCV 由 fx、fy 計算的大小相同（四捨五入到偶數）
+            shape = (round(self.image.shape[0] * scale), round(self.image.shape[1] * scale)) + self.image.shape[2:]
+            return cv2.resize(self.image, None, dst=self._buffer(('scale', scale), shape),
+                              fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return self._get(('scale', scale), build)
+
+    def half(self):
+        return self.downscaled(0.5)
+
+    def quarter(self):
+        return self.downscaled(0.25)
+
+    def integral(self):
+        """畫面的積分圖與平方積分圖 (float64)，用來快速計算任意視窗的平均值與變異數"""
+        def build():
+            shape = (self.image.shape[0] + 1, self.image.shape[1] + 1) + self.image.shape[2:]
+            return cv2.integral2(
+                self.image, sum=self._buffer('integral', shape, np.float64),
+                sqsum=self._buffer('square_integral', shape, np.float64),
+                sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F
+            )
+        return self._get('integral', build)
+
+    def change_integrals(self):
+        """
+        相鄰像素是否不同的積分圖 (int32)：(與右方像素不同, 與下方像素不同)
+
+        視窗內兩者的和都是 0 表示視窗內所有像素都相同，任一通道不同即視為不同。
+        """
+        def changes(name, a, b):
+            diff = cv2.absdiff(a, b, dst=self._buffer((name, 'diff'), a.shape))
+            if diff.ndim == 3:
+                # 各通道相加（飽和於 255），任一通道不同即大於 0
+                diff = cv2.transform(diff, np.ones((1, diff.shape[2])), dst=self._buffer((name, 'any'), diff.shape[:2]))
+            changed = cv2.min(diff, 1, dst=self._buffer((name, 'changed'), diff.shape[:2]))
+            shape = (changed.shape[0] + 1, changed.shape[1] + 1)
+            return cv2.integral(changed, sum=self._buffer((name, 'integral'), shape, np.int32), sdepth=cv2.CV_32S)
+
+        image = self.image
+        return self._get('change_integrals', lambda: (
+            changes('horizontal', image[:, 1:], image[:, :-1]),
+            changes('vertical', image[1:], image[:-1]),
+        ))
+
+    def flat_blocks(self, block, step=4):
+        """
+        以每 step 個像素取樣一次，估計畫面每個 block x block 區塊是否為單色
+
+        只用來估計成本，取樣之間的細小圖案可能被忽略；不足一個區塊的右側與下側邊緣視為非單色。
+
+        Returns:
+            numpy.ndarray: bool 矩陣 (ceil(高 / block), ceil(寬 / block))
+        """
+        def build():
+            height, width = self.image.shape[:2]
+            rows, columns = height // block, width // block
+            flat = np.zeros((-(-height // block), -(-width // block)), dtype=bool)
+            if rows and columns:
+                samples = block // step
+                sampled = np.ascontiguousarray(self.image[:rows * block:step, :columns * block:step])
+                # 以左上角為錨點的最大值與最小值，每個區塊的第一個取樣點就是整個區塊的結果
+                kernel = np.ones((samples, samples), np.uint8)
+                high = cv2.dilate(sampled, kernel, anchor=(0, 0))[::samples, ::samples]
+                low = cv2.erode(sampled, kernel, anchor=(0, 0))[::samples, ::samples]
+                same = high == low
+                flat[:rows, :columns] = same.all(axis=-1) if same.ndim > 2 else same
+            return flat
+        return self._get(('flat_blocks', block, step), build)
+
+    def crop(self, region):
+        """
+        搜尋範圍的衍生表示，同一範圍的裁切與其衍生結果也會共用
+
+        Returns:
+            tuple: (裁切後畫面的 FrameViews, (x, y) 範圍左上角的座標)
+        """
+        return self._get(('crop', tuple(region)), lambda: self._crop(region))
+
+    def _crop(self, region):
+        cropped, origin = crop_region(self.image, region)
+        return FrameViews(cropped, self.context, self._namespace + (('crop', tuple(region)),)), origin
+
+    def clear(self):
+        """釋放所有衍生結果"""
+        with self._lock:
+            self._views.clear()
+
+
+class Frame:
+    """
+    環形緩衝區中的一張畫面。
+
+    由 FrameProducer.latest() 或 wait_newer() 取得的畫面處於「使用中」狀態，
+    使用完畢必須呼叫 release()（或使用 with），生產者才會重新使用它的緩衝區。
+
+    views 保存畫面的衍生表示 (FrameViews)，畫面離開環形緩衝區時釋放。
+    """
+
+    def __init__(self, image, timestamp, index, lock=None, region=None, origin=(0, 0), screen_size=None, context=None):
+        self.image = image          # BGR 畫面
+        self.timestamp = timestamp  # time.monotonic() 擷取時間
+        self.index = index          # 生產者的畫面序號
+        self.region = region        # 擷取時設定的搜尋範圍，None 表示完整畫面
+        self.origin = origin        # image 左上角在完整畫面中的座標
+        # 完整畫面的 (寬, 高)，有搜尋範圍時 image 只是其中一部分
+        self.screen_size = screen_size or (image.shape[1], image.shape[0])
+        self.views = FrameViews(image, context)
+        self._holders = 0
+        self._lock = lock or threading.RLock()
+
+    def hold(self):
+        with self._lock:
+            self._holders += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._holders = max(0, self._holders - 1)
+
+    @property
+    def in_use(self):
+        return self._holders > 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class FrameProducer:
+    """
+    背景執行緒持續從截圖來源擷取畫面，放進固定大小的環形緩衝區。
+
+    匹配端不必等待截圖：latest() 立即取得最新畫面，
+    wait_newer(t) 則等待比時間 t 更新的畫面。擷取與匹配因此可以同時進行。
+
+    set_region() 設定搜尋範圍後只擷取該範圍：截圖來源支援時（mss）直接擷取部分螢幕，
+    否則擷取完整畫面後裁切。畫面的 origin 記錄裁切位置，用來換算回完整畫面座標。
+
+    提供 scheduler (polling.PollScheduler) 時，擷取間隔由它決定：畫面靜止時放慢，
+    點擊後立即擷取。
+
+    提供 context (MatchContext) 時，畫面的衍生表示寫入其中重複使用的緩衝區。
+    """
+
+    def __init__(self, capture_source, capacity=3, min_interval=0.0, scheduler=None, context=None):
+        """
+        Args:
+            capture_source: 截圖來源，需提供 grab()
+            capacity (int): 環形緩衝區的畫面數
+            min_interval (float): 兩次擷取之間的最短間隔(秒)，0 表示盡可能快；提供 scheduler 時不使用
+            scheduler (PollScheduler): 自適應的擷取間隔
+            context (MatchContext): 匹配時重複使用的緩衝區
+        """
+        self.capture_source = capture_source
+        self.capacity = capacity
+        self.min_interval = min_interval
+        self.scheduler = scheduler
+        self.context = context
+        self.last_error = None   # 最近一次擷取失敗的例外
+        self.frame_count = 0     # 已擷取的畫面數
+        self._ring = []          # 依擷取順序排列的 Frame，最舊的在前
+        self._region = None      # 目前的搜尋範圍
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """啟動擷取執行緒，重複呼叫不會重新啟動"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """停止擷取執行緒並清空緩衝區"""
+        self._stopped.set()
+        if self.scheduler is not None:
+            self.scheduler.wake()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._condition:
+            for frame in self._ring:
+                frame.views.clear()
+            self._ring.clear()
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def set_region(self, region):
+        """
+        設定之後擷取的搜尋範圍
+
+        Args:
+            region: [x, y, 寬, 高]，None 表示完整畫面
+        """
+        self._region = tuple(region) if region is not None else None
+
+    def _grab(self, region):
+        """依搜尋範圍擷取畫面，返回 (圖片, 左上角座標, 完整畫面大小)"""
+        if region is None:
+            image = self.capture_source.grab()
+            return image, (0, 0), (image.shape[1], image.shape[0])
+        if getattr(self.capture_source, 'supports_region', False):
+            _, origin = self.capture_source.region_rect(region)
+            monitor = self.capture_source.monitor
+            return self.capture_source.grab(region), origin, (monitor['width'], monitor['height'])
+        image = self.capture_source.grab()
+        cropped, origin = crop_region(image, region)
+        return cropped, origin, (image.shape[1], image.shape[0])
+
+    def _take_slot(self, shape):
+        """取得可覆寫的畫面緩衝區：重用最舊且未被使用的畫面，否則配置新的"""
+        with self._condition:
+            if len(self._ring) >= self.capacity:
+                for i, frame in enumerate(self._ring):
+                    if not frame.in_use:
+                        del self._ring[i]
+                        frame.views.clear()
+                        if frame.image.shape == shape:
+                            return frame.image
+                        break
+        return np.empty(shape, dtype=np.uint8)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            region = self._region
+            try:
+                image, origin, screen_size = self._grab(region)
+            except Exception as e:
+                self.last_error = e
+                self._stopped.wait(0.5)
+                continue
+
+            timestamp = time.monotonic()
+            slot = self._take_slot(image.shape)
+            np.copyto(slot, image)
+            with self._condition:
+                self.frame_count += 1
+                self._ring.append(Frame(
+                    slot, timestamp, self.frame_count, self._condition, region, origin, screen_size, self.context
+                ))
+                # 全部畫面都在使用中時，暫時超出容量
+                while len(self._ring) > self.capacity and not self._ring[0].in_use:
+                    self._ring.pop(0).views.clear()
+                self.last_error = None
+                self._condition.notify_all()
+
+            if self.scheduler is not None:
+                self.scheduler.wait(started)
+                continue
+            wait = self.min_interval - (time.monotonic() - started)
+            if wait > 0:
+                self._stopped.wait(wait)
+
+    def latest(self):
+        """
+        立即取得最新畫面，不等待
+
+        Returns:
+            Frame or None: 使用中的畫面，用完需 release()
+        """
+        with self._condition:
+            if not self._ring:
+                return None
+            return self._ring[-1].hold()
+
+    def wait_newer(self, timestamp, timeout=None):
+        """
+        等待擷取時間晚於 timestamp 的畫面
+
+        Args:
+            timestamp (float): time.monotonic() 的時間點
+            timeout (float): 最長等待時間(秒)，None 表示一直等待
+
+        Returns:
+            Frame or None: 使用中的畫面，逾時返回 None
+        """
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._ring or self._ring[-1].timestamp <= timestamp:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if (remaining is not None and remaining <= 0) or self._stopped.is_set():
+                    return None
+                self._condition.wait(remaining)
+            return self._ring[-1].hold()
+
+
+class FrameChangeDetector:
+    """
+    以縮小後的畫面判斷畫面是否變化，畫面沒變時可以直接沿用上一次的匹配結果。
+
+    has_changed() 會把新畫面縮成小圖，與上次實際進行匹配時的小圖逐像素比較；
+    匹配後呼叫 mark_matched() 將目前的小圖設為比較基準。
+    """
+
+    def __init__(self, scale=0.125, threshold=12):
+        """
+        Args:
+            scale (float): 比較用縮圖的縮放比例
+            threshold (int): 任一像素差異超過此值才視為畫面改變
+        """
+        self.scale = scale
+        self.threshold = threshold
+        self.matched_count = 0  # 實際執行匹配的次數
+        self.skipped_count = 0  # 因畫面未變化而略過的次數
+        self._reference = None
+        self._current = None
+        self._diff = None
+
+    def reset(self):
+        """清除比較基準，下一張畫面一定會被視為有變化"""
+        self._reference = None
+
+    def has_changed(self, image):
+        """
+        Args:
+            image (numpy.ndarray): 新的畫面
+
+        Returns:
+            bool: 與上次匹配的畫面相比是否有變化
+        """
+        height, width = image.shape[:2]
+        size = (max(1, int(width * self.scale)), max(1, int(height * self.scale)))
+        if self._current is None or self._current.shape[1::-1] != size:
+            self._current = np.empty((size[1], size[0]) + image.shape[2:], dtype=image.dtype)
+        cv2.resize(image, size, dst=self._current, interpolation=cv2.INTER_AREA)
+
+        if self._reference is None or self._reference.shape != self._current.shape:
+            return True
+        if self._diff is None or self._diff.shape != self._current.shape:
+            self._diff = np.empty_like(self._current)
+        cv2.absdiff(self._current, self._reference, dst=self._diff)
+        if self._diff.max() > self.threshold:
+            return True
+        self.skipped_count += 1
+        return False
+
+    def mark_matched(self):
+        """將最近一次 has_changed() 的畫面設為比較基準"""
+        self.matched_count += 1
+        self._reference, self._current = self._current, self._reference
+
+    def summary(self):
+        total = self.matched_count + self.skipped_count
+        return f"匹配 {self.matched_count} 次，畫面未變化略過 {self.skipped_count}/{total} 次"
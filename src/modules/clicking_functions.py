@@ -1,13 +1,18 @@
-import cv2
-import numpy as np
-import pyautogui
 import time
-from PIL import Image
 import os
-import subprocess
 import json
-from functions import get_resource_path
-import mss
+from functions import get_resource_path, get_selected_device_id, create_adb_capture_source, get_setting, create_poll_scheduler, create_motion_profile
+from mouse import ClickDispatcher
+from contextlib import ExitStack
+from capture import MSSCaptureSource, FrameProducer, FrameChangeDetector, MatchContext
+from adb_session import get_shell_session
+from template_cache import load_template, get_template_cache, build_template_index
+from template_matching import (
+    get_matcher, match_batch, match_near, match_multiscale, get_scale_calibration, get_location_memory, SCALE_CANDIDATES,
+    set_tile_workers, match_all, order_points, prefilter_stats
+)
+from feature_matching import get_feature_matcher
+from pixel_probe import PixelProbe
 
 def load_steps_from_json(json_path):
     """
@@ -39,11 +44,23 @@ def load_steps_from_json(json_path):
             print(f"Step data for Step{i}: {step_data}")
             
             # 構建步驟信息，直接從 JSON 中提取，並提供預設值
+            # any_of 步驟有多張圖片，location 為第一張（流程圖上顯示的節點）
+            locations = step_data.get('locations') or [step_data['location']]
             step_info = {
-                'location': step_data['location'],
+                'type': step_data.get('type', 'image'),
+                'location': step_data.get('location', locations[0]),
+                'locations': locations,
                 'timeout': step_data.get('timeout', 30),
                 'repeat_clicks': step_data.get('repeat_clicks', 1),  
-                'click_interval': step_data.get('click_interval', 1.0)  
+                'click_interval': step_data.get('click_interval', 1.0),
+                'region': step_data.get('region'),  # 搜尋範圍 [x, y, 寬, 高]
+                'matcher': step_data.get('matcher'),  # 匹配方式，None 表示使用全域設定
+                'color_mode': step_data.get('color_mode'),  # 'color'、'gray' 或 'gray_verify'，None 表示使用全域設定
+                'feature_fallback': step_data.get('feature_fallback'),  # 模板匹配失敗幾次後改用特徵匹配，None 表示使用全域設定
+                'click_all': step_data.get('click_all'),  # 點擊所有符合的位置：'reading' 或 'nearest'，None 表示只點擊最佳位置
+                'poll_interval': step_data.get('poll_interval'),  # [最短, 最長] 輪詢間隔(秒)，None 表示使用全域設定
+                'probes': step_data.get('probes'),  # probe 步驟的像素探針 [[x, y, [R, G, B], 容許值], ...]
+                'probe_origin': step_data.get('probe_origin')  # probe 步驟的模板左上角畫面座標，None 表示自動尋找
             }
             
             print(f"Loaded Step{i}: {step_info}")  # 調試輸出
@@ -58,33 +75,20 @@ def load_steps_from_json(json_path):
         print(f"讀取 JSON 檔案時發生錯誤: {str(e)}")
         return [], 0
 
-def ADB_screenshot():
+def ADB_screenshot(capture_source=None):
     """
-    使用 ADB 截取螢幕畫面
+    使用 ADB 截取螢幕畫面，畫面直接從 exec-out 讀入記憶體
+    
+    Args:
+        capture_source (ADBScreencapSource): 可重複使用的截圖來源，未提供時依設定建立
     
     Returns:
         numpy.ndarray: OpenCV 格式的圖片
     """
     try:
-        # 確保 cache 資料夾存在
-        cache_dir = get_resource_path('cache')
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-            
-        # 固定使用 screenshot.png 作為檔案名稱
-        cache_file = os.path.join(cache_dir, 'screenshot.png')
-        
-        # 使用 ADB 截圖並保存到手機
-        subprocess.run('adb shell screencap -p /sdcard/screenshot.png', shell=True, check=True)
-        # 將截圖從手機拉到電腦的 cache 資料夾
-        subprocess.run(f'adb pull /sdcard/screenshot.png "{cache_file}"', shell=True, check=True)
-        # 刪除手機上的截圖
-        subprocess.run('adb shell rm /sdcard/screenshot.png', shell=True, check=True)
-        
-        # 讀取截圖
-        screenshot = cv2.imread(cache_file)
-        
-        return screenshot
+        if capture_source is None:
+            capture_source = create_adb_capture_source(get_selected_device_id())
+        return capture_source.grab()
     except Exception as e:
         print(f"ADB 截圖時發生錯誤: {str(e)}")
         return None
@@ -98,18 +102,64 @@ def ADB_click(x, y):
         y (int): Y 座標
     """
     try:
-        subprocess.run(f'adb shell input tap {x} {y}', shell=True, check=True)
-        return True
+        # 透過常駐的 adb shell 送出，不必每次點擊都啟動 adb 子程序
+        return get_shell_session(get_selected_device_id()).tap(x, y)
     except Exception as e:
         print(f"ADB 點擊時發生錯誤: {str(e)}")
         return False
 
-def detect_and_click_image(template_path, log_view, confidence=0.8, timeout=30, is_adb_mode=False, max_retries=3, repeat_clicks=1, click_interval=1.0):
+def get_device_key(is_adb_mode, frame_producer=None):
+    """返回縮放比例校正等快取使用的設備識別：ADB 模式為設備序號，Windows 模式為螢幕編號"""
+    if is_adb_mode:
+        return f"adb:{get_selected_device_id() or 'default'}"
+    monitor_index = getattr(frame_producer.capture_source, 'monitor_index', 0) if frame_producer else 0
+    return f"monitor:{monitor_index}"
+
+def get_step_templates(step):
+    """
+    返回步驟要尋找的模板路徑
+
+    Returns:
+        str or list: 一般步驟為單一路徑；any_of 步驟為所有候選圖片的路徑列表
+    """
+    if step.get('type') == 'any_of':
+        return [get_resource_path(location) for location in step.get('locations') or [step['location']]]
+    return get_resource_path(step['location'])
+
+def perform_clicks(x, y, repeat_clicks, click_interval, is_adb_mode, log_view):
+    """執行點擊操作，支援重複點擊"""
+    log_view.append_log(f"開始執行點擊，總次數: {repeat_clicks}, 間隔: {click_interval}秒")
+    if is_adb_mode:
+        # 所有重複點擊合併成一次寫入
+        try:
+            session = get_shell_session(get_selected_device_id())
+            if not session.tap_many([(x, y)] * repeat_clicks, click_interval):
+                log_view.append_log(f"ADB 點擊失敗")
+                return False
+        except Exception as e:
+            log_view.append_log(f"ADB 點擊失敗: {str(e)}")
+            return False
+        log_view.append_log(f"完成 {repeat_clicks}/{repeat_clicks} 次點擊")
+        return True
+
+    # 移動一次後送出整組點擊，間隔依單調時鐘排定；點擊期間不寫日誌，避免影響間隔
+    dispatcher = ClickDispatcher(create_motion_profile())
+    try:
+        dispatcher.burst(x, y, repeat_clicks, click_interval)
+    except Exception as e:
+        log_view.append_log(f"第 {len(dispatcher.last_times) + 1} 次點擊失敗: {str(e)}")
+        return False
+    drift = dispatcher.max_drift(click_interval) * 1000
+    log_view.append_log(f"完成 {repeat_clicks}/{repeat_clicks} 次點擊，間隔最大誤差 {drift:.1f} 毫秒")
+    return True
+
+def detect_and_click_image(template_path, log_view, confidence=0.8, timeout=30, is_adb_mode=False, max_retries=3, repeat_clicks=1, click_interval=1.0, capture_source=None, frame_producer=None, change_detector=None,
+                           region=None, matcher=None, feature_fallback=None, click_all=None, poll_interval=None, color_mode=None):
     """
     在螢幕上偵測圖片並點擊
     
     Args:
-        template_path (str): 模板圖片路徑
+        template_path (str or list): 模板圖片路徑；傳入多個路徑時點擊最先出現（匹配值最高）的一個
         log_view: 日誌視圖實例
         confidence (float): 匹配信心值
         timeout (int): 超時時間(秒)
@@ -117,93 +167,282 @@ def detect_and_click_image(template_path, log_view, confidence=0.8, timeout=30,
         max_retries (int): 最大重試次數
         repeat_clicks (int): 重複點擊次數
         click_interval (float): 點擊間隔時間(秒)
+        capture_source: 截圖來源 (MSSCaptureSource 或 ADBScreencapSource)，未提供時會在本次呼叫內建立
+        frame_producer (FrameProducer): 背景擷取畫面的生產者，未提供時以 capture_source 建立
+        change_detector (FrameChangeDetector): 畫面變化偵測器，畫面未變化時略過匹配
+        region (list): 搜尋範圍 [x, y, 寬, 高]，None 表示搜尋整個畫面
+        matcher (str): 匹配方式 'auto'、'full'、'fft'、'pyramid'、'tiled' 或 'prefilter'，None 表示使用 setting.json 的 template_matcher
+        feature_fallback (int): 模板匹配連續失敗幾次後改用 ORB 特徵匹配，0 表示不使用，None 表示使用 setting.json 的 feature_fallback_polls
+        click_all (str): 點擊同一張畫面中所有符合的位置，'reading' 由上而下、由左而右，'nearest' 每次點擊最近的下一個位置；
+            None 表示只點擊匹配值最高的位置
+        poll_interval (list): [最短, 最長] 輪詢間隔(秒)，None 表示使用 setting.json 的 poll_min_interval、poll_max_interval
+        color_mode (str): 'color' 以 BGR 匹配，'gray' 以灰階匹配，'gray_verify' 以灰階匹配後確認最佳位置（click_all 時為每個位置）的顏色；
+            None 表示使用 setting.json 的 match_color_mode
     
     Returns:
-        tuple or None: 如果找到圖片則返回座標，否則返回 None
+        tuple or list or None: 如果找到圖片則返回座標（click_all 時為所有點擊座標的列表），否則返回 None
     """
-    if not os.path.exists(template_path):
-        log_view.append_log(f"檔案不存在: {template_path}")
-        return None
+    template_paths = [template_path] if isinstance(template_path, str) else list(template_path)
+    for path in template_paths:
+        if not os.path.exists(path):
+            log_view.append_log(f"檔案不存在: {path}")
+            return None
 
-    def read_image_with_pil(image_path):
+    if frame_producer is None:
+        # 沒有由流程傳入畫面生產者時，只在這次呼叫內使用
+        with ExitStack() as stack:
+            if capture_source is None:
+                if is_adb_mode:
+                    capture_source = create_adb_capture_source(get_selected_device_id())
+                else:
+                    capture_source = MSSCaptureSource()
+                stack.enter_context(capture_source)
+            producer = stack.enter_context(FrameProducer(
+                capture_source, scheduler=create_poll_scheduler(), context=MatchContext()
+            ))
+            return detect_and_click_image(
+                template_path, log_view, confidence, timeout, is_adb_mode,
+                max_retries, repeat_clicks, click_interval, capture_source, producer,
+                change_detector, region, matcher, feature_fallback, click_all, poll_interval, color_mode
+            )
+
+    def read_template(image_path):
+        """從共用的模板快取取得圖片，同一張圖只會從硬碟讀取一次"""
         try:
-            pil_image = Image.open(image_path)
-            return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            return load_template(image_path)
         except Exception as e:
             log_view.append_log(f"無法讀取影像: {e}")
             return None
 
-    def take_screenshot():
+    def take_screenshot(newer_than):
+        """等待生產者擷取到比 newer_than 更新的畫面"""
         retry_count = 0
         while retry_count < max_retries:
-            try:
-                if is_adb_mode:
-                    screenshot = ADB_screenshot()
-                    if screenshot is None:
-                        raise Exception("ADB 截圖失敗")
-                else:
-                    with mss.mss() as sct:
-                        monitor = sct.monitors[0]  # 0 表示所有螢幕
-                        screenshot = sct.grab(monitor)
-                        screenshot = np.array(screenshot)
-                        screenshot = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
-                return screenshot
-            except Exception as e:
-                retry_count += 1
-                log_view.append_log(f"截圖失敗 (嘗試 {retry_count}/{max_retries}): {str(e)}")
-                time.sleep(1)
+            frame = frame_producer.wait_newer(newer_than, timeout=5)
+            if frame is not None:
+                return frame
+            retry_count += 1
+            error = frame_producer.last_error or "等待畫面逾時"
+            log_view.append_log(f"截圖失敗 (嘗試 {retry_count}/{max_retries}): {str(error)}")
         return None
         
-    def perform_clicks(x, y, repeat_clicks, click_interval, is_adb_mode, log_view):
-        """執行點擊操作，支援重複點擊"""
-        log_view.append_log(f"開始執行點擊，總次數: {repeat_clicks}, 間隔: {click_interval}秒")
-        for click_count in range(repeat_clicks):
-            try:
-                if is_adb_mode:
-                    if not ADB_click(x, y):
-                        log_view.append_log(f"ADB 點擊失敗")
-                        return False
-                else:
-                    pyautogui.moveTo(x, y, duration=0.5)
-                    pyautogui.click()
-                
-                log_view.append_log(f"完成第 {click_count + 1}/{repeat_clicks} 次點擊")
-                
-                if click_count < repeat_clicks - 1:  # 如果不是最後一次點擊
-                    log_view.append_log(f"等待 {click_interval} 秒後進行下一次點擊")
-                    time.sleep(click_interval)
-                    
-            except Exception as e:
-                log_view.append_log(f"第 {click_count + 1} 次點擊失敗: {str(e)}")
-                return False
-        return True
-
     start_time = time.time()
     log_view.append_log(f"開始尋找圖片，超時時間設定為 {timeout} 秒")
-    template = read_image_with_pil(template_path)
+    templates = [read_template(path) for path in template_paths]
     
-    if template is None:
+    if any(template is None for template in templates):
         log_view.append_log("無法讀取模板圖片")
         return None
 
+    if change_detector is None:
+        change_detector = FrameChangeDetector()
+    change_detector.reset()  # 每個步驟的模板不同，第一張畫面一定要匹配
+    max_val = 0
+    allocations = 0  # 最近一次輪詢配置的緩衝區數
+
+    color_mode = color_mode or get_setting('match_color_mode', 'color')
+    match = get_matcher(matcher or get_setting('template_matcher'), color_mode)
+    set_tile_workers(get_setting('match_workers', 0))
+
+    # 多尺度匹配：每個設備只校正一次縮放比例，之後只用該比例匹配
+    multi_scale = get_setting('multi_scale_matching', True)
+    calibration = get_scale_calibration(get_resource_path('cache/scale_calibration.json'))
+    device_key = get_device_key(is_adb_mode, frame_producer)
+
+    # 上次找到的位置：先檢查該位置附近，找不到才搜尋整個畫面
+    location_memory = get_location_memory(get_resource_path('cache/last_locations.json'))
+
+    def match_last_locations(image, origin, scaled_templates, views=None):
+        """在各模板上次出現的位置附近匹配，返回命中列表；沒有任何位置記錄時返回 None"""
+        hits = []
+        checked = False
+        for index, path in enumerate(template_paths):
+            location = location_memory.lookup(device_key, path)
+            if location is None:
+                continue
+            # 記錄為完整畫面座標，換算為搜尋範圍內的座標
+            result = match_near(image, scaled_templates[index], (location[0] - origin[0], location[1] - origin[1]), views=views)
+            if result is None:
+                continue
+            checked = True
+            if result[0] >= confidence:
+                hits.append((index, result[0], result[1], scaled_templates[index]))
+        if not checked:
+            return None
+        location_memory.record(bool(hits))
+        return hits
+
+    # 特徵匹配備援：按鈕動畫或輕微縮放時模板匹配值會一直低於門檻，改以特徵點尋找
+    if feature_fallback is None:
+        feature_fallback = get_setting('feature_fallback_polls', 0)
+    failed_polls = 0
+    features_checked = False  # 目前的畫面內容是否已執行過特徵匹配（結果為未找到）
+
+    def match_features(views):
+        """以 ORB 特徵匹配尋找所有模板，命中位置換算為模板左上角，與模板匹配的結果格式相同"""
+        feature_matcher = get_feature_matcher()
+        frame_features = feature_matcher.detect_frame(views.gray())  # 所有模板共用畫面的特徵點
+        hits = []
+        for index, template in enumerate(templates):
+            result = feature_matcher.match(views.image, template, frame_features)
+            if result is None:
+                continue
+            inlier_ratio, (center_x, center_y) = result
+            template_height, template_width = template.shape[:2]
+            hits.append((index, inlier_ratio, (center_x - template_width // 2, center_y - template_height // 2), template))
+        return hits
+
+    def find_all(views, scaled_templates):
+        """找出所有模板在畫面中的所有位置，返回 (命中列表, 最高匹配值)"""
+        hits = []
+        best_val = -1.0
+        for index, template in enumerate(scaled_templates):
+            max_val, locations = match_all(views.image, template, confidence, views=views, color_mode=color_mode)
+            best_val = max(best_val, max_val)
+            hits.extend((index, val, loc, template) for val, loc in locations)
+        return hits, best_val
+
+    def click_all_hits(hits, origin_x, origin_y):
+        """依 click_all 指定的順序點擊所有命中位置，返回點擊過的座標列表"""
+        hits = sorted(hits, key=lambda hit: hit[1], reverse=True)
+        centers = [
+            (origin_x + loc[0] + template.shape[1] // 2, origin_y + loc[1] + template.shape[0] // 2)
+            for _, _, loc, template in hits
+        ]
+        row_tolerance = min(template.shape[0] for _, _, _, template in hits) // 2
+        centers = order_points(centers, click_all, row_tolerance)
+        log_view.append_log(f"找到 {len(centers)} 個符合的位置，依 {click_all} 順序點擊: {centers}")
+        for center_x, center_y in centers:
+            if not perform_clicks(center_x, center_y, repeat_clicks, click_interval, is_adb_mode, log_view):
+                log_view.append_log("點擊操作失敗")
+                return None
+        scheduler.on_action()
+        log_view.append_log(f"完成所有點擊操作 (共 {len(centers)} 個位置)")
+        return centers
+
+    def match_at_scale(frame, scale):
+        """以指定縮放比例的模板匹配畫面，返回 (命中列表, 最高匹配值)"""
+        if scale == 1.0:
+            scaled_templates = templates
+        else:
+            scaled_templates = [load_template(path, scale=scale) for path in template_paths]
+        if click_all:
+            return find_all(frame.views, scaled_templates)
+        hits = match_last_locations(frame.image, frame.origin, scaled_templates, frame.views)
+        if hits:
+            return hits, max(hit[1] for hit in hits)
+        # 所有模板共用同一張畫面與其衍生表示（縮圖、積分圖）
+        max_val, hits = match_batch(frame.image, scaled_templates, match, frame.views, threshold=confidence)
+        return [(index, val, loc, scaled_templates[index]) for index, val, loc in hits], max_val
+
+    def calibrate(views, screen_size):
+        """原始比例找不到模板時，逐一以其他比例的多尺度匹配尋找模板，返回 (命中列表, 最高匹配值)"""
+        best_val = -1.0
+        scales = tuple(scale for scale in SCALE_CANDIDATES if scale != 1.0)
+        for index, path in enumerate(template_paths):
+            max_val, max_loc, scale, scaled = match_multiscale(views.image, path, match, confidence, scales=scales, views=views)
+            if max_val >= confidence:
+                calibration.set(device_key, screen_size, scale)
+                log_view.append_log(f"已校正 {device_key} 的模板縮放比例: {scale:.3f}")
+                return [(index, max_val, max_loc, scaled)], max_val
+            best_val = max(best_val, max_val)
+        return [], best_val
+
+    def match_frame(frame):
+        """匹配有變化的畫面，模板匹配未達門檻且連續失敗足夠次數時改用特徵匹配，返回 (命中列表, 最高匹配值)"""
+        nonlocal failed_polls, features_checked
+        scale = calibration.get(device_key, frame.screen_size) if multi_scale else 1.0
+        if scale is not None:
+            hits, max_val = match_at_scale(frame, scale)
+        else:
+            # 尚未校正：平常以原始比例匹配，找不到時才在退避間隔後嘗試其他比例，
+            # 避免每次輪詢都執行完整的多尺度匹配
+            hits, max_val = match_at_scale(frame, 1.0)
+            if hits:
+                calibration.set(device_key, frame.screen_size, 1.0)
+                log_view.append_log(f"已校正 {device_key} 的模板縮放比例: 1.000")
+            elif calibration.sweep_due(device_key):
+                hits, sweep_val = calibrate(frame.views, frame.screen_size)
+                max_val = max(max_val, sweep_val)
+                if hits and click_all:
+                    # 校正完成後，以校正出的比例在同一張畫面上尋找所有位置
+                    hits, max_val = match_at_scale(frame, calibration.get(device_key, frame.screen_size))
+                elif not hits:
+                    calibration.sweep_failed(device_key)
+        if not hits and feature_fallback > 0 and not click_all:
+            failed_polls += 1
+            if failed_polls >= feature_fallback:
+                hits = match_features(frame.views)
+                features_checked = True
+                if hits:
+                    log_view.append_log(f"模板匹配連續 {failed_polls} 次未達門檻，以特徵匹配找到目標")
+        return hits, max_val
+
+    # 擷取間隔：點擊後與畫面變化時加快，畫面靜止時放慢，取代固定的等待
+    scheduler = frame_producer.scheduler
+    if scheduler is None:
+        scheduler = frame_producer.scheduler = create_poll_scheduler()
+    scheduler.configure(*(poll_interval or (get_setting('poll_min_interval', 0.05), get_setting('poll_max_interval', 1.0))))
+
+    region = tuple(region) if region else None
+    frame_producer.set_region(region)
+    if region:
+        log_view.append_log(f"搜尋範圍: {list(region)}")
+
+    # 只使用步驟開始後擷取的畫面，避免匹配到上一步點擊前的舊畫面
+    last_frame_time = time.monotonic()
     while time.time() - start_time < timeout:
         try:
-            screenshot = take_screenshot()
-            if screenshot is None:
+            frame = take_screenshot(last_frame_time)
+            if frame is None:
                 log_view.append_log("無法取得螢幕截圖")
                 continue
 
-            # 執行模板匹配
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            # 執行模板匹配，擷取下一張畫面的同時進行
+            with frame:
+                last_frame_time = frame.timestamp
+                if frame.region != region:
+                    # 設定搜尋範圍前已開始擷取的畫面
+                    continue
+                origin_x, origin_y = frame.origin
+                if not change_detector.has_changed(frame.image):
+                    # 畫面與上次匹配時相同，模板匹配的結果不會改變
+                    scheduler.on_static()
+                    if feature_fallback <= 0 or click_all or features_checked:
+                        continue
+                    # 靜止的畫面仍計入失敗次數，否則目標縮放或旋轉時永遠不會改用特徵匹配；
+                    # 特徵匹配在同一個畫面內容上只執行一次
+                    failed_polls += 1
+                    if failed_polls < feature_fallback:
+                        continue
+                    hits = match_features(frame.views)
+                    features_checked = True
+                    if not hits:
+                        continue
+                    log_view.append_log(f"模板匹配連續 {failed_polls} 次未達門檻，以特徵匹配找到目標")
+                else:
+                    scheduler.on_change()
+                    features_checked = False
+                    hits, max_val = match_frame(frame)
+                    change_detector.mark_matched()
+                    allocations = frame_producer.context.end_poll() if frame_producer.context is not None else 0
 
-            if max_val >= confidence:
-                template_height, template_width = template.shape[:2]
-                center_x = max_loc[0] + template_width // 2
-                center_y = max_loc[1] + template_height // 2
+            if hits and click_all:
+                return click_all_hits(hits, origin_x, origin_y)
+
+            if hits:
+                index, max_val, max_loc, scaled_template = max(hits, key=lambda hit: hit[1])
+                template_height, template_width = scaled_template.shape[:2]
+                # 匹配位置相對於搜尋範圍，換算回完整畫面座標
+                center_x = origin_x + max_loc[0] + template_width // 2
+                center_y = origin_y + max_loc[1] + template_height // 2
+                location_memory.remember(device_key, template_paths[index], (origin_x + max_loc[0], origin_y + max_loc[1]))
+                if len(template_paths) > 1:
+                    log_view.append_log(f"出現的圖片: {os.path.basename(template_paths[index])}")
                 log_view.append_log(f"找到匹配位置: {max_loc}, 匹配值: {max_val}, 中心點: ({center_x}, {center_y})")
 
                 if perform_clicks(center_x, center_y, repeat_clicks, click_interval, is_adb_mode, log_view):
+                    scheduler.on_action()
                     log_view.append_log(f"完成所有點擊操作 (共 {repeat_clicks} 次)")
                     return (center_x, center_y)
                 else:
@@ -212,8 +451,11 @@ def detect_and_click_image(template_path, log_view, confidence=0.8, timeout=30,
 
             remaining_time = int(timeout - (time.time() - start_time))
             if remaining_time > 0:
-                log_view.append_log(f"當前匹配準確值：{max_val}，剩餘時間：{remaining_time}秒")
-            time.sleep(0.5)
+                message = f"當前匹配準確值：{max_val}，剩餘時間：{remaining_time}秒"
+                if allocations:
+                    # 第一次遇到新的畫面或模板大小時才需要配置，之後的輪詢重複使用
+                    message += f"，配置 {allocations} 個緩衝區"
+                log_view.append_log(message)
 
         except Exception as e:
             log_view.append_log(f"處理過程發生錯誤: {str(e)}")
@@ -222,6 +464,125 @@ def detect_and_click_image(template_path, log_view, confidence=0.8, timeout=30,
     log_view.append_log(f"超過設定的 {timeout} 秒仍未找到匹配的影像")
     return None
 
+def probe_and_click(template_path, probes, log_view, timeout=30, is_adb_mode=False, repeat_clicks=1, click_interval=1.0,
+                    frame_producer=None, probe_origin=None, confidence=0.8, poll_interval=None):
+    """
+    以像素探針確認畫面狀態並點擊模板中心，不需要每次輪詢都做模板匹配
+
+    探針座標相對於模板左上角。模板在畫面上的位置依序取自 probe_origin、上次找到的位置，
+    都沒有時以模板匹配尋找一次。知道位置後只擷取探針涵蓋的一小塊畫面，以擷取速度輪詢。
+
+    Args:
+        template_path (str): 模板圖片路徑
+        probes (list): [[x, y, [R, G, B], 容許值], ...]
+        log_view: 日誌視圖實例
+        timeout (int): 超時時間(秒)
+        is_adb_mode (bool): 是否使用 ADB 模式
+        repeat_clicks (int): 重複點擊次數
+        click_interval (float): 點擊間隔時間(秒)
+        frame_producer (FrameProducer): 背景擷取畫面的生產者，未提供時在本次呼叫內建立
+        probe_origin (list): 模板左上角在完整畫面中的座標 [x, y]，None 表示自動尋找
+        confidence (float): 尋找模板位置時的匹配信心值
+        poll_interval (list): [最短, 最長] 輪詢間隔(秒)，None 表示使用全域設定
+
+    Returns:
+        tuple or None: 所有探針符合並完成點擊時返回點擊座標，否則返回 None
+    """
+    if not os.path.exists(template_path):
+        log_view.append_log(f"檔案不存在: {template_path}")
+        return None
+    try:
+        probe = PixelProbe(probes)
+        template = load_template(template_path)
+    except Exception as e:
+        log_view.append_log(f"無法建立像素探針: {str(e)}")
+        return None
+
+    if frame_producer is None:
+        with ExitStack() as stack:
+            capture_source = create_adb_capture_source(get_selected_device_id()) if is_adb_mode else MSSCaptureSource()
+            stack.enter_context(capture_source)
+            producer = stack.enter_context(FrameProducer(capture_source, scheduler=create_poll_scheduler()))
+            return probe_and_click(
+                template_path, probes, log_view, timeout, is_adb_mode, repeat_clicks, click_interval,
+                producer, probe_origin, confidence, poll_interval
+            )
+
+    # 探針的成本很低，輪詢間隔固定為最短間隔，不因畫面靜止而放慢
+    scheduler = frame_producer.scheduler
+    if scheduler is None:
+        scheduler = frame_producer.scheduler = create_poll_scheduler()
+    scheduler.configure(*(poll_interval or (get_setting('poll_min_interval', 0.05), get_setting('poll_max_interval', 1.0))))
+
+    match = get_matcher(get_setting('template_matcher'), get_setting('match_color_mode', 'color'))
+    multi_scale = get_setting('multi_scale_matching', True)
+    calibration = get_scale_calibration(get_resource_path('cache/scale_calibration.json'))
+    device_key = get_device_key(is_adb_mode, frame_producer)
+    location_memory = get_location_memory(get_resource_path('cache/last_locations.json'))
+    origin = tuple(probe_origin) if probe_origin else location_memory.lookup(device_key, template_path)
+
+    region = None
+    frame_producer.set_region(None)
+    log_view.append_log(f"開始檢查 {len(probes)} 個像素探針，超時時間設定為 {timeout} 秒")
+    start_time = time.time()
+    last_frame_time = time.monotonic()
+    last_log_time = 0
+    while time.time() - start_time < timeout:
+        frame = frame_producer.wait_newer(last_frame_time, timeout=5)
+        if frame is None:
+            log_view.append_log(f"截圖失敗: {str(frame_producer.last_error or '等待畫面逾時')}")
+            continue
+
+        with frame:
+            last_frame_time = frame.timestamp
+            if frame.region != region:
+                continue
+            scale = (calibration.get(device_key, frame.screen_size) or 1.0) if multi_scale else 1.0
+            if origin is None:
+                # 還不知道模板的位置：在完整畫面上以模板匹配找一次，之後只檢查探針
+                scaled = template if scale == 1.0 else load_template(template_path, scale=scale)
+                if scaled.shape[0] > frame.image.shape[0] or scaled.shape[1] > frame.image.shape[1]:
+                    log_view.append_log("模板比畫面大，無法尋找探針位置")
+                    return None
+                max_val, max_loc = match(frame.image, scaled, views=frame.views)
+                if max_val < confidence:
+                    log_view.append_log(f"尋找探針位置中，當前匹配準確值：{max_val}")
+                    continue
+                origin = (frame.origin[0] + max_loc[0], frame.origin[1] + max_loc[1])
+                location_memory.remember(device_key, template_path, origin)
+                log_view.append_log(f"探針位置: {origin}")
+            failed = probe.check(frame.image, origin, frame.origin, scale)
+
+        if failed == 0:
+            center_x = origin[0] + int(template.shape[1] * scale) // 2
+            center_y = origin[1] + int(template.shape[0] * scale) // 2
+            log_view.append_log(f"所有像素探針符合，點擊模板中心: ({center_x}, {center_y})")
+            if not perform_clicks(center_x, center_y, repeat_clicks, click_interval, is_adb_mode, log_view):
+                log_view.append_log("點擊操作失敗")
+                return None
+            scheduler.on_action()
+            return (center_x, center_y)
+
+        if region is None:
+            # 之後只擷取探針涵蓋的範圍
+            region = tuple(probe.bounds(origin, scale))
+            frame_producer.set_region(region)
+        if time.time() - last_log_time >= 1:
+            last_log_time = time.time()
+            remaining_time = int(timeout - (time.time() - start_time))
+            log_view.append_log(f"{failed}/{len(probes)} 個像素探針不符合，剩餘時間：{remaining_time}秒")
+
+    log_view.append_log(f"超過設定的 {timeout} 秒像素探針仍不符合")
+    return None
+
+def prepare_template_index(log_view):
+    """增量更新 detect 資料夾的模板索引，之後的模板讀取直接使用索引中的陣列"""
+    try:
+        index = build_template_index(get_resource_path('detect'), get_resource_path('cache/template_index.bin'))
+        log_view.append_log(index.summary())
+    except Exception as e:
+        log_view.append_log(f"建立模板索引時發生錯誤: {str(e)}")
+
 def Click_step_by_step(step_array, log_view):
     """
     依序執行 Windows 模式的點擊操作
@@ -229,9 +590,27 @@ def Click_step_by_step(step_array, log_view):
     Returns:
         tuple: (是否成功完成所有步驟, 當前執行到第幾步)
     """
+    # 截圖來源與畫面生產者由整個流程共用，避免每次輪詢重新開啟 mss
+    prepare_template_index(log_view)
+    change_detector = FrameChangeDetector()
+    scheduler = create_poll_scheduler()
+    context = MatchContext()
+    with MSSCaptureSource() as capture_source, \
+            FrameProducer(capture_source, scheduler=scheduler, context=context) as frame_producer:
+        result = _run_windows_steps(step_array, log_view, frame_producer, change_detector)
+    log_view.append_log(change_detector.summary())
+    log_view.append_log(scheduler.summary())
+    log_view.append_log(prefilter_stats.summary())
+    log_view.append_log(context.summary())
+    log_view.append_log(get_template_cache().summary())
+    log_view.append_log(get_location_memory(get_resource_path('cache/last_locations.json')).summary())
+    return result
+
+def _run_windows_steps(step_array, log_view, frame_producer, change_detector):
+    """在同一個畫面生產者下依序執行 Windows 模式的步驟"""
     total_steps = len(step_array)
     for current_step, step in enumerate(step_array, 1):
-        template_path = get_resource_path(step['location'])
+        template_path = get_step_templates(step)
         timeout = step.get('timeout', 30)  
         repeat_clicks = step.get('repeat_clicks', 1)  
         click_interval = step.get('click_interval', 1.0)  
@@ -243,21 +622,43 @@ def Click_step_by_step(step_array, log_view):
         
         print(f"Executing Step {current_step} - repeat_clicks: {repeat_clicks}, click_interval: {click_interval}")  # 調試輸出
         
-        result = detect_and_click_image(
-            template_path=template_path,
-            log_view=log_view,
-            timeout=timeout,
-            is_adb_mode=False,
-            repeat_clicks=repeat_clicks,
-            click_interval=click_interval
-        )
+        if step.get('type') == 'probe':
+            # 像素探針步驟：只檢查幾個像素的顏色
+            result = probe_and_click(
+                template_path=template_path,
+                probes=step.get('probes'),
+                log_view=log_view,
+                timeout=timeout,
+                is_adb_mode=False,
+                repeat_clicks=repeat_clicks,
+                click_interval=click_interval,
+                frame_producer=frame_producer,
+                probe_origin=step.get('probe_origin'),
+                poll_interval=step.get('poll_interval')
+            )
+        else:
+            result = detect_and_click_image(
+                template_path=template_path,
+                log_view=log_view,
+                timeout=timeout,
+                is_adb_mode=False,
+                repeat_clicks=repeat_clicks,
+                click_interval=click_interval,
+                frame_producer=frame_producer,
+                change_detector=change_detector,
+                region=step.get('region'),
+                matcher=step.get('matcher'),
+                color_mode=step.get('color_mode'),
+                feature_fallback=step.get('feature_fallback'),
+                click_all=step.get('click_all'),
+                poll_interval=step.get('poll_interval')
+            )
         
         if result is None:
             log_view.append_log(f"步驟 {current_step} 失敗: 無法找到或點擊 {step['location']}")
             return False, current_step
             
         log_view.append_log(f"步驟 {current_step} 完成")
-        time.sleep(1)
     
     return True, total_steps
 
@@ -268,9 +669,27 @@ def ADB_Click_step_by_step(step_array, log_view):
     Returns:
         tuple: (是否成功完成所有步驟, 當前執行到第幾步)
     """
+    # 截圖來源與畫面生產者由整個流程共用
+    prepare_template_index(log_view)
+    change_detector = FrameChangeDetector()
+    scheduler = create_poll_scheduler()
+    context = MatchContext()
+    with create_adb_capture_source(get_selected_device_id()) as capture_source, \
+            FrameProducer(capture_source, scheduler=scheduler, context=context) as frame_producer:
+        result = _run_adb_steps(step_array, log_view, frame_producer, change_detector)
+    log_view.append_log(change_detector.summary())
+    log_view.append_log(scheduler.summary())
+    log_view.append_log(prefilter_stats.summary())
+    log_view.append_log(context.summary())
+    log_view.append_log(get_template_cache().summary())
+    log_view.append_log(get_location_memory(get_resource_path('cache/last_locations.json')).summary())
+    return result
+
+def _run_adb_steps(step_array, log_view, frame_producer, change_detector):
+    """在同一個畫面生產者下依序執行 ADB 模式的步驟"""
     total_steps = len(step_array)
     for current_step, step in enumerate(step_array, 1):
-        template_path = get_resource_path(step['location'])
+        template_path = get_step_templates(step)
         timeout = step.get('timeout', 30)  # 使用步驟特定的 timeout 設定
         repeat_clicks = step.get('repeat_clicks', 1)     # 獲取重複點擊次數
         click_interval = step.get('click_interval', 1.0)  # 獲取點擊間隔
@@ -280,20 +699,42 @@ def ADB_Click_step_by_step(step_array, log_view):
             f"超時設定: {timeout}秒, 點擊次數: {repeat_clicks}, 間隔: {click_interval}秒"
         )
         
-        result = detect_and_click_image(
-            template_path=template_path,
-            log_view=log_view,
-            timeout=timeout,
-            is_adb_mode=True,
-            repeat_clicks=repeat_clicks,  # 傳遞重複點擊次數
-            click_interval=click_interval  # 傳遞點擊間隔
-        )
+        if step.get('type') == 'probe':
+            # 像素探針步驟：只檢查幾個像素的顏色
+            result = probe_and_click(
+                template_path=template_path,
+                probes=step.get('probes'),
+                log_view=log_view,
+                timeout=timeout,
+                is_adb_mode=True,
+                repeat_clicks=repeat_clicks,
+                click_interval=click_interval,
+                frame_producer=frame_producer,
+                probe_origin=step.get('probe_origin'),
+                poll_interval=step.get('poll_interval')
+            )
+        else:
+            result = detect_and_click_image(
+                template_path=template_path,
+                log_view=log_view,
+                timeout=timeout,
+                is_adb_mode=True,
+                repeat_clicks=repeat_clicks,  # 傳遞重複點擊次數
+                click_interval=click_interval,  # 傳遞點擊間隔
+                frame_producer=frame_producer,
+                change_detector=change_detector,
+                region=step.get('region'),
+                matcher=step.get('matcher'),
+                color_mode=step.get('color_mode'),
+                feature_fallback=step.get('feature_fallback'),
+                click_all=step.get('click_all'),
+                poll_interval=step.get('poll_interval')
+            )
         
         if result is None:
             log_view.append_log(f"步驟 {current_step} 失敗: 無法找到或點擊 {step['location']}")
             return False, current_step
             
         log_view.append_log(f"步驟 {current_step} 完成")
-        time.sleep(1)
     
     return True, total_steps
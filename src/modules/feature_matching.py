@@ -0,0 +1,133 @@
+import threading
+import weakref
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+class FeatureMatcher:
+    """
+    以 ORB 特徵點尋找模板，用於畫面縮放、動畫或部分遮擋導致模板匹配分數不足的情況。
+
+    模板的特徵點與描述子只計算一次並快取；找到的對應點需通過單應性矩陣 (homography)
+    驗證，且投影後的模板外框必須是合理的凸四邊形，才視為找到目標。
+    """
+
+    def __init__(self, nfeatures=1500, ratio=0.75, min_inliers=10, min_inlier_ratio=0.3, cache_size=32):
+        """
+        Args:
+            nfeatures (int): 畫面中最多偵測的特徵點數
+            ratio (float): Lowe ratio test 的門檻
+            min_inliers (int): 單應性矩陣至少需要的內點數
+            min_inlier_ratio (float): 內點佔通過 ratio test 的對應點比例下限
+            cache_size (int): 快取的模板描述子數量
+        """
+        self.ratio = ratio
+        self.min_inliers = min_inliers
+        self.min_inlier_ratio = min_inlier_ratio
+        self.cache_size = cache_size
+        # 遊戲按鈕通常只有數十像素，預設的 31 像素邊界會讓小模板幾乎沒有特徵點
+        self._orb = cv2.ORB_create(nfeatures=nfeatures, edgeThreshold=15, patchSize=15)
+        self._template_orb = cv2.ORB_create(nfeatures=500, edgeThreshold=15, patchSize=15)
+        self._matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        self._cache = OrderedDict()  # id(模板) -> (模板弱參照, 特徵點座標, 描述子)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _gray(image):
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    def template_features(self, template):
+        """
+        取得模板的特徵點座標與描述子（快取）
+
+        Returns:
+            tuple: (特徵點座標 Nx2 陣列, 描述子)，特徵點太少時描述子為 None
+        """
+        key = id(template)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0]() is template:
+                self._cache.move_to_end(key)
+                return entry[1], entry[2]
+
+        keypoints, descriptors = self._template_orb.detectAndCompute(self._gray(template), None)
+        points = np.float32([keypoint.pt for keypoint in keypoints]).reshape(-1, 2)
+
+        with self._lock:
+            self._cache[key] = (weakref.ref(template), points, descriptors)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return points, descriptors
+
+    def detect_frame(self, image):
+        """
+        偵測畫面的特徵點，同一張畫面匹配多個模板時可共用
+
+        Returns:
+            tuple: (特徵點座標 Nx2 陣列, 描述子)
+        """
+        keypoints, descriptors = self._orb.detectAndCompute(self._gray(image), None)
+        return np.float32([keypoint.pt for keypoint in keypoints]).reshape(-1, 2), descriptors
+
+    def match(self, image, template, frame_features=None):
+        """
+        在畫面中尋找模板
+
+        Args:
+            image (numpy.ndarray): 畫面
+            template (numpy.ndarray): 模板圖片
+            frame_features (tuple): detect_frame() 的結果，None 表示重新偵測
+
+        Returns:
+            tuple or None: (內點比例, 模板中心在畫面中的座標 (x, y))，驗證失敗時返回 None
+        """
+        template_points, template_descriptors = self.template_features(template)
+        if template_descriptors is None or len(template_points) < self.min_inliers:
+            return None
+        frame_points, frame_descriptors = frame_features or self.detect_frame(image)
+        if frame_descriptors is None or len(frame_points) < self.min_inliers:
+            return None
+
+        pairs = self._matcher.knnMatch(template_descriptors, frame_descriptors, k=2)
+        good = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance]
+        if len(good) < self.min_inliers:
+            return None
+
+        source = template_points[[m.queryIdx for m in good]].reshape(-1, 1, 2)
+        destination = frame_points[[m.trainIdx for m in good]].reshape(-1, 1, 2)
+        homography, mask = cv2.findHomography(source, destination, cv2.RANSAC, 5.0)
+        if homography is None:
+            return None
+        inliers = int(mask.sum())
+        inlier_ratio = inliers / len(good)
+        if inliers < self.min_inliers or inlier_ratio < self.min_inlier_ratio:
+            return None
+
+        height, width = template.shape[:2]
+        corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]]).reshape(-1, 1, 2)
+        projected = cv2.perspectiveTransform(corners, homography).reshape(-1, 2)
+        if not self._plausible(projected, width * height):
+            return None
+        center_x, center_y = projected.mean(axis=0)
+        return inlier_ratio, (int(round(center_x)), int(round(center_y)))
+
+    @staticmethod
+    def _plausible(quad, template_area):
+        """投影後的外框需為凸四邊形、方向未翻轉，且面積與模板相差不超過 4 倍"""
+        if not cv2.isContourConvex(quad.astype(np.float32).reshape(-1, 1, 2)):
+            return False
+        # 以鞋帶公式計算有號面積，負值表示鏡像翻轉
+        x, y = quad[:, 0], quad[:, 1]
+        area = 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+        return template_area / 4 <= area <= template_area * 4
+
+_shared_matcher = None
+_shared_matcher_lock = threading.Lock()
+
+def get_feature_matcher():
+    """取得共用的 FeatureMatcher（模板描述子快取在所有步驟間共用）"""
+    global _shared_matcher
+    with _shared_matcher_lock:
+        if _shared_matcher is None:
+            _shared_matcher = FeatureMatcher()
+        return _shared_matcher
@@ -5,10 +5,16 @@ import pyautogui
 import subprocess
 import cv2
 import numpy as np
-from PIL import Image
 import time
 from log_view import LogView
 from PySide6.QtWidgets import QMessageBox,QInputDialog
+from capture import ADBScreencapSource, ADBStreamCaptureSource, FrameChangeDetector, FrameViews, MatchContext
+from adb_session import ADBShellCaptureSource, get_shell_session, close_all_sessions
+from adb_client import get_client
+from template_cache import load_template
+from template_matching import get_matcher
+from polling import PollScheduler
+from mouse import MotionProfile
 
 selected_device_id = None  # 全局變量來存儲選擇的設備 ID
 
@@ -56,7 +62,17 @@ def initialize_setting_file():
     
     default_settings = {
         "detect_mode": "Windows",
-        "adb_ip_address": ""
+        "adb_ip_address": "",
+        "adb_capture_format": "raw",  # raw: 未壓縮 framebuffer, png: screencap -p, stream: screenrecord 串流, shell: 常駐 shell
+        "match_color_mode": "color",  # color: BGR 彩色匹配, gray: 灰階匹配（約快 3 倍）, gray_verify: 灰階匹配後以顏色確認匹配位置
+        "template_matcher": "auto",  # auto: 依成本自動選擇 full/fft/prefilter, full: matchTemplate, fft: 頻域匹配, pyramid: 金字塔匹配, tiled: 分塊平行匹配, prefilter: 排除單色區域後只匹配其餘區塊
+        "match_workers": 0,  # tiled 匹配使用的執行緒數，0 表示 CPU 核心數
+        "multi_scale_matching": True,  # 依設備解析度自動校正模板縮放比例，結果存於 cache/scale_calibration.json
+        "feature_fallback_polls": 0,  # 模板匹配連續失敗幾次後改用 ORB 特徵匹配，0 表示不使用（可在各步驟覆寫）
+        "poll_min_interval": 0.05,  # 點擊後或畫面變化時的輪詢間隔(秒)
+        "poll_max_interval": 1.0,  # 畫面靜止時逐漸放慢到的最長輪詢間隔(秒)
+        "mouse_motion": "instant",  # 點擊前的滑鼠移動方式 instant: 直接移動, linear: 等速移動, human: 彎曲路徑並先加速後減速
+        "mouse_move_duration": 0.2  # linear、human 的移動時間(秒)
     }
     
     # 如果文件不存在或為空，直接創建新文件
@@ -97,6 +113,44 @@ def get_resource_path(relative_path):
     base_path = getattr(sys, '_MEIPASS', os.path.abspath("."))
     return os.path.join(base_path, relative_path)
 
+def get_setting(key, default=None):
+    """從 setting.json 讀取單一設定值，讀取失敗時返回預設值"""
+    setting_path = get_resource_path('cache/setting.json')
+    try:
+        with open(setting_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(key, default)
+    except Exception:
+        return default
+
+def get_selected_device_id():
+    """返回目前選擇的 ADB 設備 ID"""
+    return selected_device_id
+
+def create_adb_capture_source(device_id=None):
+    """依照 setting.json 的 adb_capture_format 建立 ADB 截圖來源"""
+    capture_format = get_setting('adb_capture_format', 'raw')
+    if capture_format == 'stream':
+        return ADBStreamCaptureSource(device_id)
+    if capture_format == 'shell':
+        return ADBShellCaptureSource(device_id)
+    return ADBScreencapSource(device_id, raw=capture_format != 'png')
+
+def create_poll_scheduler(poll_interval=None):
+    """
+    依照 setting.json 的 poll_min_interval、poll_max_interval 建立輪詢排程
+
+    Args:
+        poll_interval (list): 步驟指定的 [最短, 最長] 輪詢間隔(秒)，None 表示使用全域設定
+    """
+    scheduler = PollScheduler(get_setting('poll_min_interval', 0.05), get_setting('poll_max_interval', 1.0))
+    if poll_interval:
+        scheduler.configure(*poll_interval)
+    return scheduler
+
+def create_motion_profile():
+    """依照 setting.json 的 mouse_motion、mouse_move_duration 建立滑鼠移動方式"""
+    return MotionProfile(get_setting('mouse_motion', 'instant'), get_setting('mouse_move_duration', 0.2))
+
 def load_steps_from_json(json_path):
     """
     從 JSON 檔案載入步驟資訊
@@ -123,13 +177,17 @@ def load_steps_from_json(json_path):
                 
                 # 處理新舊格式
                 if isinstance(step_data, dict):
-                    location = step_data['location']
+                    # any_of 步驟可以只有 locations，以第一張圖片作為 location
+                    location = step_data.get('location') or step_data['locations'][0]
                     timeout = step_data.get('timeout', 30)
+                    settings = step_data  # 保留點擊設定、搜尋範圍等其他步驟設定
                 else:
                     location = step_data
                     timeout = 30
+                    settings = {}
                     
                 step_array.append({
+                    **settings,
                     'step': step_num,
                     'location': location,
                     'timeout': timeout
@@ -210,28 +268,37 @@ def match_template(template_path, log_view, confidence=0.9, timeout=30):
         log_view.append_log(f"檔案不存在: {template_path}")
         return None
 
-    def read_image_with_pil(image_path):
-        try:
-            pil_image = Image.open(image_path)
-            return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        except Exception as e:
-            log_view.append_log(f"無法讀取影像: {e}")
-            return None
+    # 模板從共用快取取得，輪詢時不再重複讀取硬碟
+    try:
+        template = load_template(template_path)
+    except Exception as e:
+        log_view.append_log(f"無法讀取影像: {e}")
+        log_view.append_log("無法讀取模板圖片")
+        return None
 
+    match = get_matcher(get_setting('template_matcher'), get_setting('match_color_mode', 'color'))
+    change_detector = FrameChangeDetector()
+    scheduler = create_poll_scheduler()
+    context = MatchContext()  # 轉換後的畫面與匹配結果在輪詢之間重複使用同一塊記憶體
     start_time = time.time()
 
     while time.time() - start_time < timeout:
-        screenshot = pyautogui.screenshot()  # 截取螢幕
-        screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)  # 將PIL格式轉為OpenCV格式
-        template = read_image_with_pil(template_path)  # 使用 PIL 讀取模板圖像
-
-        if template is None:
-            log_view.append_log("無法讀取模板圖片")
-            return None
+        poll_started = time.monotonic()
+        screenshot = np.asarray(pyautogui.screenshot())  # 截取螢幕
+        # 將PIL格式轉為OpenCV格式
+        screenshot = cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGR, dst=context.buffer('screenshot', screenshot.shape))
+
+        if not change_detector.has_changed(screenshot):
+            # 畫面與上次匹配時相同，放慢輪詢
+            scheduler.on_static()
+            scheduler.wait(poll_started)
+            continue
+        scheduler.on_change()
 
         # 執行模板匹配
-        result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        max_val, max_loc = match(screenshot, template, views=FrameViews(screenshot, context))
+        change_detector.mark_matched()
+        context.end_poll()
 
         # 檢查匹配度是否符合要求
         if max_val >= confidence:
@@ -241,20 +308,25 @@ def match_template(template_path, log_view, confidence=0.9, timeout=30):
             center_y = max_loc[1] + template_height // 2
             log_view.append_log(f"找到匹配位置: {max_loc}, 匹配值: {max_val}, 中心點: ({center_x}, {center_y})")
 
-            # 平滑移動鼠標到中心點並點擊
-            pyautogui.moveTo(center_x, center_y, duration=0.5)  # duration 控制移動速度
+            # 依設定的移動方式把鼠標移到中心點
+            create_motion_profile().move(center_x, center_y)
             return (center_x, center_y)  # 返回匹配位置的中心點座標
 
         # 打印當前匹配的準確值
         log_view.append_log(f"當前匹配準確值：{max_val}")
-        # 每秒檢測一次
-        time.sleep(1)
+        scheduler.wait(poll_started)
 
     log_view.append_log("未找到匹配的影像")
     return None
 
-def set_adb_connection(log_view, parent_widget):
+def select_device(device_id):
+    """切換目前使用的 ADB 設備，設備改變時關閉舊設備的常駐 shell 連線"""
     global selected_device_id
+    if device_id != selected_device_id:
+        close_all_sessions()
+    selected_device_id = device_id
+
+def set_adb_connection(log_view, parent_widget):
     
     # 從 setting.json 讀取已保存的 IP 地址
     setting_path = get_resource_path('cache/setting.json')
@@ -265,10 +337,8 @@ def set_adb_connection(log_view, parent_widget):
             saved_ip = settings.get('adb_ip_address')
 
     def get_devices():
-        devices_output = subprocess.check_output('adb devices', shell=True).decode('utf-8')
-        # 過濾掉包含 "List" 的行，並只取有 "device" 的設備
-        return [line.split()[0] for line in devices_output.splitlines() 
-                if 'device' in line and 'List' not in line]
+        # 直接向 ADB server 查詢，只取狀態為 device 的設備
+        return [serial for serial, state in get_client().devices() if state == 'device']
 
     try:
         # 第一次嘗試獲取設備
@@ -279,12 +349,7 @@ def set_adb_connection(log_view, parent_widget):
             default_ports = ['5555', '16384', '7555', '21503', '62001']
             for port in default_ports:
                 try:
-                    subprocess.check_output(
-                        f'adb connect 127.0.0.1:{port}', 
-                        shell=True, 
-                        stderr=subprocess.STDOUT,
-                        timeout=5
-                    )
+                    get_client().connect(f'127.0.0.1:{port}', timeout=5)
                 except:
                     continue
             
@@ -295,11 +360,12 @@ def set_adb_connection(log_view, parent_widget):
         if not devices:
             log_view.append_log("未找到設備，正在重啟 ADB 服務...")
             try:
-                # 關閉 ADB 服務
-                subprocess.run('adb kill-server', shell=True, check=True)
+                # 關閉 ADB 服務，原本的 shell 連線也會跟著中斷
+                close_all_sessions()
+                get_client().kill_server()
                 time.sleep(2)  # 等待服務完全關閉
                 # 啟動 ADB 服務
-                subprocess.run('adb start-server', shell=True, check=True)
+                get_client().start_server()
                 time.sleep(2)  # 等待服務啟動
                 # 再次嘗試獲取設備
                 devices = get_devices()
@@ -314,17 +380,12 @@ def set_adb_connection(log_view, parent_widget):
         if saved_ip and saved_ip in devices:
             try:
                 # 嘗試連接保存的設備
-                output = subprocess.check_output(
-                    f'adb connect {saved_ip}', 
-                    shell=True, 
-                    stderr=subprocess.STDOUT,
-                    timeout=30
-                )
-                log_view.append_log(output.decode('utf-8'))
+                output = get_client().connect(saved_ip, timeout=30)
+                log_view.append_log(output)
 
                 if saved_ip in get_devices():
                     log_view.append_log(f"成功連接到已保存的 ADB 設備: {saved_ip}")
-                    selected_device_id = saved_ip
+                    select_device(saved_ip)
                     return saved_ip
             except Exception as e:
                 log_view.append_log(f"連接已保存的 ADB 設備時發生錯誤: {str(e)}")
@@ -342,18 +403,13 @@ def set_adb_connection(log_view, parent_widget):
         if ok and text:
             try:
                 # 嘗試連接選擇的設備
-                output = subprocess.check_output(
-                    f'adb connect {text}', 
-                    shell=True, 
-                    stderr=subprocess.STDOUT,
-                    timeout=30
-                )
-                log_view.append_log(output.decode('utf-8'))
+                output = get_client().connect(text, timeout=30)
+                log_view.append_log(output)
 
                 # 確認連接是否成功
                 if text in get_devices():
                     log_view.append_log(f"成功連接到 ADB: {text}")
-                    selected_device_id = text
+                    select_device(text)
 
                     # 保存新的設備到 setting.json
                     with open(setting_path, 'r', encoding='utf-8') as f:
@@ -381,18 +437,16 @@ def set_adb_connection(log_view, parent_widget):
 def get_screenshot_path():
     return get_resource_path('cache/screenshot.png')
 
-# 使用 ADB 截圖
-def adb_screenshot():
+# 使用 ADB 截圖，直接在記憶體中解碼，不寫入暫存檔
+def adb_screenshot(capture_source=None):
     global selected_device_id
     if selected_device_id:
-        with open(get_screenshot_path(), 'wb') as f:
-            subprocess.run(
-                ['adb', '-s', selected_device_id, 'exec-out', 'screencap', '-p'],
-                stdout=f,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+        if capture_source is None:
+            capture_source = create_adb_capture_source(selected_device_id)
+        return capture_source.grab()
     else:
         print("未選擇設備，無法截圖")
+        return None
 
 def ADB_calculate_and_tap_center(location, template_shape, log_view):
     """
@@ -408,10 +462,7 @@ def ADB_calculate_and_tap_center(location, template_shape, log_view):
 
     button_center_x = location[0] + template_shape[1] // 2
     button_center_y = location[1] + template_shape[0] // 2
-    subprocess.run(
-        ['adb', '-s', selected_device_id, 'shell', 'input', 'tap', str(button_center_x), str(button_center_y)],
-        creationflags=subprocess.CREATE_NO_WINDOW
-    )
+    get_shell_session(selected_device_id).tap(button_center_x, button_center_y)
 
 def ADB_match_template(step_array, log_view, confidence=0.9, timeout=30):
     global selected_device_id
@@ -419,45 +470,61 @@ def ADB_match_template(step_array, log_view, confidence=0.9, timeout=30):
         log_view.append_log("未選擇設備，無法進行模板匹配")
         return None, None
 
-    for template_path in step_array:
-        # 確保 template_path 是一個有效的相對路徑
-        if template_path.startswith('_internal\\'):
-            template_path = template_path[len('_internal\\'):]
-
-        full_template_path = get_resource_path(template_path)
-        if not os.path.exists(full_template_path):
-            log_view.append_log(f"模板文件不存在: {full_template_path}")
-            continue
-
-        start_time = time.time()  # 獲取當前時間
+    change_detector = FrameChangeDetector()
+    scheduler = create_poll_scheduler()
+    context = MatchContext()
+    match = get_matcher(get_setting('template_matcher'), get_setting('match_color_mode', 'color'))
+
+    # 截圖來源在所有模板間共用
+    with create_adb_capture_source(selected_device_id) as capture_source:
+        for template_path in step_array:
+            # 確保 template_path 是一個有效的相對路徑
+            if template_path.startswith('_internal\\'):
+                template_path = template_path[len('_internal\\'):]
+
+            full_template_path = get_resource_path(template_path)
+            if not os.path.exists(full_template_path):
+                log_view.append_log(f"模板文件不存在: {full_template_path}")
+                continue
 
-        # 使用 PIL 讀取圖片，然後轉換為 OpenCV 格式
-        try:
-            pil_image = Image.open(full_template_path)
-            template = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        except Exception as e:
-            log_view.append_log(f"無法讀取圖片: {full_template_path}, 錯誤: {e}")
-            continue
+            start_time = time.time()  # 獲取當前時間
+            change_detector.reset()
+            scheduler.on_action()  # 新的模板，先以最短間隔輪詢
 
-        while time.time() - start_time < timeout:  # 當前時間 - 開始時間 < 超時時間
+            # 從共用的模板快取取得圖片，重複執行時不會再讀取硬碟
             try:
-                adb_screenshot()
-                screenshot = cv2.imread(get_screenshot_path(), cv2.IMREAD_COLOR)
-                if screenshot is None:
-                    log_view.append_log("無法讀取截圖")
-                    continue
-
-                result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-                log_view.append_log(f"匹配值: {max_val}")
-
-                if max_val >= confidence:
-                    log_view.append_log(f"找到匹配位置: {max_loc}")
-                    return max_loc, template.shape  # 返回位置和模板大小
+                template = load_template(full_template_path)
             except Exception as e:
-                log_view.append_log(f"圖像識別中: {e}")  # 打印識別錯誤
+                log_view.append_log(f"無法讀取圖片: {full_template_path}, 錯誤: {e}")
+                continue
 
-            time.sleep(1)  # 等待1秒後再次嘗試
+            while time.time() - start_time < timeout:  # 當前時間 - 開始時間 < 超時時間
+                poll_started = time.monotonic()
+                try:
+                    screenshot = adb_screenshot(capture_source)
+                    if screenshot is None:
+                        log_view.append_log("無法讀取截圖")
+                        continue
+
+                    if not change_detector.has_changed(screenshot):
+                        # 畫面與上次匹配時相同，不需要重新匹配，放慢輪詢
+                        scheduler.on_static()
+                        scheduler.wait(poll_started)
+                        continue
+                    scheduler.on_change()
+
+                    max_val, max_loc = match(screenshot, template, views=FrameViews(screenshot, context))
+                    change_detector.mark_matched()
+                    context.end_poll()
+                    log_view.append_log(f"匹配值: {max_val}")
+
+                    if max_val >= confidence:
+                        log_view.append_log(f"找到匹配位置: {max_loc}")
+                        return max_loc, template.shape  # 返回位置和模板大小
+                except Exception as e:
+                    log_view.append_log(f"圖像識別中: {e}")  # 打印識別錯誤
+
+                scheduler.wait(poll_started)
 
     log_view.append_log("未找到匹配的影像")
     return None, None  # 超過等待時間，返回 None
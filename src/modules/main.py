@@ -3,6 +3,7 @@ from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QThread, Signal
 from PySide6.QtGui import QPalette, QColor, Qt
 from main_view import MainWindow
+from adb_session import close_all_sessions
 from functions import (
     ensure_cache_directory, 
     ensure_sv_json, 
@@ -117,5 +118,7 @@ if __name__ == "__main__":
     worker.finished.connect(lambda: main_window.log_view.append_log("點擊操作完成"))
     # 連接主窗口的 start_signal 到 Worker 的 start 方法
     main_window.start_signal.connect(worker.start)
+    # 程式結束時關閉所有常駐的 adb shell 連線
+    app.aboutToQuit.connect(close_all_sessions)
     # 在主執行緒中運行應用程式
     sys.exit(app.exec()) 
\ No newline at end of file
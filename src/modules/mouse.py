@@ -0,0 +1,118 @@
+import math
+import random
+import time
+import pyautogui
+
+MOTION_PROFILES = ('instant', 'linear', 'human')
+
+# 人性化移動：每秒更新游標位置的次數，以及路徑彎曲程度（相對於移動距離）
+HUMAN_MOVE_RATE = 120
+HUMAN_CURVE = 0.15
+
+def sleep_until(deadline):
+    """
+    等到 time.monotonic() 到達 deadline
+
+    大部分時間以 time.sleep 等待，最後約 2 毫秒改為忙碌等待，
+    避免 sleep 的解析度讓每次點擊的時間點偏移。
+    """
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if remaining > 0.002:
+            time.sleep(remaining - 0.001)
+
+class MotionProfile:
+    """
+    滑鼠移動方式。
+
+    instant 直接移到目標位置；linear 以固定時間等速移動；
+    human 沿著隨機彎曲的路徑、先加速後減速移動，時間在 duration 上下 25% 內變化。
+    """
+
+    def __init__(self, kind='instant', duration=0.2):
+        """
+        Args:
+            kind (str): 'instant'、'linear' 或 'human'，未知的值視為 'instant'
+            duration (float): linear、human 的移動時間(秒)
+        """
+        self.kind = kind if kind in MOTION_PROFILES else 'instant'
+        self.duration = max(0.0, float(duration))
+
+    def move(self, x, y):
+        """把游標移到 (x, y)，移動過程中不會觸發 pyautogui.PAUSE 的額外等待"""
+        if self.kind == 'linear' and self.duration > 0:
+            pyautogui.moveTo(x, y, self.duration, pyautogui.linear, _pause=False)
+        elif self.kind == 'human' and self.duration > 0:
+            self._move_human(x, y)
+        else:
+            pyautogui.moveTo(x, y, _pause=False)
+
+    def _move_human(self, x, y):
+        start_x, start_y = pyautogui.position()
+        distance = math.hypot(x - start_x, y - start_y)
+        if distance < 1:
+            pyautogui.moveTo(x, y, _pause=False)
+            return
+        duration = self.duration * random.uniform(0.75, 1.25)
+        # 二次貝茲曲線：控制點位於中點的垂直方向上，偏移量隨移動距離變化
+        offset = random.uniform(-HUMAN_CURVE, HUMAN_CURVE) * distance
+        control_x = (start_x + x) / 2 - (y - start_y) / distance * offset
+        control_y = (start_y + y) / 2 + (x - start_x) / distance * offset
+        steps = max(2, int(duration * HUMAN_MOVE_RATE))
+        started = time.monotonic()
+        for step in range(1, steps):
+            t = pyautogui.easeInOutQuad(step / steps)
+            point_x = (1 - t) ** 2 * start_x + 2 * (1 - t) * t * control_x + t ** 2 * x
+            point_y = (1 - t) ** 2 * start_y + 2 * (1 - t) * t * control_y + t ** 2 * y
+            pyautogui.moveTo(int(round(point_x)), int(round(point_y)), _pause=False)
+            sleep_until(started + duration * step / steps)
+        pyautogui.moveTo(x, y, _pause=False)
+
+class ClickDispatcher:
+    """
+    連續點擊同一個位置：移動一次游標後送出整組點擊。
+
+    每次點擊的時間點以第一次點擊為基準，依 time.monotonic() 排定為 start + i × interval，
+    誤差不會隨點擊次數累積；點擊時不觸發 pyautogui.PAUSE 的額外等待。
+    """
+
+    def __init__(self, motion=None, click=None):
+        """
+        Args:
+            motion (MotionProfile): 點擊前的移動方式，None 表示直接移動
+            click (function): 簽名為 (x, y) 的點擊函式，None 表示 pyautogui 左鍵點擊
+        """
+        self.motion = motion or MotionProfile()
+        self.click = click or (lambda x, y: pyautogui.click(x, y, _pause=False))
+        self.last_times = []  # 最近一次 burst 每次點擊的 time.monotonic()
+
+    def burst(self, x, y, count=1, interval=0.0):
+        """
+        移動到 (x, y) 並點擊 count 次
+
+        Args:
+            x (int): 螢幕 X 座標
+            y (int): 螢幕 Y 座標
+            count (int): 點擊次數
+            interval (float): 相鄰兩次點擊的間隔(秒)
+
+        Returns:
+            int: 完成的點擊次數；點擊失敗時拋出例外，已完成的次數記錄在 last_times
+        """
+        self.last_times = []
+        self.motion.move(x, y)
+        started = time.monotonic()
+        for index in range(count):
+            sleep_until(started + index * interval)
+            self.click(x, y)
+            self.last_times.append(time.monotonic())
+        return len(self.last_times)
+
+    def max_drift(self, interval):
+        """最近一次 burst 的點擊時間與排定時間的最大差距(秒)"""
+        if not self.last_times:
+            return 0.0
+        started = self.last_times[0]
+        return max(abs(clicked - started - index * interval) for index, clicked in enumerate(self.last_times))
@@ -0,0 +1,84 @@
+import numpy as np
+
+DEFAULT_TOLERANCE = 16
+
+class PixelProbe:
+    """
+    以少數像素的顏色確認畫面狀態，取代整張畫面的模板匹配。
+
+    每個探針為 (x, y, 顏色, 容許值)：座標相對於模板圖片左上角，顏色為 [R, G, B]，
+    三個通道與畫面的差異都不超過容許值才算符合。所有探針以 NumPy 索引一次取出並比較。
+    """
+
+    def __init__(self, probes):
+        """
+        Args:
+            probes (list): [[x, y, [R, G, B], 容許值], ...]，容許值可省略
+        """
+        if not probes:
+            raise ValueError("至少需要一個探針")
+        self.points = np.array([[int(probe[0]), int(probe[1])] for probe in probes], dtype=np.intp)
+        # 畫面為 BGR，顏色先轉為 BGR 以便直接比較
+        self.colors = np.array([list(probe[2])[::-1] for probe in probes], dtype=np.int16)
+        self.tolerances = np.array(
+            [probe[3] if len(probe) > 3 else DEFAULT_TOLERANCE for probe in probes], dtype=np.int16
+        )
+
+    def bounds(self, origin, scale=1.0):
+        """
+        探針在完整畫面中涵蓋的範圍，可作為只擷取這一小塊的搜尋範圍
+
+        Args:
+            origin (tuple): 模板左上角在完整畫面中的座標
+            scale (float): 模板的縮放比例
+
+        Returns:
+            list: [x, y, 寬, 高]
+        """
+        points = self.screen_points(origin, scale)
+        left, top = points.min(axis=0)
+        right, bottom = points.max(axis=0)
+        return [int(left), int(top), int(right - left + 1), int(bottom - top + 1)]
+
+    def screen_points(self, origin, scale=1.0):
+        """探針在完整畫面中的座標，N x 2 (x, y)"""
+        points = np.rint(self.points * scale).astype(np.intp) if scale != 1.0 else self.points
+        return points + np.array(origin, dtype=np.intp)
+
+    def check(self, image, origin, image_origin=(0, 0), scale=1.0):
+        """
+        檢查畫面上的探針是否都符合
+
+        Args:
+            image (numpy.ndarray): BGR 畫面（可為完整畫面的一部分）
+            origin (tuple): 模板左上角在完整畫面中的座標
+            image_origin (tuple): image 左上角在完整畫面中的座標
+            scale (float): 模板的縮放比例
+
+        Returns:
+            int: 不符合的探針數，0 表示全部符合；探針超出畫面時視為不符合
+        """
+        points = self.screen_points(origin, scale) - np.array(image_origin, dtype=np.intp)
+        xs, ys = points[:, 0], points[:, 1]
+        inside = (xs >= 0) & (ys >= 0) & (xs < image.shape[1]) & (ys < image.shape[0])
+        pixels = image[ys[inside], xs[inside]].astype(np.int16)
+        matched = (np.abs(pixels - self.colors[inside]) <= self.tolerances[inside, None]).all(axis=1)
+        return len(points) - int(np.count_nonzero(matched))
+
+def sample_probes(image, points, tolerance=DEFAULT_TOLERANCE):
+    """
+    從模板圖片取樣探針的顏色
+
+    Args:
+        image (numpy.ndarray): BGR 模板圖片
+        points (list): 模板上的座標 [(x, y), ...]
+        tolerance (int): 每個探針的容許值
+
+    Returns:
+        list: [[x, y, [R, G, B], 容許值], ...]
+    """
+    probes = []
+    for x, y in points:
+        blue, green, red = (int(value) for value in image[int(y), int(x)][:3])
+        probes.append([int(x), int(y), [red, green, blue], int(tolerance)])
+    return probes
@@ -0,0 +1,98 @@
+import threading
+import time
+
+class PollScheduler:
+    """
+    自適應的輪詢間隔：取代固定的 time.sleep。
+
+    點擊後或畫面有變化時以最短間隔輪詢，畫面靜止時每次乘上 backoff 逐漸放慢，
+    最長不超過 max_interval。on_action()、on_change() 會立即喚醒正在 wait() 的執行緒，
+    例如 FrameProducer 在點擊後馬上擷取下一張畫面，不必等完原本較長的間隔。
+    """
+
+    def __init__(self, min_interval=0.05, max_interval=1.0, backoff=1.5):
+        """
+        Args:
+            min_interval (float): 最短輪詢間隔(秒)
+            max_interval (float): 最長輪詢間隔(秒)
+            backoff (float): 畫面靜止時間隔的放大倍率
+        """
+        self.backoff = backoff
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._interval = min_interval
+        self._wake = threading.Event()
+        self.actions = 0       # on_action() 的次數
+        self.static_polls = 0  # 畫面靜止而放慢的次數
+        self.waited = 0.0      # wait() 實際等待的總秒數
+
+    @property
+    def interval(self):
+        """目前的輪詢間隔(秒)"""
+        return self._interval
+
+    def configure(self, min_interval=None, max_interval=None):
+        """
+        設定步驟的輪詢間隔範圍，並回到最短間隔
+
+        Args:
+            min_interval (float): 最短間隔(秒)，None 表示不變
+            max_interval (float): 最長間隔(秒)，None 表示不變
+        """
+        if min_interval is not None:
+            self.min_interval = max(0.0, float(min_interval))
+        if max_interval is not None:
+            self.max_interval = float(max_interval)
+        self.max_interval = max(self.max_interval, self.min_interval)
+        self._set_interval(self.min_interval)
+
+    def _set_interval(self, interval):
+        shorter = interval < self._interval
+        self._interval = interval
+        if shorter:
+            self._wake.set()
+
+    def on_action(self):
+        """剛執行點擊等操作，畫面即將變化：回到最短間隔並喚醒等待中的執行緒"""
+        self.actions += 1
+        self._interval = self.min_interval
+        self._wake.set()
+
+    def on_change(self):
+        """畫面有變化：回到最短間隔"""
+        self._set_interval(self.min_interval)
+
+    def on_static(self):
+        """畫面與上次相同：放慢輪詢"""
+        self.static_polls += 1
+        self._set_interval(min(self.max_interval, max(self._interval, 0.001) * self.backoff))
+
+    def wake(self):
+        """立即結束目前的 wait()，例如停止擷取時"""
+        self._wake.set()
+
+    def wait(self, since=None):
+        """
+        等到距離 since 經過目前的輪詢間隔，期間被喚醒時提早返回
+
+        Args:
+            since (float): 上次輪詢開始的 time.monotonic() 時間，None 表示現在
+        """
+        started = time.monotonic()
+        deadline = (started if since is None else since) + self._interval
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                if self._wake.wait(remaining):
+                    self._wake.clear()
+                    return
+        finally:
+            self.waited += time.monotonic() - started
+
+    def summary(self):
+        """返回輪詢統計的說明文字"""
+        return (f"輪詢間隔 {self.min_interval:.2f}~{self.max_interval:.2f} 秒："
+                f"操作後加速 {self.actions} 次，畫面靜止放慢 {self.static_polls} 次，"
+                f"共等待 {self.waited:.1f} 秒")
@@ -7,7 +7,7 @@ from PySide6.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QLabel, QGraphicsView, QGraphicsScene,
     QMenu, QGraphicsLineItem, QGraphicsPixmapItem, QGraphicsPolygonItem,
     QListWidget, QPushButton, QMessageBox, QInputDialog, QLineEdit, QDialog,
-    QDialogButtonBox, QSpinBox, QDoubleSpinBox
+    QDialogButtonBox, QSpinBox, QDoubleSpinBox, QCheckBox, QListWidgetItem
 )
 from PySide6.QtGui import (
     QPixmap, QDragEnterEvent, QDropEvent, QFont, QWheelEvent,
@@ -129,6 +129,40 @@ class PixmapNode(QGraphicsPixmapItem):
         event.accept()
         super().mousePressEvent(event)
 
+class ProbePickerLabel(QLabel):
+    """顯示模板圖片，點擊時以模板圖片上的座標呼叫 on_pick(x, y)"""
+    def __init__(self, pixmap, on_pick, max_side=480, parent=None):
+        super().__init__(parent)
+        self.source = pixmap
+        self.on_pick = on_pick
+        # 大圖縮小顯示，小按鈕放大顯示，方便點選
+        self.factor = max_side / max(pixmap.width(), pixmap.height(), 1)
+        self.factor = min(self.factor, 8.0)
+        self.setCursor(Qt.CrossCursor)
+        self.draw_points([])
+
+    def draw_points(self, points):
+        """重新繪製圖片並標示已選的探針位置"""
+        scaled = self.source.scaled(
+            int(self.source.width() * self.factor), int(self.source.height() * self.factor),
+            Qt.KeepAspectRatio, Qt.FastTransformation
+        )
+        painter = QPainter(scaled)
+        painter.setPen(QPen(QColor(255, 0, 255), 2))
+        for x, y in points:
+            center = QPointF((x + 0.5) * self.factor, (y + 0.5) * self.factor)
+            painter.drawEllipse(center, 5, 5)
+        painter.end()
+        self.setPixmap(scaled)
+        self.setFixedSize(scaled.size())
+
+    def mousePressEvent(self, event):
+        x = int(event.position().x() / self.factor)
+        y = int(event.position().y() / self.factor)
+        if 0 <= x < self.source.width() and 0 <= y < self.source.height():
+            self.on_pick(x, y)
+        event.accept()
+
 class ProcessView(QWidget):
     def __init__(self, parent=None, log_view=None):
         super(ProcessView, self).__init__(parent)
@@ -244,6 +278,38 @@ class ProcessView(QWidget):
             repeat_action = click_settings_menu.addAction("重複點擊")
             repeat_action.triggered.connect(lambda: self.show_repeat_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
             
+            # 搜尋範圍設定
+            region_action = properties_menu.addAction("搜尋範圍")
+            region_action.triggered.connect(lambda: self.show_region_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
+            # 任一圖片出現即點擊
+            any_of_action = properties_menu.addAction("替代圖片")
+            any_of_action.triggered.connect(lambda: self.show_any_of_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
+            # 像素探針設定
+            probe_action = properties_menu.addAction("像素探針")
+            probe_action.triggered.connect(lambda: self.show_probe_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
+            # 匹配方式設定
+            matcher_action = properties_menu.addAction("匹配方式")
+            matcher_action.triggered.connect(lambda: self.show_matcher_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
+            # 顏色模式設定
+            color_mode_action = properties_menu.addAction("顏色模式")
+            color_mode_action.triggered.connect(lambda: self.show_color_mode_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
+            # 特徵匹配備援設定
+            feature_action = properties_menu.addAction("特徵匹配備援")
+            feature_action.triggered.connect(lambda: self.show_feature_fallback_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
+            # 點擊所有符合位置設定
+            click_all_action = click_settings_menu.addAction("點擊所有位置")
+            click_all_action.triggered.connect(lambda: self.show_click_all_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
+            # 輪詢間隔設定
+            poll_action = click_settings_menu.addAction("輪詢間隔")
+            poll_action.triggered.connect(lambda: self.show_poll_interval_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
+            
             # 圖片詳細資料
             detail_action = properties_menu.addAction("圖片詳細資料")
             detail_action.triggered.connect(lambda: self.show_detail_settings(item if isinstance(item, PixmapNode) else selected_items[0]))
@@ -421,6 +487,361 @@ class ProcessView(QWidget):
             if self.log_view:
                 self.log_view.append_log(f"更新點擊設定時發生錯誤：{str(e)}")
 
+    def show_region_settings(self, item: PixmapNode):
+        """顯示搜尋範圍設定，只在畫面的指定範圍內尋找圖片"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("搜尋範圍設定")
+        layout = QVBoxLayout()
+        
+        region = getattr(item, 'region', None)
+        
+        enable_checkbox = QCheckBox("只搜尋指定範圍（座標相對於完整截圖左上角）")
+        enable_checkbox.setChecked(region is not None)
+        layout.addWidget(enable_checkbox)
+        
+        # X、Y、寬、高設定
+        spinboxes = []
+        values = region or [0, 0, 1920, 1080]
+        for label_text, value in zip(("X：", "Y：", "寬：", "高："), values):
+            row_layout = QHBoxLayout()
+            label = QLabel(label_text)
+            spinbox = QSpinBox()
+            spinbox.setRange(0, 16777216)
+            spinbox.setValue(int(value))
+            spinbox.setEnabled(region is not None)
+            enable_checkbox.toggled.connect(spinbox.setEnabled)
+            row_layout.addWidget(label)
+            row_layout.addWidget(spinbox)
+            layout.addLayout(row_layout)
+            spinboxes.append(spinbox)
+        
+        # 確認按鈕
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+        )
+        button_box.accepted.connect(dialog.accept)
+        button_box.rejected.connect(dialog.reject)
+        
+        layout.addWidget(button_box)
+        dialog.setLayout(layout)
+        
+        if dialog.exec_() == QDialog.Accepted:
+            if enable_checkbox.isChecked():
+                item.region = [spinbox.value() for spinbox in spinboxes]
+            else:
+                item.region = None
+            self.update_json_step_settings(item, {'region': item.region}, "搜尋範圍")
+
+    def show_any_of_settings(self, item: PixmapNode):
+        """設定替代圖片：此步驟的圖片或任一替代圖片出現時就點擊出現的那一張"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("替代圖片設定")
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("勾選的圖片任一出現時，點擊出現的圖片："))
+        
+        own_file = os.path.basename(item.file_path)
+        alternatives = getattr(item, 'alternatives', [])
+        list_widget = QListWidget()
+        detect_path = get_resource_path('detect')
+        for file_name in sorted(os.listdir(detect_path)):
+            if file_name == own_file or not file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                continue
+            list_item = QListWidgetItem(file_name)
+            list_item.setFlags(list_item.flags() | Qt.ItemIsUserCheckable)
+            list_item.setCheckState(Qt.Checked if file_name in alternatives else Qt.Unchecked)
+            list_widget.addItem(list_item)
+        layout.addWidget(list_widget)
+        
+        # 確認按鈕
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+        )
+        button_box.accepted.connect(dialog.accept)
+        button_box.rejected.connect(dialog.reject)
+        
+        layout.addWidget(button_box)
+        dialog.setLayout(layout)
+        
+        if dialog.exec_() == QDialog.Accepted:
+            item.alternatives = [
+                list_widget.item(i).text() for i in range(list_widget.count())
+                if list_widget.item(i).checkState() == Qt.Checked
+            ]
+            if item.alternatives:
+                locations = [os.path.join('detect', name) for name in [own_file] + item.alternatives]
+                settings = {'type': 'any_of', 'locations': locations, 'probes': None}
+                item.probes = None
+            elif alternatives:
+                settings = {'type': None, 'locations': None}
+            else:
+                return
+            self.update_json_step_settings(item, settings, "替代圖片")
+
+    def show_probe_settings(self, item: PixmapNode):
+        """設定像素探針：在模板圖片上點選幾個像素，執行時只檢查這些像素的顏色，不做模板匹配"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("像素探針設定")
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("在圖片上點選可辨識畫面狀態的像素（例如按鈕的填色）："))
+        
+        image = QPixmap(item.file_path).toImage()
+        probes = [list(probe) for probe in (getattr(item, 'probes', None) or [])]
+        
+        probe_list = QListWidget()
+        
+        def refresh():
+            probe_list.clear()
+            for x, y, color, *_ in probes:
+                probe_list.addItem(f"({x}, {y})  RGB({color[0]}, {color[1]}, {color[2]})")
+            picker.draw_points([(probe[0], probe[1]) for probe in probes])
+        
+        def pick(x, y):
+            color = image.pixelColor(x, y)
+            probes.append([x, y, [color.red(), color.green(), color.blue()], tolerance_spinbox.value()])
+            refresh()
+        
+        def remove_selected():
+            if probe_list.currentRow() >= 0:
+                probes.pop(probe_list.currentRow())
+                refresh()
+        
+        def clear_all():
+            probes.clear()
+            refresh()
+        
+        picker = ProbePickerLabel(QPixmap(item.file_path), pick)
+        layout.addWidget(picker, alignment=Qt.AlignCenter)
+        layout.addWidget(probe_list)
+        
+        # 移除與清除按鈕
+        buttons_layout = QHBoxLayout()
+        remove_button = QPushButton("移除選取")
+        remove_button.clicked.connect(remove_selected)
+        clear_button = QPushButton("全部清除")
+        clear_button.clicked.connect(clear_all)
+        buttons_layout.addWidget(remove_button)
+        buttons_layout.addWidget(clear_button)
+        layout.addLayout(buttons_layout)
+        
+        # 顏色容許值設定
+        tolerance_layout = QHBoxLayout()
+        tolerance_label = QLabel("顏色容許值（0-255）：")
+        tolerance_spinbox = QSpinBox()
+        tolerance_spinbox.setRange(0, 255)
+        tolerance_spinbox.setValue(probes[0][3] if probes and len(probes[0]) > 3 else 16)
+        tolerance_layout.addWidget(tolerance_label)
+        tolerance_layout.addWidget(tolerance_spinbox)
+        layout.addLayout(tolerance_layout)
+        
+        # 確認按鈕
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+        )
+        button_box.accepted.connect(dialog.accept)
+        button_box.rejected.connect(dialog.reject)
+        
+        layout.addWidget(button_box)
+        dialog.setLayout(layout)
+        refresh()
+        
+        if dialog.exec_() == QDialog.Accepted:
+            if probes:
+                item.probes = [[x, y, color, tolerance_spinbox.value()] for x, y, color, *_ in probes]
+                item.alternatives = []
+                settings = {'type': 'probe', 'probes': item.probes, 'locations': None}
+            elif getattr(item, 'probes', None):
+                item.probes = None
+                settings = {'type': None, 'probes': None}
+            else:
+                return
+            self.update_json_step_settings(item, settings, "像素探針")
+
+    def show_matcher_settings(self, item: PixmapNode):
+        """顯示匹配方式設定"""
+        options = ["使用全域設定", "自動選擇 (auto)", "完整解析度 (full)", "頻域 (fft)", "金字塔 (pyramid)", "分塊平行 (tiled)", "單色視窗預篩選 (prefilter)"]
+        values = [None, 'auto', 'full', 'fft', 'pyramid', 'tiled', 'prefilter']
+        current = getattr(item, 'matcher', None)
+        option, ok = QInputDialog.getItem(
+            self,
+            "匹配方式設定",
+            "請選擇此步驟的模板匹配方式：",
+            options,
+            values.index(current) if current in values else 0,
+            False
+        )
+        if ok:
+            item.matcher = values[options.index(option)]
+            self.update_json_step_settings(item, {'matcher': item.matcher}, "匹配方式")
+
+    def show_color_mode_settings(self, item: PixmapNode):
+        """顯示顏色模式設定"""
+        options = ["使用全域設定", "彩色 (color)", "灰階 (gray)", "灰階 + 顏色確認 (gray_verify)"]
+        values = [None, 'color', 'gray', 'gray_verify']
+        current = getattr(item, 'color_mode', None)
+        option, ok = QInputDialog.getItem(
+            self,
+            "顏色模式設定",
+            "灰階匹配約快 3 倍，但無法分辨亮度相近的不同顏色；\n"
+            "顏色確認會再比較最佳位置的顏色。請選擇此步驟的顏色模式：",
+            options,
+            values.index(current) if current in values else 0,
+            False
+        )
+        if ok:
+            item.color_mode = values[options.index(option)]
+            self.update_json_step_settings(item, {'color_mode': item.color_mode}, "顏色模式")
+
+    def show_feature_fallback_settings(self, item: PixmapNode):
+        """顯示特徵匹配備援設定"""
+        current = getattr(item, 'feature_fallback', None)
+        polls, ok = QInputDialog.getInt(
+            self,
+            "特徵匹配備援設定",
+            "模板匹配連續失敗幾次後改用 ORB 特徵匹配\n(適用於縮放或動畫中的按鈕，0 表示不使用)：",
+            current if current is not None else 0,
+            0,
+            100
+        )
+        if ok:
+            item.feature_fallback = polls
+            self.update_json_step_settings(item, {'feature_fallback': polls}, "特徵匹配備援")
+
+    def show_click_all_settings(self, item: PixmapNode):
+        """顯示點擊所有符合位置的設定"""
+        options = ["只點擊最佳位置", "全部點擊：由上而下、由左而右 (reading)", "全部點擊：最近的優先 (nearest)"]
+        values = [None, 'reading', 'nearest']
+        current = getattr(item, 'click_all', None)
+        option, ok = QInputDialog.getItem(
+            self,
+            "點擊所有位置設定",
+            "畫面中有多個相同圖片時（例如清單），要點擊哪些位置：",
+            options,
+            values.index(current) if current in values else 0,
+            False
+        )
+        if ok:
+            item.click_all = values[options.index(option)]
+            self.update_json_step_settings(item, {'click_all': item.click_all}, "點擊所有位置")
+
+    def show_poll_interval_settings(self, item: PixmapNode):
+        """顯示輪詢間隔設定：點擊後以最短間隔檢查畫面，畫面靜止時逐漸放慢到最長間隔"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("輪詢間隔設定")
+        layout = QVBoxLayout()
+        
+        poll_interval = getattr(item, 'poll_interval', None)
+        
+        enable_checkbox = QCheckBox("此步驟使用自訂的輪詢間隔（否則使用全域設定）")
+        enable_checkbox.setChecked(poll_interval is not None)
+        layout.addWidget(enable_checkbox)
+        
+        # 最短、最長間隔設定
+        spinboxes = []
+        values = poll_interval or [0.05, 1.0]
+        for label_text, value in zip(("最短間隔（秒）：", "最長間隔（秒）："), values):
+            row_layout = QHBoxLayout()
+            label = QLabel(label_text)
+            spinbox = QDoubleSpinBox()
+            spinbox.setRange(0.0, 60.0)
+            spinbox.setDecimals(2)
+            spinbox.setSingleStep(0.05)
+            spinbox.setValue(float(value))
+            spinbox.setEnabled(poll_interval is not None)
+            enable_checkbox.toggled.connect(spinbox.setEnabled)
+            row_layout.addWidget(label)
+            row_layout.addWidget(spinbox)
+            layout.addLayout(row_layout)
+            spinboxes.append(spinbox)
+        
+        # 確認按鈕
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+        )
+        button_box.accepted.connect(dialog.accept)
+        button_box.rejected.connect(dialog.reject)
+        
+        layout.addWidget(button_box)
+        dialog.setLayout(layout)
+        
+        if dialog.exec_() == QDialog.Accepted:
+            if enable_checkbox.isChecked():
+                minimum, maximum = (spinbox.value() for spinbox in spinboxes)
+                item.poll_interval = [minimum, max(minimum, maximum)]
+            else:
+                item.poll_interval = None
+            self.update_json_step_settings(item, {'poll_interval': item.poll_interval}, "輪詢間隔")
+
+    def update_json_step_settings(self, item, settings, description):
+        """
+        更新 JSON 中對應步驟的設定
+        
+        Args:
+            item (PixmapNode): 要更新的節點
+            settings (dict): 要寫入的步驟欄位，值為 None 時移除該欄位
+            description (str): 寫入 log 的設定名稱
+        """
+        try:
+            save_data_path = get_resource_path('SaveData')
+            json_files = [f for f in os.listdir(save_data_path) if f.endswith('.json')]
+            
+            if not json_files:
+                if self.log_view:
+                    self.log_view.append_log("找不到任何 JSON 檔案")
+                return
+            
+            # 如果有多個檔案，讓使用者選擇
+            if len(json_files) > 1:
+                file_name, ok = QInputDialog.getItem(
+                    self,
+                    "選擇檔案",
+                    "請選擇要更新的檔案：",
+                    json_files,
+                    0,
+                    False
+                )
+                if not ok:
+                    return
+            else:
+                file_name = json_files[0]
+            
+            json_path = os.path.join(save_data_path, file_name)
+            
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            target_file = os.path.basename(item.file_path)
+            
+            updated = False
+            steps = data.get('steps', {})
+            for step_key, step_data in steps.items():
+                # 舊格式轉換為新格式
+                if isinstance(step_data, str):
+                    if not step_data.endswith(target_file):
+                        continue
+                    step_data = {'location': step_data}
+                    steps[step_key] = step_data
+                elif not (isinstance(step_data, dict) and step_data.get('location', '').endswith(target_file)):
+                    continue
+                
+                for key, value in settings.items():
+                    if value is None:
+                        step_data.pop(key, None)
+                    else:
+                        step_data[key] = value
+                updated = True
+            
+            if updated:
+                with open(json_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=4, ensure_ascii=False)
+                if self.log_view:
+                    self.log_view.append_log(f"已更新節點 {target_file} 的{description}")
+            elif self.log_view:
+                self.log_view.append_log(f"在 JSON 中找不到對應的節點：{target_file}")
+            
+        except Exception as e:
+            if self.log_view:
+                self.log_view.append_log(f"更新{description}時發生錯誤：{str(e)}")
+
     def show_detail_settings(self, item: PixmapNode):
         """顯示圖片詳細資料"""
         file_name = os.path.basename(item.file_path)
@@ -449,6 +870,23 @@ class ProcessView(QWidget):
         repeat_clicks = getattr(item, 'repeat_clicks', 1)  # 如果沒有設定，預設為 1 次
         click_interval = getattr(item, 'click_interval', 1)  # 如果沒有設定，預設為 1 秒
         
+        # 取得搜尋範圍
+        region = getattr(item, 'region', None)
+        region_text = f"X={region[0]}, Y={region[1]}, {region[2]} x {region[3]}" if region else "整個畫面"
+        matcher = getattr(item, 'matcher', None) or "全域設定"
+        color_mode = getattr(item, 'color_mode', None) or "全域設定"
+        click_all = getattr(item, 'click_all', None) or "否"
+        poll_interval = getattr(item, 'poll_interval', None)
+        poll_text = f"{poll_interval[0]} ~ {poll_interval[1]} 秒" if poll_interval else "全域設定"
+        probes = getattr(item, 'probes', None)
+        probe_text = f"{len(probes)} 個（不做模板匹配）" if probes else "無"
+        alternatives = "、".join(getattr(item, 'alternatives', [])) or "無"
+        feature_fallback = getattr(item, 'feature_fallback', None)
+        if feature_fallback is None:
+            feature_text = "全域設定"
+        else:
+            feature_text = f"失敗 {feature_fallback} 次後" if feature_fallback > 0 else "不使用"
+        
         # 建立詳細資訊文字
         detail_text = (
             f"檔案名稱：{file_name}\n"
@@ -463,6 +901,14 @@ class ProcessView(QWidget):
             f"  ➤ 等待時限：{timeout} 秒\n"
             f"  ➤ 重複點擊：{repeat_clicks} 次\n"
             f"  ➤ 點擊間隔：{click_interval} 秒\n"
+            f"  ➤ 點擊所有位置：{click_all}\n"
+            f"  ➤ 輪詢間隔：{poll_text}\n"
+            f"  ➤ 搜尋範圍：{region_text}\n"
+            f"  ➤ 匹配方式：{matcher}\n"
+            f"  ➤ 顏色模式：{color_mode}\n"
+            f"  ➤ 替代圖片：{alternatives}\n"
+            f"  ➤ 像素探針：{probe_text}\n"
+            f"  ➤ 特徵匹配備援：{feature_text}\n"
             f"\n"
             f"連線資訊：\n"
             f"  ➤ 輸出連線：{outgoing_connections}\n"
@@ -869,6 +1315,16 @@ class ProcessView(QWidget):
                 
                 connections_data[source_file] = node_data
 
+        # 覆蓋存檔時帶上原本的步驟設定，讓 analyze_and_save_steps 可以保留
+        if os.path.exists(json_path):
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    previous_steps = json.load(f).get('steps')
+                if previous_steps:
+                    connections_data['steps'] = previous_steps
+            except (OSError, ValueError) as e:
+                print(f"讀取原本的步驟設定失敗: {e}")
+
         # 保存到 JSON 檔案
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(connections_data, f, ensure_ascii=False, indent=4)
@@ -944,12 +1400,30 @@ class ProcessView(QWidget):
                                             node.timeout = step_data.get('timeout', 30)
                                             node.repeat_clicks = step_data.get('repeat_clicks', 1)
                                             node.click_interval = step_data.get('click_interval', 1)
+                                            node.region = step_data.get('region')
+                                            node.matcher = step_data.get('matcher')
+                                            node.color_mode = step_data.get('color_mode')
+                                            node.feature_fallback = step_data.get('feature_fallback')
+                                            node.click_all = step_data.get('click_all')
+                                            node.poll_interval = step_data.get('poll_interval')
+                                            node.probes = step_data.get('probes') if step_data.get('type') == 'probe' else None
+                                            node.alternatives = [
+                                                os.path.basename(location) for location in step_data.get('locations', [])
+                                            ][1:]
                                             break
                                     elif isinstance(step_data, str) and step_data.endswith(file_name):
                                         # 處理舊格式
                                         node.timeout = 30
                                         node.repeat_clicks = 1
                                         node.click_interval = 1
+                                        node.region = None
+                                        node.matcher = None
+                                        node.color_mode = None
+                                        node.feature_fallback = None
+                                        node.click_all = None
+                                        node.poll_interval = None
+                                        node.probes = None
+                                        node.alternatives = []
                         
                             node_map[file_name] = node
                             
@@ -1073,6 +1547,12 @@ class ProcessView(QWidget):
                     break
             
             if complete_path:
+                # 重新產生步驟時保留同一張圖片原本的設定（例如搜尋範圍）
+                previous_settings = {}
+                for step_data in data.get('steps', {}).values():
+                    if isinstance(step_data, dict) and 'location' in step_data:
+                        previous_settings[os.path.basename(step_data['location'])] = step_data
+                
                 # 將步驟資訊加入到 JSON 中，使用新的格式包含 timeout, repeat_clicks, click_interval
                 steps = {}
                 for i, node in enumerate(complete_path):
@@ -1086,6 +1566,10 @@ class ProcessView(QWidget):
                         "repeat_clicks": 1,  # 預設點擊次數為 1
                         "click_interval": 1.0  # 預設點擊間隔為 1 秒
                     }
+                    if node in previous_settings:
+                        steps[f"Step{i+1}"].update(
+                            {key: value for key, value in previous_settings[node].items() if key != 'location'}
+                        )
                 
                 data['steps'] = steps
                 
@@ -1195,6 +1679,16 @@ class ProcessView(QWidget):
                                         item.timeout = step.get("timeout", 30)
                                         item.repeat_clicks = step.get("repeat_clicks", 1)
                                         item.click_interval = step.get("click_interval", 0.5)
+                                        item.region = step.get("region")
+                                        item.matcher = step.get("matcher")
+                                        item.color_mode = step.get("color_mode")
+                                        item.feature_fallback = step.get("feature_fallback")
+                                        item.click_all = step.get("click_all")
+                                        item.poll_interval = step.get("poll_interval")
+                                        item.probes = step.get("probes") if step.get("type") == "probe" else None
+                                        item.alternatives = [
+                                            os.path.basename(location) for location in step.get("locations", [])
+                                        ][1:]
                                         break
             
             # 然後建立連線關係
@@ -0,0 +1,410 @@
+import hashlib
+import io
+import json
+import os
+import struct
+import threading
+import weakref
+from collections import OrderedDict
+import cv2
+import numpy as np
+from PIL import Image
+
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+TEMPLATE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+class TemplateCache:
+    """
+    程序共用的模板圖片快取，保存已解碼、可直接匹配的 NumPy 陣列。
+
+    以 (路徑, 修改時間, 前處理方式) 為鍵：圖片檔案被修改後修改時間不同，自然會重新讀取。
+    總大小超過 budget_bytes 時，從最久沒被使用的項目開始移除 (LRU)。
+    回傳的陣列為共用且唯讀，請勿直接修改。
+
+    attach_index() 掛上 TemplateIndex 後，索引中已有的圖片直接使用記憶體映射的陣列，不必解碼。
+    derive() 由回傳的陣列找回原始路徑，匹配時需要的灰階或縮圖版本同樣由快取與索引取得。
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        """
+        Args:
+            budget_bytes (int): 快取可使用的最大位元組數
+        """
+        self.budget_bytes = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.index_hits = 0     # 直接由模板索引取得的次數
+        self.index = None
+        self._entries = OrderedDict()  # 鍵 -> 陣列，最近使用的在最後
+        self._origins = {}  # id(回傳的陣列) -> (陣列弱參照, 路徑, 是否灰階, 縮放比例)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _decode(path):
+        # 使用 PIL 讀取以支援中文路徑，轉為 RGB 避免帶透明通道的 PNG 轉換失敗
+        with Image.open(path) as pil_image:
+            return cv2.cvtColor(np.array(pil_image.convert('RGB')), cv2.COLOR_RGB2BGR)
+
+    def attach_index(self, index):
+        """掛上模板索引，之後的讀取優先使用索引中的陣列"""
+        with self._lock:
+            self.index = index
+
+    @staticmethod
+    def _preprocess(image, gray, scale):
+        if scale != 1.0:
+            height, width = image.shape[:2]
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            image = cv2.resize(image, size, interpolation=interpolation)
+        if gray:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image
+
+    def get(self, path, gray=False, scale=1.0):
+        """
+        取得模板圖片，快取中沒有時從硬碟讀取
+
+        Args:
+            path (str): 圖片路徑
+            gray (bool): 是否轉為灰階
+            scale (float): 縮放比例
+
+        Returns:
+            numpy.ndarray: BGR（或灰階）圖片
+        """
+        path = os.path.abspath(path)
+        file_stat = os.stat(path)
+        key = (path, file_stat.st_mtime_ns, gray, round(scale, 4))
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+            index = self.index
+
+        image = index.lookup(path, file_stat, gray, scale) if index is not None else None
+        if image is not None:
+            self.index_hits += 1
+        elif gray or scale != 1.0:
+            # 衍生版本由原圖產生，原圖也會一起被快取
+            image = self._preprocess(self.get(path), gray, scale)
+        else:
+            image = self._decode(path)
+        image.setflags(write=False)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = image
+                self._total_bytes += image.nbytes
+                self._evict()
+            image = self._entries.get(key, image)
+            if id(image) not in self._origins:
+                if len(self._origins) > 2 * len(self._entries) + 64:
+                    # 移除已被釋放的陣列
+                    self._origins = {k: v for k, v in self._origins.items() if v[0]() is not None}
+                self._origins[id(image)] = (weakref.ref(image), path, gray, round(scale, 4))
+        return image
+
+    def derive(self, template, gray=False, scale=1.0):
+        """
+        取得模板的灰階或縮放版本
+
+        template 由 get() 取得時，以原始路徑呼叫 get()，結果會被快取，索引中的灰階、1/2 與 1/4 縮圖直接使用；
+        其他陣列（例如匹配前才裁切的圖片）直接轉換，不快取。
+
+        Args:
+            template (numpy.ndarray): 模板圖片
+            gray (bool): 是否轉為灰階，已經是灰階的模板維持灰階
+            scale (float): 相對於 template 的縮放比例
+
+        Returns:
+            numpy.ndarray: 轉換後的圖片
+        """
+        if scale == 1.0 and (not gray or template.ndim == 2):
+            return template
+        with self._lock:
+            origin = self._origins.get(id(template))
+        if origin is not None and origin[0]() is template:
+            _, path, origin_gray, origin_scale = origin
+            try:
+                return self.get(path, gray or origin_gray, origin_scale * scale)
+            except OSError:
+                pass
+        return self._preprocess(template, gray and template.ndim == 3, scale)
+
+    def _evict(self):
+        # 至少保留剛加入的項目，即使它本身就超過預算
+        while self._total_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, image = self._entries.popitem(last=False)
+            self._total_bytes -= image.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._origins.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def stats(self):
+        """返回快取統計資料"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'index_hits': self.index_hits,
+            }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"模板快取：{stats['entries']} 張 ({stats['bytes'] / 1024 / 1024:.1f} MB)，"
+                f"命中 {stats['hits']} 次，讀取 {stats['misses']} 次（其中由索引取得 {stats['index_hits']} 次），"
+                f"移除 {stats['evictions']} 次")
+
+class TemplateIndex:
+    """
+    預先編譯的模板索引：把資料夾中每張圖片解碼後的陣列存成單一個可記憶體映射的檔案。
+
+    每張圖片保存 BGR、灰階、1/2 與 1/4 縮圖（與 TemplateCache 的前處理結果完全相同），
+    分別供一般匹配、灰階匹配與金字塔匹配使用。啟動時只需映射檔案，不必再解碼 PNG/JPG。
+
+    檔案格式：8 位元組標頭 MAGIC、8 位元組 JSON 長度、JSON 目錄，
+    之後是以 64 位元組對齊的陣列資料；目錄記錄每個陣列相對於資料起點的位移與形狀。
+
+    build() 只重新解碼修改時間或大小改變、且內容雜湊也不同的圖片，其他圖片沿用舊索引的陣列。
+    """
+
+    MAGIC = b'AGTIDX01'
+    ALIGNMENT = 64
+    # 變體名稱 -> (是否灰階, 縮放比例)
+    VARIANTS = {'bgr': (False, 1.0), 'gray': (True, 1.0), 'half': (False, 0.5), 'quarter': (False, 0.25)}
+
+    def __init__(self, index_path):
+        """
+        Args:
+            index_path (str): 索引檔案路徑
+        """
+        self.index_path = os.path.abspath(index_path)
+        self.directory = None
+        self.entries = {}   # 圖片完整路徑 -> 目錄資料
+        self._data = None   # 映射的檔案內容
+        self._data_start = 0
+        self._lock = threading.Lock()
+        self.reused = 0     # 上次 build() 沿用的圖片數
+        self.rebuilt = 0    # 上次 build() 重新解碼的圖片數
+        self.removed = 0    # 上次 build() 移除的圖片數
+
+    def open(self):
+        """映射現有的索引檔案，檔案不存在或格式不符時視為空索引"""
+        pending = self.index_path + '.new'
+        if os.path.exists(pending):
+            try:
+                # 上次更新時舊檔仍被映射而無法取代
+                os.replace(pending, self.index_path)
+            except OSError:
+                pass
+        with self._lock:
+            self.entries, self._data, self._data_start = {}, None, 0
+            try:
+                data = np.memmap(self.index_path, dtype=np.uint8, mode='r')
+                header = bytes(data[:16])
+                if header[:8] != self.MAGIC:
+                    return self
+                header_length = struct.unpack('<Q', header[8:])[0]
+                directory = json.loads(bytes(data[16:16 + header_length]).decode('utf-8'))
+            except (OSError, ValueError, struct.error):
+                return self
+            self.directory = directory['directory']
+            self.entries = {
+                os.path.join(self.directory, name): entry for name, entry in directory['entries'].items()
+            }
+            self._data = data
+            self._data_start = self._align(16 + header_length)
+        return self
+
+    @classmethod
+    def _align(cls, offset):
+        return (offset + cls.ALIGNMENT - 1) // cls.ALIGNMENT * cls.ALIGNMENT
+
+    def _array(self, entry, variant):
+        info = entry['arrays'][variant]
+        start = self._data_start + info['offset']
+        size = int(np.prod(info['shape']))
+        return self._data[start:start + size].reshape(info['shape'])
+
+    def lookup(self, path, file_stat, gray=False, scale=1.0):
+        """
+        取得索引中的陣列
+
+        Args:
+            path (str): 圖片完整路徑
+            file_stat (os.stat_result): 圖片目前的狀態，修改時間或大小與索引不同時不使用索引
+            gray (bool): 是否為灰階
+            scale (float): 縮放比例
+
+        Returns:
+            numpy.ndarray or None: 唯讀的記憶體映射陣列，索引中沒有時返回 None
+        """
+        variant = next((name for name, spec in self.VARIANTS.items() if spec == (gray, round(scale, 4))), None)
+        with self._lock:
+            entry = self.entries.get(path)
+            if (variant is None or entry is None or self._data is None
+                    or entry['mtime_ns'] != file_stat.st_mtime_ns or entry['size'] != file_stat.st_size):
+                return None
+            return self._array(entry, variant)
+
+    @staticmethod
+    def _compile(data):
+        """解碼圖片並產生所有變體"""
+        with Image.open(io.BytesIO(data)) as pil_image:
+            image = cv2.cvtColor(np.array(pil_image.convert('RGB')), cv2.COLOR_RGB2BGR)
+        return {
+            name: TemplateCache._preprocess(image, gray, scale)
+            for name, (gray, scale) in TemplateIndex.VARIANTS.items()
+        }
+
+    def build(self, directory):
+        """
+        依資料夾內容增量更新索引，有變更時重新寫入索引檔案
+
+        Args:
+            directory (str): 模板圖片資料夾
+
+        Returns:
+            bool: 索引檔案是否被重新寫入
+        """
+        directory = os.path.abspath(directory)
+        if self._data is None:
+            self.open()
+        if self.directory != directory:
+            self.entries = {}
+
+        self.reused = self.rebuilt = 0
+        compiled = {}  # 檔名 -> (目錄資料, {變體: 陣列})
+        changed = False
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not name.lower().endswith(TEMPLATE_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            file_stat = os.stat(path)
+            entry = self.entries.get(path)
+            if entry is not None and entry['mtime_ns'] == file_stat.st_mtime_ns and entry['size'] == file_stat.st_size:
+                compiled[name] = (entry, None)
+                self.reused += 1
+                continue
+
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha1(data).hexdigest()
+            changed = True
+            if entry is not None and entry['sha1'] == digest:
+                # 只有修改時間改變（例如被複製或還原），內容相同
+                compiled[name] = (dict(entry, mtime_ns=file_stat.st_mtime_ns, size=file_stat.st_size), None)
+                self.reused += 1
+                continue
+            try:
+                arrays = self._compile(data)
+            except Exception as e:
+                print(f"無法編譯模板 {path}: {str(e)}")
+                continue
+            compiled[name] = ({'mtime_ns': file_stat.st_mtime_ns, 'size': file_stat.st_size,
+                               'sha1': digest}, arrays)
+            self.rebuilt += 1
+
+        self.removed = len(set(self.entries) - {os.path.join(directory, name) for name in compiled})
+        if not changed and not self.removed and self.directory == directory:
+            return False
+        self._write(directory, compiled)
+        return True
+
+    def _write(self, directory, compiled):
+        """寫入新的索引檔案並重新映射"""
+        entries = {}
+        blocks = []
+        offset = 0
+        with self._lock:
+            for name, (entry, arrays) in compiled.items():
+                if arrays is None:
+                    # 沿用舊索引的陣列，寫入前先複製，舊檔案才能被取代
+                    arrays = {variant: np.array(self._array(entry, variant)) for variant in self.VARIANTS}
+                info = {}
+                for variant in self.VARIANTS:
+                    array = np.ascontiguousarray(arrays[variant])
+                    info[variant] = {'offset': offset, 'shape': list(array.shape)}
+                    blocks.append((offset, array))
+                    offset = self._align(offset + array.nbytes)
+                entries[name] = dict({key: value for key, value in entry.items() if key not in ('arrays', 'stats')}, arrays=info)
+            self._data = None
+
+        header = json.dumps({'directory': directory, 'entries': entries}, ensure_ascii=False).encode('utf-8')
+        data_start = self._align(16 + len(header))
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        pending = self.index_path + '.new'
+        with open(pending, 'wb') as f:
+            f.write(self.MAGIC + struct.pack('<Q', len(header)) + header)
+            for block_offset, array in blocks:
+                f.seek(data_start + block_offset)
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        try:
+            os.replace(pending, self.index_path)
+        except OSError as e:
+            # Windows 上舊索引的陣列仍在使用時無法取代，下次啟動時再取代
+            print(f"模板索引暫時無法更新，下次啟動時套用: {str(e)}")
+            self.entries = {}
+            return
+        self.open()
+
+    def summary(self):
+        return (f"模板索引：{len(self.entries)} 張，沿用 {self.reused} 張，重新編譯 {self.rebuilt} 張，"
+                f"移除 {self.removed} 張")
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_template_cache():
+    """取得程序共用的模板快取"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = TemplateCache()
+        return _shared_cache
+
+def load_template(path, gray=False, scale=1.0):
+    """從共用快取取得模板圖片，讀取失敗時拋出例外"""
+    return get_template_cache().get(path, gray, scale)
+
+def derive_template(template, gray=False, scale=1.0):
+    """取得模板的灰階或縮放版本（見 TemplateCache.derive）"""
+    return get_template_cache().derive(template, gray, scale)
+
+def build_template_index(directory, index_path):
+    """
+    增量更新模板資料夾的索引，並掛到共用的模板快取
+
+    Args:
+        directory (str): 模板圖片資料夾
+        index_path (str): 索引檔案路徑
+
+    Returns:
+        TemplateIndex: 更新後的索引
+    """
+    cache = get_template_cache()
+    index = cache.index
+    if index is None or index.index_path != os.path.abspath(index_path):
+        index = TemplateIndex(index_path).open()
+    index.build(directory)
+    cache.attach_index(index)
+    return index
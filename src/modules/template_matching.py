@@ -0,0 +1,1037 @@
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from template_cache import load_template, derive_template
+from capture import FrameViews
+
+DEFAULT_MATCHER = 'auto'
+
+# 多尺度匹配嘗試的縮放比例：常見解析度之間的比例（720p、1080p、1440p、4K）排在前面
+SCALE_CANDIDATES = (1.0, 2 / 3, 4 / 3, 0.75, 1.5, 0.5, 2.0, 0.8, 1.25, 0.9, 1.1)
+# 找到最佳比例後，在其附近微調的倍率
+SCALE_REFINEMENTS = (0.98, 1.02, 0.96, 1.04)
+# 多尺度校正失敗後，下一次校正前等待的秒數：每次失敗加倍，直到上限
+CALIBRATION_BACKOFF = (2.0, 60.0)
+
+def _match_template(image, template, views=None, name='result'):
+    """執行 TM_CCOEFF_NORMED，views 帶有 MatchContext 時寫入重複使用的結果緩衝區"""
+    context = views.context if views is not None else None
+    result = context.result(image.shape, template.shape, name) if context is not None else None
+    return cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED, result=result)
+
+def match_full(image, template, views=None):
+    """
+    在完整解析度的畫面上執行 TM_CCOEFF_NORMED 模板匹配
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片，通道數需與畫面相同
+        views (FrameViews): 畫面的衍生表示，只使用其中的 MatchContext 結果緩衝區
+
+    Returns:
+        tuple: (最高匹配值, 最高匹配值的左上角座標 (x, y))
+    """
+    result = _match_template(image, template, views)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+def _pyramid_scale(template, min_template_side):
+    """選擇縮小後模板短邊仍不小於 min_template_side 的最小縮放比例"""
+    short_side = min(template.shape[:2])
+    for scale in (0.25, 0.5):
+        if short_side * scale >= min_template_side:
+            return scale
+    return None
+
+def _top_candidates(result, count, suppress_size):
+    """依序取出 count 個最高分位置，每取一個就把其周圍設為最低分，避免重複"""
+    candidates = []
+    suppress_w, suppress_h = suppress_size
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        if max_val <= -1:
+            break
+        candidates.append((x, y))
+        result[max(0, y - suppress_h):y + suppress_h + 1, max(0, x - suppress_w):x + suppress_w + 1] = -1
+    return candidates
+
+def match_pyramid(image, template, candidates=3, min_template_side=16, views=None):
+    """
+    由粗到細的模板匹配：先在縮小的畫面上找出幾個候選位置，
+    再只在每個候選位置附近的小範圍內以完整解析度重新匹配。
+
+    回傳的匹配值來自完整解析度的匹配，與 match_full 的信心值意義相同。
+    模板太小、縮小後無法辨識時直接使用 match_full。
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        candidates (int): 縮小畫面上保留的候選位置數
+        min_template_side (int): 縮小後模板短邊的最小像素數
+        views (FrameViews): 畫面的衍生表示，同一畫面匹配多個模板時共用縮圖
+
+    Returns:
+        tuple: (最高匹配值, 最高匹配值的左上角座標 (x, y))
+    """
+    image_height, image_width = image.shape[:2]
+    template_height, template_width = template.shape[:2]
+    scale = _pyramid_scale(template, min_template_side)
+    if scale is None or image_height * scale < template_height or image_width * scale < template_width:
+        return match_full(image, template, views)
+
+    small_image = (views if views is not None else FrameViews(image)).downscaled(scale)
+    # 由模板快取取得縮圖，模板索引中已預先編譯 1/2 與 1/4 縮圖
+    small_template = derive_template(template, scale=scale)
+    if small_image.shape[0] < small_template.shape[0] or small_image.shape[1] < small_template.shape[1]:
+        return match_full(image, template, views)
+    coarse = _match_template(small_image, small_template, views, 'coarse')
+
+    # 候選位置換算回完整解析度後，加上縮放誤差的邊界
+    margin = int(np.ceil(1 / scale)) * 2
+    suppress_size = (max(1, small_template.shape[1] // 2), max(1, small_template.shape[0] // 2))
+    best_val, best_loc = -1.0, (0, 0)
+    for x, y in _top_candidates(coarse, candidates, suppress_size):
+        left = max(0, int(x / scale) - margin)
+        top = max(0, int(y / scale) - margin)
+        right = min(image_width, int(x / scale) + template_width + margin)
+        bottom = min(image_height, int(y / scale) + template_height + margin)
+        if right - left < template_width or bottom - top < template_height:
+            continue
+        max_val, (local_x, local_y) = match_full(image[top:bottom, left:right], template, views)
+        if max_val > best_val:
+            best_val, best_loc = max_val, (left + local_x, top + local_y)
+    return best_val, best_loc
+
+_tile_executor = None
+_tile_workers = 0  # 0 表示使用 CPU 核心數
+_tile_executor_lock = threading.Lock()
+
+def set_tile_workers(workers):
+    """
+    設定分塊平行匹配使用的執行緒數
+
+    Args:
+        workers (int): 執行緒數，0 或 None 表示使用 CPU 核心數
+    """
+    global _tile_workers, _tile_executor
+    workers = int(workers or 0)
+    with _tile_executor_lock:
+        if workers != _tile_workers and _tile_executor is not None:
+            _tile_executor.shutdown(wait=False)
+            _tile_executor = None
+        _tile_workers = workers
+
+def get_tile_workers():
+    """返回分塊平行匹配實際使用的執行緒數"""
+    return _tile_workers or os.cpu_count() or 1
+
+def _get_tile_executor():
+    global _tile_executor
+    with _tile_executor_lock:
+        if _tile_executor is None:
+            _tile_executor = ThreadPoolExecutor(max_workers=get_tile_workers(), thread_name_prefix='match_tile')
+        return _tile_executor
+
+def match_tiled(image, template, workers=None, views=None):
+    """
+    把畫面切成上下相鄰的橫條，在執行緒池上平行執行 matchTemplate（OpenCV 計算時會釋放 GIL）
+
+    每個橫條向下多包含模板高度 - 1 列，合起來涵蓋的匹配位置與整張畫面完全相同；
+    各橫條的最高分取最大者，同分時取較上方的，與 match_full 的 minMaxLoc 結果一致
+    （OpenCV 以 DFT 計算時各橫條的匹配值可能有極小的浮點誤差）。
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        workers (int): 切成幾個橫條，None 表示使用 set_tile_workers 的設定
+        views (FrameViews): 畫面的衍生表示，只使用其中的 MatchContext 結果緩衝區
+
+    Returns:
+        tuple: (最高匹配值, 最高匹配值的左上角座標 (x, y))
+    """
+    executor = _get_tile_executor()
+    tiles = workers or get_tile_workers()
+    template_height = template.shape[0]
+    result_rows = image.shape[0] - template_height + 1
+    # 每個橫條至少要有足夠的列數，否則切塊的額外開銷大於平行化的好處
+    tiles = max(1, min(tiles, result_rows // max(template_height, 16)))
+    if tiles == 1:
+        return match_full(image, template, views)
+
+    bounds = [result_rows * i // tiles for i in range(tiles + 1)]
+
+    def match_band(index, top, bottom):
+        # 每個橫條使用各自的結果緩衝區，平行執行時不會互相覆寫
+        result = _match_template(image[top:bottom + template_height - 1], template, views, ('band', index))
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        return max_val, (x, top + y)
+
+    futures = [executor.submit(match_band, i, bounds[i], bounds[i + 1]) for i in range(tiles)]
+    results = [future.result() for future in futures]
+    best = 0
+    for i, (max_val, _) in enumerate(results):
+        if max_val > results[best][0]:
+            best = i
+    return results[best]
+
+# 成本模型的係數（毫秒 / 像素），由 test/benchmark/bench_fft.py 量測後調整。
+# OpenCV 的 matchTemplate 對一般大小的模板內部也以分塊 DFT 計算，耗時主要取決於畫面大小；
+# 自行實作的 FFT 可以快取模板頻譜，但正規化的成本與匹配結果的大小成正比，
+# 因此只有模板很大（結果很小）時才會比較快。
+SPATIAL_COST_PER_PIXEL = 2.6e-5   # matchTemplate：每個畫面像素 × 通道
+FFT_COST_PER_PIXEL = 1.35e-5      # 畫面的 DFT：每個補齊後的像素 × 通道
+FFT_PREP_COST_PER_PIXEL = 1.2e-5  # 型別轉換與積分圖：每個畫面像素
+FFT_NORM_COST_PER_RESULT = 3.8e-5 # 正規化：每個匹配結果 × 通道
+
+def _dft_shape(image_shape):
+    return cv2.getOptimalDFTSize(image_shape[0]), cv2.getOptimalDFTSize(image_shape[1])
+
+def estimate_match_costs(image_shape, template_shape):
+    """
+    估計 matchTemplate 與 FFT 相關的耗時
+
+    Args:
+        image_shape (tuple): 畫面的 shape
+        template_shape (tuple): 模板的 shape
+
+    Returns:
+        tuple: (matchTemplate 預估毫秒, FFT 預估毫秒)
+    """
+    channels = image_shape[2] if len(image_shape) > 2 else 1
+    frame_pixels = image_shape[0] * image_shape[1]
+    result_pixels = (image_shape[0] - template_shape[0] + 1) * (image_shape[1] - template_shape[1] + 1)
+    dft_height, dft_width = _dft_shape(image_shape)
+    spatial = SPATIAL_COST_PER_PIXEL * frame_pixels * channels
+    fft = (FFT_COST_PER_PIXEL * dft_height * dft_width * channels
+           + FFT_PREP_COST_PER_PIXEL * frame_pixels
+           + FFT_NORM_COST_PER_RESULT * result_pixels * channels)
+    return spatial, fft
+
+class _SpectrumCache:
+    """
+    快取模板的頻譜。一張 1080p 畫面大小的頻譜約 25 MB，只保留最近使用的幾個，
+    同一步驟輪詢時模板不變，頻譜只需計算一次。
+    """
+
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self._entries = OrderedDict()  # (id(模板), DFT 大小) -> (模板弱參照, 頻譜列表, 模板平方和)
+        self._lock = threading.Lock()
+
+    def get(self, template, dft_shape):
+        key = (id(template), dft_shape)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is template:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+
+        template_height, template_width = template.shape[:2]
+        zero_mean = template.astype(np.float32)
+        if zero_mean.ndim == 2:
+            zero_mean = zero_mean[:, :, np.newaxis]
+        # 平均值以 float64 計算，否則大模板的誤差會讓匹配值明顯偏低
+        zero_mean -= zero_mean.reshape(-1, zero_mean.shape[2]).mean(0, dtype=np.float64).astype(np.float32)
+        spectra = [
+            cv2.dft(cv2.copyMakeBorder(
+                np.ascontiguousarray(zero_mean[:, :, channel]),
+                0, dft_shape[0] - template_height, 0, dft_shape[1] - template_width,
+                cv2.BORDER_CONSTANT, value=0
+            ))
+            for channel in range(zero_mean.shape[2])
+        ]
+        energy = float(np.square(zero_mean, dtype=np.float64).sum())
+
+        with self._lock:
+            self._entries[key] = (weakref.ref(template), spectra, energy)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return spectra, energy
+
+_spectrum_cache = _SpectrumCache()
+
+def fft_result_map(image, template, views=None):
+    """
+    以頻域計算 TM_CCOEFF_NORMED 的完整結果矩陣，與 cv2.matchTemplate 相同（差異僅為浮點誤差）
+
+    分子：模板減去平均後與畫面做相關，以 DFT 計算，模板的頻譜在輪詢之間快取；
+    分母：畫面每個視窗的變異數由積分圖計算。
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        views (FrameViews): 畫面的衍生表示，積分圖在同一畫面的模板之間共用
+
+    Returns:
+        numpy.ndarray: float32 匹配值矩陣，大小為 (畫面高 - 模板高 + 1, 畫面寬 - 模板寬 + 1)
+    """
+    image_height, image_width = image.shape[:2]
+    template_height, template_width = template.shape[:2]
+    result_height = image_height - template_height + 1
+    result_width = image_width - template_width + 1
+    dft_shape = _dft_shape(image.shape)
+    spectra, template_energy = _spectrum_cache.get(template, dft_shape)
+    context = views.context if views is not None else None
+
+    def buffer(name, shape, dtype=np.float32):
+        if context is None:
+            return np.empty(shape, dtype=dtype)
+        return context.buffer(('fft', name), shape, dtype)
+
+    # 模板已減去平均值，畫面減去任何常數都不影響分子，減去平均值可降低 float32 的誤差
+    means = cv2.mean(image)
+    padded = buffer('padded', dft_shape)
+    padded[image_height:] = 0
+    padded[:image_height, image_width:] = 0
+    correlation_spectrum = product = None
+    for index, spectrum in enumerate(spectra):
+        channel = image[:, :, index] if image.ndim == 3 else image
+        np.subtract(channel, np.float32(means[index]), out=padded[:image_height, :image_width], dtype=np.float32)
+        frame_spectrum = cv2.dft(padded, dst=buffer('frame_spectrum', dft_shape), nonzeroRows=image_height)
+        if correlation_spectrum is None:
+            correlation_spectrum = cv2.mulSpectrums(frame_spectrum, spectrum, 0, c=buffer('correlation_spectrum', dft_shape), conjB=True)
+        else:
+            product = cv2.mulSpectrums(frame_spectrum, spectrum, 0, c=buffer('product', dft_shape), conjB=True)
+            cv2.add(correlation_spectrum, product, dst=correlation_spectrum)
+    correlation = cv2.idft(correlation_spectrum, dst=buffer('correlation', dft_shape),
+                           flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+    correlation = correlation[:result_height, :result_width]
+
+    # 各視窗的像素和與平方和，四個角相減即可得到
+    sums, square_sums = (views if views is not None else FrameViews(image)).integral()
+    window_shape = (result_height, result_width) + sums.shape[2:]
+
+    def window(integral, out):
+        np.subtract(integral[template_height:, template_width:], integral[:result_height, template_width:], out=out)
+        out -= integral[template_height:, :result_width]
+        out += integral[:result_height, :result_width]
+        return out
+
+    window_sums = window(sums, buffer('window_sums', window_shape, np.float64))
+    variance = window(square_sums, buffer('window_square_sums', window_shape, np.float64))
+    window_sums *= window_sums
+    window_sums /= template_height * template_width
+    variance -= window_sums
+    if variance.ndim == 3:
+        variance = np.sum(variance, axis=2, out=buffer('variance', (result_height, result_width), np.float64))
+    # 分母：sqrt(視窗變異數 × 模板平方和)，直接覆寫在 variance 上
+    np.maximum(variance, 0, out=variance)
+    variance *= template_energy
+    denominator = np.sqrt(variance, out=variance)
+    valid = cv2.compare(denominator, 1e-3, cv2.CMP_GT, dst=buffer('valid', (result_height, result_width), np.uint8))
+    result = buffer('result', (result_height, result_width))
+    result.fill(0)
+    np.divide(correlation, denominator, out=result, where=valid.view(bool))
+    return result
+
+def match_fft(image, template, views=None):
+    """
+    以頻域計算 TM_CCOEFF_NORMED，結果與 match_full 相同（差異僅為浮點誤差）
+
+    Returns:
+        tuple: (最高匹配值, 最高匹配值的左上角座標 (x, y))
+    """
+    _, max_val, _, max_loc = cv2.minMaxLoc(fft_result_map(image, template, views))
+    return max_val, max_loc
+
+# 單色視窗預篩選：TM_CCOEFF_NORMED 對亮度與對比的變化不敏感，以平均值或標準差排除位置都可能漏掉
+# 變暗或變亮的目標。唯一不影響結果的是完全沒有變化的視窗（例如單色的背景）：
+# 這些視窗的匹配值一定是 0，以相鄰像素差異的積分圖排除後，只對剩下的區塊執行 matchTemplate。
+# 積分圖需要處理整張畫面，因此先以取樣的單色區塊估計篩選效果，估計不會比較快時直接完整匹配。
+PREFILTER_CELL = 64  # 保留位置以此大小的格子合併成區塊後再匹配
+PREFILTER_SAMPLE_BLOCK = 16  # 估計篩選效果時，以此大小的區塊取樣判斷是否單色
+# 成本模型的係數（毫秒 / 像素），由 test/benchmark/bench_prefilter.py 量測後調整；
+# matchTemplate 的耗時與匹配結果的大小成正比，因此區塊的成本以保留的結果比例乘上完整匹配的成本估計
+PREFILTER_PREP_COST_PER_PIXEL = 4.0e-6  # 相鄰像素差異的積分圖：每個畫面像素 × 通道，同一畫面只計算一次
+PREFILTER_MASK_COST_PER_RESULT = 5.0e-6 # 排除位置與合併區塊：每個匹配結果
+
+class PrefilterStats:
+    """單色視窗預篩選排除的位置比例，以及因篩選效果不佳而改用完整匹配的次數"""
+
+    def __init__(self):
+        self.calls = 0
+        self.windows = 0
+        self.survivors = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def record(self, windows, survivors, fallback):
+        with self._lock:
+            self.calls += 1
+            self.windows += windows
+            self.survivors += survivors
+            self.fallbacks += int(fallback)
+
+    def summary(self):
+        if not self.calls:
+            return "單色視窗預篩選：未使用"
+        pruned = 1 - self.survivors / self.windows if self.windows else 0.0
+        return (f"單色視窗預篩選：{self.calls} 次，排除 {pruned:.1%} 的位置，"
+                f"篩選效果不佳改用完整匹配 {self.fallbacks} 次")
+
+prefilter_stats = PrefilterStats()
+
+def _cell_fraction(occupied, result_height, result_width, cell_height, cell_width):
+    """保留的格子涵蓋的匹配結果比例（邊緣的格子只計算實際的大小）"""
+    heights = np.minimum(cell_height, result_height - np.arange(0, result_height, cell_height))
+    widths = np.minimum(cell_width, result_width - np.arange(0, result_width, cell_width))
+    return float(heights @ occupied.astype(np.float64) @ widths) / (result_height * result_width)
+
+def _any_in_ranges(values, length, size, axis):
+    """把 values 沿 axis 以取樣區塊為單位的值，合併成每 size 個位置一格（共 length 個位置）"""
+    starts = np.arange(0, length, size)
+    ends = np.minimum(starts + size, length) - 1
+    counts = np.insert(np.cumsum(values, axis=axis, dtype=np.int32), 0, 0, axis=axis)
+    return (np.take(counts, ends // PREFILTER_SAMPLE_BLOCK + 1, axis=axis)
+            - np.take(counts, starts // PREFILTER_SAMPLE_BLOCK, axis=axis)) > 0
+
+def estimate_prefilter_fraction(image, template, views=None):
+    """
+    以取樣的單色區塊估計預篩選後仍需以 matchTemplate 匹配的結果比例
+
+    與 match_prefilter 合併區塊的方式相同，只是以取樣的單色區塊代替逐一視窗：
+    視窗涵蓋的區塊都是單色時才會被排除。取樣之間的細小圖案可能被忽略，因此只是估計。
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        views (FrameViews): 畫面的衍生表示，取樣結果在同一畫面的模板之間共用
+
+    Returns:
+        float: 保留的格子涵蓋的匹配結果 / 全部的匹配結果，介於 0 與 1 之間
+    """
+    template_height, template_width = template.shape[:2]
+    if (template.reshape(template_height * template_width, -1) == template[0, 0]).all():
+        # 單色的模板：matchTemplate 對每個視窗都給出 1，單色的視窗也不能排除
+        return 1.0
+    result_height = image.shape[0] - template_height + 1
+    result_width = image.shape[1] - template_width + 1
+    views = views if views is not None else FrameViews(image)
+    busy = np.logical_not(views.flat_blocks(PREFILTER_SAMPLE_BLOCK)).view(np.uint8)
+    # 從某個區塊開始的視窗，向右下最多涵蓋 (模板大小 - 1) // 區塊大小 + 2 個區塊
+    reach = ((template_height - 1) // PREFILTER_SAMPLE_BLOCK + 2, (template_width - 1) // PREFILTER_SAMPLE_BLOCK + 2)
+    needed = cv2.dilate(busy, np.ones(reach, np.uint8), anchor=(0, 0),
+                        borderType=cv2.BORDER_CONSTANT, borderValue=0)
+    cell_height = max(PREFILTER_CELL, template_height)
+    cell_width = max(PREFILTER_CELL, template_width)
+    occupied = _any_in_ranges(needed, result_height, cell_height, 0)
+    occupied = _any_in_ranges(occupied, result_width, cell_width, 1)
+    return _cell_fraction(occupied, result_height, result_width, cell_height, cell_width)
+
+def estimate_prefilter_cost(image, template, views=None):
+    """
+    估計單色視窗預篩選的耗時（毫秒）：建立積分圖與排除位置，加上保留的區塊的 matchTemplate
+
+    同一畫面的積分圖已經計算過時不再計入。
+    """
+    channels = image.shape[2] if image.ndim > 2 else 1
+    frame_pixels = image.shape[0] * image.shape[1]
+    spatial = SPATIAL_COST_PER_PIXEL * frame_pixels * channels
+    fraction = estimate_prefilter_fraction(image, template, views)
+    result_pixels = (image.shape[0] - template.shape[0] + 1) * (image.shape[1] - template.shape[1] + 1)
+    prep = 0.0
+    if views is None or not views.has('change_integrals'):
+        prep = PREFILTER_PREP_COST_PER_PIXEL * frame_pixels * channels
+    return prep + PREFILTER_MASK_COST_PER_RESULT * result_pixels + spatial * fraction
+
+def prefilter_mask(image, template, views=None):
+    """
+    找出有變化的視窗：沒有任何變化的視窗，TM_CCOEFF_NORMED 一定是 0，不需要匹配
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        views (FrameViews): image 的衍生表示，相鄰像素差異的積分圖在同一畫面的模板之間共用
+
+    Returns:
+        numpy.ndarray: bool 矩陣，大小與匹配結果相同，True 表示需要精確匹配
+    """
+    template_height, template_width = template.shape[:2]
+    result_height = image.shape[0] - template_height + 1
+    result_width = image.shape[1] - template_width + 1
+    views = views if views is not None else FrameViews(image)
+    horizontal, vertical = views.change_integrals()
+
+    def buffer(name, dtype):
+        if views.context is None:
+            return None
+        return views.context.buffer(name, (result_height, result_width), dtype)
+
+    def window(integral, height, width, out):
+        """視窗內（height x width 個相鄰像素對）不同的像素對數"""
+        total = np.subtract(integral[height:height + result_height, width:width + result_width],
+                            integral[:result_height, width:width + result_width], out=out)
+        total -= integral[height:height + result_height, :result_width]
+        total += integral[:result_height, :result_width]
+        return total
+
+    changes = window(horizontal, template_height, template_width - 1, buffer('prefilter_changes', np.int32))
+    changes += window(vertical, template_height - 1, template_width, buffer('prefilter_vertical', np.int32))
+    return cv2.compare(changes, 0, cv2.CMP_GT, dst=buffer('prefilter_mask', np.uint8)).view(bool)
+
+def match_prefilter(image, template, views=None):
+    """
+    排除沒有任何變化的視窗後，只對保留的區塊執行 TM_CCOEFF_NORMED
+
+    保留的位置以格子合併成區塊，每個區塊以 matchTemplate 精確計算；被排除的視窗匹配值為 0，
+    因此結果與 match_full 相同。畫面有大片單色區域時（例如選單的背景）才會比較快：
+    取樣估計或實際需要匹配的區塊太多時直接改用 match_full，估計不夠時不會建立積分圖。
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        views (FrameViews): 畫面的衍生表示，相鄰像素差異的積分圖在同一畫面的模板之間共用
+
+    Returns:
+        tuple: (最高匹配值, 最高匹配值的左上角座標 (x, y))
+    """
+    template_height, template_width = template.shape[:2]
+    views = views if views is not None else FrameViews(image)
+    if estimate_prefilter_cost(image, template, views) >= estimate_match_costs(image.shape, template.shape)[0]:
+        # 取樣估計不會比較快：不建立積分圖，直接完整匹配
+        windows = (image.shape[0] - template_height + 1) * (image.shape[1] - template_width + 1)
+        prefilter_stats.record(windows, windows, True)
+        return match_full(image, template, views)
+    return _match_blocks(image, template, views)
+
+def _match_blocks(image, template, views):
+    """建立排除位置後只匹配保留的區塊，實際保留的格子涵蓋整張畫面時改用 match_full"""
+    template_height, template_width = template.shape[:2]
+    mask = prefilter_mask(image, template, views)
+    result_height, result_width = mask.shape
+    survivors = int(np.count_nonzero(mask))
+    cell_height = max(PREFILTER_CELL, template_height)
+    cell_width = max(PREFILTER_CELL, template_width)
+
+    occupied = np.logical_or.reduceat(mask, np.arange(0, result_height, cell_height), axis=0)
+    occupied = np.logical_or.reduceat(occupied, np.arange(0, result_width, cell_width), axis=1)
+    # 取樣忽略了細小的圖案時，實際保留的格子可能涵蓋整張畫面，分塊匹配只會更慢
+    if occupied.all():
+        prefilter_stats.record(mask.size, survivors, True)
+        return match_full(image, template, views)
+    prefilter_stats.record(mask.size, survivors, False)
+
+    best_val, best_loc = -1.0, (0, 0)
+    for row in range(occupied.shape[0]):
+        # 同一列相鄰的格子合併成一個區塊，減少重複匹配的邊緣
+        columns = np.flatnonzero(occupied[row])
+        if not len(columns):
+            continue
+        runs = np.split(columns, np.flatnonzero(np.diff(columns) > 1) + 1)
+        top = row * cell_height
+        bottom = min(top + cell_height, result_height)
+        for run in runs:
+            left = int(run[0]) * cell_width
+            right = min((int(run[-1]) + 1) * cell_width, result_width)
+            block = image[top:bottom + template_height - 1, left:right + template_width - 1]
+            _, max_val, _, (x, y) = cv2.minMaxLoc(_match_template(block, template, views, 'block'))
+            if max_val > best_val or (max_val == best_val and (top + y, left + x) < best_loc[::-1]):
+                best_val, best_loc = max_val, (left + x, top + y)
+
+    if best_val <= 0 and survivors < mask.size:
+        # 保留的位置都不是正值：最高分是被排除的視窗的 0，與 minMaxLoc 相同取第一個
+        flat = int(np.argmin(mask))
+        flat_loc = (flat % result_width, flat // result_width)
+        if best_val < 0 or flat_loc[::-1] < best_loc[::-1]:
+            return 0.0, flat_loc
+    return best_val, best_loc
+
+def match_auto(image, template, views=None):
+    """
+    依成本模型自動選擇 matchTemplate、FFT 或單色視窗預篩選
+
+    預篩選的效果取決於畫面內容，以 estimate_prefilter_fraction 取樣估計。
+    """
+    spatial_cost, fft_cost = estimate_match_costs(image.shape, template.shape)
+    views = views if views is not None else FrameViews(image)
+    prefilter_cost = estimate_prefilter_cost(image, template, views)
+    if prefilter_cost < min(spatial_cost, fft_cost):
+        return _match_blocks(image, template, views)
+    if fft_cost < spatial_cost:
+        return match_fft(image, template, views)
+    return match_full(image, template, views)
+
+def result_map(image, template, views=None):
+    """依成本模型以 matchTemplate 或 FFT 計算完整的匹配值矩陣"""
+    spatial_cost, fft_cost = estimate_match_costs(image.shape, template.shape)
+    if fft_cost < spatial_cost:
+        return fft_result_map(image, template, views)
+    return _match_template(image, template, views)
+
+MATCHERS = {
+    'auto': match_auto,
+    'full': match_full,
+    'fft': match_fft,
+    'pyramid': match_pyramid,
+    'tiled': match_tiled,
+    'prefilter': match_prefilter,
+}
+
+# 灰階匹配後的顏色確認：匹配視窗與模板都縮成 COLOR_VERIFY_GRID x COLOR_VERIFY_GRID 的小圖，
+# 每一格各通道的差距都不超過 COLOR_VERIFY_TOLERANCE 才算顏色相同
+COLOR_MODES = ('color', 'gray', 'gray_verify')
+COLOR_VERIFY_GRID = 4
+COLOR_VERIFY_TOLERANCE = 32
+
+def verify_color(image, template, location, tolerance=COLOR_VERIFY_TOLERANCE):
+    """
+    確認匹配位置的顏色與模板相同
+
+    灰階匹配無法分辨亮度相近、顏色不同的圖案（例如紅色與綠色的按鈕），
+    只比較匹配視窗的粗略顏色分佈，成本與模板大小成正比，與畫面大小無關。
+
+    Args:
+        image (numpy.ndarray): BGR 畫面
+        template (numpy.ndarray): BGR 模板圖片
+        location (tuple): 匹配位置的左上角座標 (x, y)
+        tolerance (int): 每格各通道平均值允許的差距
+
+    Returns:
+        bool: 顏色是否相同
+    """
+    template_height, template_width = template.shape[:2]
+    x, y = location
+    window = image[y:y + template_height, x:x + template_width]
+    if window.shape[:2] != (template_height, template_width):
+        return False
+    grid = (min(COLOR_VERIFY_GRID, template_width), min(COLOR_VERIFY_GRID, template_height))
+    window_colors = cv2.resize(window, grid, interpolation=cv2.INTER_AREA)
+    template_colors = cv2.resize(template, grid, interpolation=cv2.INTER_AREA)
+    return int(cv2.absdiff(window_colors, template_colors).max()) <= tolerance
+
+def gray_matcher(match, verify=False):
+    """
+    把匹配函式改為在灰階畫面上匹配，通道數減為三分之一
+
+    灰階畫面取自 views.gray_views()，同一張畫面的所有模板共用；灰階模板由模板快取取得（模板索引中已預先編譯）。
+    verify 為 True 時再以 verify_color 確認最高分的位置，顏色不同時匹配值為 -1。
+
+    Args:
+        match (function): 匹配函式
+        verify (bool): 是否確認最高分位置的顏色
+
+    Returns:
+        function: 簽名與 match 相同的函式，image 與 template 仍傳入 BGR
+    """
+    def match_gray(image, template, views=None):
+        gray_views = (views if views is not None else FrameViews(image)).gray_views()
+        max_val, max_loc = match(gray_views.image, derive_template(template, gray=True), views=gray_views)
+        if verify and max_val > -1 and image.ndim == 3 and not verify_color(image, template, max_loc):
+            return -1.0, max_loc
+        return max_val, max_loc
+    return match_gray
+
+def get_matcher(name=None, color_mode=None):
+    """
+    依名稱取得匹配函式，未知的名稱使用預設的自動選擇
+
+    Args:
+        name (str): 'auto'、'full'、'fft'、'pyramid'、'tiled' 或 'prefilter'，None 表示預設
+        color_mode (str): 'color' 以 BGR 匹配，'gray' 以灰階匹配，'gray_verify' 以灰階匹配後確認顏色；
+            None 表示 'color'
+
+    Returns:
+        function: 簽名為 (image, template, views=None) -> (匹配值, 左上角座標) 的函式
+    """
+    match = MATCHERS.get(name or DEFAULT_MATCHER, MATCHERS[DEFAULT_MATCHER])
+    if color_mode in ('gray', 'gray_verify'):
+        return gray_matcher(match, verify=color_mode == 'gray_verify')
+    return match
+
+def match_near(image, template, location, margin=32, views=None):
+    """
+    只在指定位置附近的小範圍內匹配
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        location (tuple): 預期的左上角座標 (x, y)，相對於 image
+        margin (int): 往四周擴展的像素數
+        views (FrameViews): 畫面的衍生表示，只使用其中的 MatchContext 結果緩衝區
+
+    Returns:
+        tuple or None: (匹配值, 左上角座標)，範圍超出畫面而無法匹配時返回 None
+    """
+    image_height, image_width = image.shape[:2]
+    template_height, template_width = template.shape[:2]
+    x, y = location
+    left, top = max(0, x - margin), max(0, y - margin)
+    right = min(image_width, x + template_width + margin)
+    bottom = min(image_height, y + template_height + margin)
+    if right - left < template_width or bottom - top < template_height:
+        return None
+    result = _match_template(image[top:bottom, left:right], template, views, 'near')
+    _, max_val, _, (local_x, local_y) = cv2.minMaxLoc(result)
+    return max_val, (left + local_x, top + local_y)
+
+def match_batch(image, templates, match=match_full, views=None, threshold=None):
+    """
+    在同一張畫面上匹配多個模板，畫面的前處理（例如金字塔縮圖、積分圖）只做一次
+
+    Args:
+        image (numpy.ndarray): 畫面
+        templates (list): 模板圖片列表
+        match (function): 匹配函式
+        views (FrameViews): 畫面的衍生表示，None 表示只在這次呼叫內共用
+        threshold (float | list | dict): 匹配門檻，None 表示返回所有模板的結果；
+            list 依 templates 的順序指定各模板的門檻，dict 以模板的索引指定，未指定的模板不匹配
+
+    Returns:
+        threshold 為 None 時：list，每個模板的 (匹配值, 左上角座標)，順序與 templates 相同
+        否則：tuple (所有匹配模板的最高匹配值, [(模板索引, 匹配值, 左上角座標), ...])，只包含達到門檻的模板
+    """
+    image_height, image_width = image.shape[:2]
+    if views is None:
+        views = FrameViews(image)
+    if threshold is None:
+        thresholds = [None] * len(templates)
+    elif isinstance(threshold, dict):
+        thresholds = [threshold.get(index) for index in range(len(templates))]
+    elif isinstance(threshold, (list, tuple)):
+        thresholds = list(threshold)
+    else:
+        thresholds = [threshold] * len(templates)
+
+    results = []
+    best_val, hits = -1.0, []
+    for index, template in enumerate(templates):
+        if threshold is not None and thresholds[index] is None:
+            continue
+        if template.shape[0] > image_height or template.shape[1] > image_width:
+            val, loc = -1.0, (0, 0)
+        else:
+            val, loc = match(image, template, views=views)
+        results.append((val, loc))
+        best_val = max(best_val, val)
+        if threshold is not None and val >= thresholds[index]:
+            hits.append((index, val, loc))
+    if threshold is None:
+        return results
+    return best_val, hits
+
+def suppress_overlaps(locations, scores, box_size, max_overlap=0.3, max_hits=None):
+    """
+    非極大值抑制：依分數由高到低保留位置，與已保留位置重疊過多的候選一律捨棄
+
+    所有候選的大小都是模板大小，重疊面積只由座標差決定，每一輪以向量運算一次比較所有剩餘候選。
+
+    Args:
+        locations (numpy.ndarray): 候選的左上角座標，N x 2 (x, y)
+        scores (numpy.ndarray): 候選的匹配值
+        box_size (tuple): 模板大小 (寬, 高)
+        max_overlap (float): 允許的最大重疊比例 (IoU)
+        max_hits (int): 最多保留幾個，None 表示不限
+
+    Returns:
+        list: 保留的候選索引，依分數由高到低排列
+    """
+    width, height = box_size
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size and (max_hits is None or len(keep) < max_hits):
+        best, rest = order[0], order[1:]
+        keep.append(int(best))
+        overlap_x = np.maximum(0, width - np.abs(locations[rest, 0] - locations[best, 0]))
+        overlap_y = np.maximum(0, height - np.abs(locations[rest, 1] - locations[best, 1]))
+        intersection = overlap_x * overlap_y
+        iou = intersection / (2 * width * height - intersection)
+        order = rest[iou <= max_overlap]
+    return keep
+
+def match_all(image, template, threshold, max_overlap=0.3, max_hits=50, views=None, color_mode=None):
+    """
+    找出畫面中所有達到門檻的模板位置（例如清單中每一列的同一個按鈕）
+
+    先以 3x3 膨脹只保留局部最大值，再以 suppress_overlaps 去除重疊的位置。
+    需要完整的匹配值矩陣，因此固定以 result_map 計算，不使用金字塔或分塊匹配。
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template (numpy.ndarray): 模板圖片
+        threshold (float): 匹配值門檻
+        max_overlap (float): 兩個位置允許的最大重疊比例 (IoU)
+        max_hits (int): 最多返回幾個位置
+        views (FrameViews): 畫面的衍生表示
+        color_mode (str): 與 get_matcher 相同；'gray_verify' 時每個達到門檻的位置都以 verify_color 確認，
+            顏色不同的位置在去除重疊之前就排除，沒有任何位置顏色相同時最高匹配值為 -1
+
+    Returns:
+        tuple: (最高匹配值, [(匹配值, 左上角座標 (x, y)), ...])，位置依匹配值由高到低排列
+    """
+    if template.shape[0] > image.shape[0] or template.shape[1] > image.shape[1]:
+        return -1.0, []
+    verify = color_mode == 'gray_verify' and image.ndim == 3
+    if color_mode in ('gray', 'gray_verify'):
+        match_views = (views if views is not None else FrameViews(image)).gray_views()
+        result = result_map(match_views.image, derive_template(template, gray=True), match_views)
+    else:
+        result = result_map(image, template, views)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    if max_val < threshold:
+        if verify and not verify_color(image, template, max_loc):
+            return -1.0, []
+        return max_val, []
+    dilated = peaks = above = None
+    if views is not None and views.context is not None:
+        dilated = views.context.buffer('dilated', result.shape, np.float32)
+        peaks = views.context.buffer('peaks', result.shape, np.bool_)
+        above = views.context.buffer('above_threshold', result.shape, np.bool_)
+    dilated = cv2.dilate(result, np.ones((3, 3), np.uint8), dst=dilated)
+    peaks = np.greater_equal(result, dilated, out=peaks)
+    peaks &= np.greater_equal(result, threshold, out=above)
+    # 以下的暫存陣列只與達到門檻的局部最大值個數成正比
+    ys, xs = np.nonzero(peaks)
+    if verify:
+        colored = np.array([verify_color(image, template, (int(x), int(y))) for x, y in zip(xs, ys)], dtype=bool)
+        ys, xs = ys[colored], xs[colored]
+        if not len(ys):
+            return -1.0, []
+    scores = result[ys, xs]
+    locations = np.stack([xs, ys], axis=1)
+    template_height, template_width = template.shape[:2]
+    keep = suppress_overlaps(locations, scores, (template_width, template_height), max_overlap, max_hits)
+    if verify:
+        max_val = float(scores[keep[0]])
+    return max_val, [(float(scores[i]), (int(locations[i, 0]), int(locations[i, 1]))) for i in keep]
+
+def order_points(points, order='reading', row_tolerance=10):
+    """
+    排列要依序點擊的位置
+
+    Args:
+        points (list): 座標 (x, y) 列表，第一個為匹配值最高的位置
+        order (str): 'reading' 由上而下、由左而右；'nearest' 從第一個位置開始，每次移到最近的下一個位置
+        row_tolerance (int): reading 模式中，y 座標相差不超過此值的位置視為同一列
+
+    Returns:
+        list: 排列後的座標
+    """
+    if len(points) < 2:
+        return list(points)
+    if order == 'nearest':
+        remaining = np.array(points[1:], dtype=np.float64)
+        ordered = [tuple(points[0])]
+        while len(remaining):
+            distances = np.hypot(remaining[:, 0] - ordered[-1][0], remaining[:, 1] - ordered[-1][1])
+            nearest = int(np.argmin(distances))
+            ordered.append(tuple(int(v) for v in remaining[nearest]))
+            remaining = np.delete(remaining, nearest, axis=0)
+        return ordered
+
+    # 依 y 排序後，與該列第一個位置相差超過容許值就換下一列
+    by_y = sorted(points, key=lambda point: (point[1], point[0]))
+    rows = []
+    for point in by_y:
+        if rows and point[1] - rows[-1][0][1] <= row_tolerance:
+            rows[-1].append(point)
+        else:
+            rows.append([point])
+    return [point for row in rows for point in sorted(row)]
+
+def match_multiscale(image, template_path, match=match_full, confidence=None,
+                     scales=SCALE_CANDIDATES, refinements=SCALE_REFINEMENTS, views=None):
+    """
+    以多個縮放比例的模板尋找圖片，用來找出模板與目前畫面解析度的比例
+
+    依序嘗試 scales，匹配值達到 confidence 時提早結束；
+    否則在最佳比例附近再以 refinements 微調。
+
+    Args:
+        image (numpy.ndarray): 畫面
+        template_path (str): 模板路徑，各比例的模板由共用快取產生
+        match (function): 單一比例使用的匹配函式
+        confidence (float): 提早結束的匹配值，None 表示嘗試所有比例
+        views (FrameViews): 畫面的衍生表示，各比例共用
+
+    Returns:
+        tuple: (最高匹配值, 左上角座標, 縮放比例, 該比例的模板)
+    """
+    image_height, image_width = image.shape[:2]
+    if views is None:
+        views = FrameViews(image)
+    best = (-1.0, (0, 0), 1.0, None)
+
+    def try_scale(scale):
+        nonlocal best
+        template = load_template(template_path, scale=scale)
+        if template.shape[0] > image_height or template.shape[1] > image_width:
+            return False
+        max_val, max_loc = match(image, template, views=views)
+        if max_val > best[0]:
+            best = (max_val, max_loc, scale, template)
+        return confidence is not None and max_val >= confidence
+
+    for scale in scales:
+        if try_scale(scale):
+            return best
+    if best[3] is not None:
+        base_scale = best[2]
+        for refinement in refinements:
+            if try_scale(round(base_scale * refinement, 4)):
+                break
+    return best
+
+class ScaleCalibration:
+    """
+    記錄每個設備（ADB 序號或螢幕）模板需要縮放的比例，存放在 cache/scale_calibration.json。
+
+    每筆記錄同時保存校正時的畫面大小，解析度改變後記錄自動失效並重新校正。
+    尚未校正時，多尺度校正失敗後以指數退避延後下一次校正（只記錄在記憶體中）。
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): JSON 檔案路徑
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._sweeps = {}  # 設備 -> (連續失敗次數, 下一次可以校正的 time.monotonic())
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, device_key, screen_size):
+        """
+        Args:
+            device_key (str): 設備識別，例如 'adb:emulator-5554'、'monitor:0'
+            screen_size (tuple): 目前完整畫面的 (寬, 高)
+
+        Returns:
+            float or None: 已校正的縮放比例，尚未校正時返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(device_key)
+        if entry and entry.get('screen') == list(screen_size):
+            return entry['scale']
+        return None
+
+    def set(self, device_key, screen_size, scale):
+        """記錄縮放比例並寫入檔案"""
+        with self._lock:
+            self._entries[device_key] = {'scale': scale, 'screen': list(screen_size)}
+            self._sweeps.pop(device_key, None)
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False, indent=4)
+            except OSError as e:
+                print(f"無法寫入縮放比例校正檔: {e}")
+
+    def forget(self, device_key):
+        """清除設備的校正結果"""
+        with self._lock:
+            self._entries.pop(device_key, None)
+            self._sweeps.pop(device_key, None)
+
+    def sweep_due(self, device_key):
+        """是否已過了退避時間，可以再執行一次多尺度校正"""
+        with self._lock:
+            _, next_time = self._sweeps.get(device_key, (0, 0.0))
+        return time.monotonic() >= next_time
+
+    def sweep_failed(self, device_key):
+        """記錄一次失敗的多尺度校正，延後下一次校正"""
+        initial, limit = CALIBRATION_BACKOFF
+        with self._lock:
+            failures = self._sweeps.get(device_key, (0, 0.0))[0] + 1
+            self._sweeps[device_key] = (failures, time.monotonic() + min(limit, initial * 2 ** (failures - 1)))
+
+_calibrations = {}
+_calibrations_lock = threading.Lock()
+
+def get_scale_calibration(path):
+    """取得指定檔案的共用 ScaleCalibration"""
+    with _calibrations_lock:
+        calibration = _calibrations.get(path)
+        if calibration is None:
+            calibration = ScaleCalibration(path)
+            _calibrations[path] = calibration
+        return calibration
+
+class LocationMemory:
+    """
+    記錄每個模板在各設備上最後被找到的位置，存放在 cache/last_locations.json。
+
+    下次尋找時先用 match_near 檢查該位置附近，找不到才搜尋整個畫面；
+    fast_hits / fast_misses 記錄這個快速路徑的命中情況。
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): JSON 檔案路徑
+        """
+        self.path = path
+        self.fast_hits = 0
+        self.fast_misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _template_key(template_path):
+        return os.path.normcase(os.path.abspath(template_path))
+
+    def lookup(self, device_key, template_path):
+        """
+        Returns:
+            tuple or None: 上次找到的左上角座標 (完整畫面座標)
+        """
+        with self._lock:
+            location = self._entries.get(device_key, {}).get(self._template_key(template_path))
+        return tuple(location) if location else None
+
+    def remember(self, device_key, template_path, location):
+        """記錄找到的位置，位置有變動時才寫入檔案"""
+        key = self._template_key(template_path)
+        location = [int(location[0]), int(location[1])]
+        with self._lock:
+            device_entries = self._entries.setdefault(device_key, {})
+            if device_entries.get(key) == location:
+                return
+            device_entries[key] = location
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False, indent=4)
+            except OSError as e:
+                print(f"無法寫入位置記錄檔: {e}")
+
+    def record(self, hit):
+        """記錄一次快速路徑的結果"""
+        if hit:
+            self.fast_hits += 1
+        else:
+            self.fast_misses += 1
+
+    def summary(self):
+        total = self.fast_hits + self.fast_misses
+        rate = self.fast_hits / total * 100 if total else 0
+        return f"上次位置快速匹配：命中 {self.fast_hits}/{total} 次 ({rate:.0f}%)"
+
+_location_memories = {}
+_location_memories_lock = threading.Lock()
+
+def get_location_memory(path):
+    """取得指定檔案的共用 LocationMemory"""
+    with _location_memories_lock:
+        memory = _location_memories.get(path)
+        if memory is None:
+            memory = LocationMemory(path)
+            _location_memories[path] = memory
+        return memory
@@ -0,0 +1,54 @@
+"""
+以假 ADB server 量測 adb_client 與常駐 shell 的吞吐量，不需要連接設備。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_adb_client.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from fake_adb_server import FakeADBServer
+
+def measure(name, func, repeat):
+    func()  # 暖身
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {repeat / elapsed:10.1f} 次/秒  ({elapsed / repeat * 1000:.2f} ms/次)")
+
+def main():
+    with FakeADBServer() as server:
+        os.environ['ANDROID_ADB_SERVER_PORT'] = str(server.port)
+        from adb_client import get_client, AsyncADBClient
+        from adb_session import get_shell_session
+        from capture import ADBScreencapSource
+
+        client = get_client()
+        assert client.devices() == [(server.serial, 'device')]
+
+        measure("host:devices", client.devices, 500)
+        measure("shell:echo", lambda: client.shell(server.serial, 'echo hi'), 500)
+        measure("exec:screencap (raw 1080x2400)", ADBScreencapSource(server.serial).grab, 50)
+        measure("exec:screencap -p", ADBScreencapSource(server.serial, raw=False).grab, 20)
+
+        session = get_shell_session(server.serial)
+        measure("常駐 shell tap", lambda: session.tap(100, 200), 500)
+        measure("常駐 shell tap x20 (單次寫入)", lambda: session.tap_many([(100, 200)] * 20), 100)
+        measure("常駐 shell screencap", session.screencap, 50)
+
+        async def parallel_devices(count):
+            async_client = AsyncADBClient()
+            await asyncio.gather(*(async_client.devices() for _ in range(count)))
+
+        start = time.perf_counter()
+        asyncio.run(parallel_devices(500))
+        elapsed = time.perf_counter() - start
+        print(f"{'asyncio host:devices x500':<32} {500 / elapsed:10.1f} 次/秒")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+量測 matchTemplate 與 FFT 匹配在不同模板大小下的耗時，驗證 template_matching 的成本模型。
+
+每個模板大小印出兩者的實際耗時、成本模型的預估，以及模型的選擇是否正確；
+最後以量測結果算出建議的成本係數，可用來更新 template_matching.py 中的常數。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_fft.py [畫面寬] [畫面高]
+"""
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+import template_matching
+from template_matching import match_full, match_fft, estimate_match_costs
+
+TEMPLATE_SIZES = (16, 32, 64, 128, 256, 400, 600, 800, 1000)
+
+def timed(func, *args, repeat=3):
+    func(*args)  # 暖身，同時建立模板頻譜快取
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1920
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1080
+    scene = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    print(f"畫面 {width}x{height}")
+    print(f"{'模板':>6}{'full ms':>10}{'fft ms':>10}{'預估 full':>11}{'預估 fft':>10}  {'選擇':<6}{'較快':<6}匹配值差異")
+    correct = 0
+    spatial_rates = []
+    for size in TEMPLATE_SIZES:
+        if size >= min(width, height):
+            continue
+        template = scene[10:10 + size, 20:20 + size].copy()
+        (full_val, full_loc), full_ms = timed(match_full, scene, template)
+        (fft_val, fft_loc), fft_ms = timed(match_fft, scene, template)
+        spatial_cost, fft_cost = estimate_match_costs(scene.shape, template.shape)
+        chosen = 'fft' if fft_cost < spatial_cost else 'full'
+        faster = 'fft' if fft_ms < full_ms else 'full'
+        correct += chosen == faster
+        spatial_rates.append(full_ms / (height * width * 3))
+        assert fft_loc == full_loc, f"位置不同: {fft_loc} / {full_loc}"
+        print(f"{size:>6}{full_ms:10.1f}{fft_ms:10.1f}{spatial_cost:11.1f}{fft_cost:10.1f}  "
+              f"{chosen:<6}{faster:<6}{abs(fft_val - full_val):.2e}")
+
+    print(f"\n成本模型選擇正確 {correct}/{len(spatial_rates)}")
+    print(f"建議 SPATIAL_COST_PER_PIXEL = {np.median(spatial_rates):.2e} "
+          f"(目前 {template_matching.SPATIAL_COST_PER_PIXEL:.2e})")
+
+    # FFT 每個通道的固定成本：畫面 DFT + 頻譜相乘 + 分攤的反向 DFT
+    dft_height, dft_width = cv2.getOptimalDFTSize(height), cv2.getOptimalDFTSize(width)
+    padded = np.zeros((dft_height, dft_width), dtype=np.float32)
+    spectrum, dft_ms = timed(cv2.dft, padded)
+    _, multiply_ms = timed(cv2.mulSpectrums, spectrum, spectrum, 0)
+    _, idft_ms = timed(cv2.idft, spectrum, None, cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+    channel_ms = dft_ms + multiply_ms + idft_ms / 3
+    # 未包含型別轉換與補齊的時間，實際係數會比這個值大
+    print(f"FFT_COST_PER_PIXEL 下限 = {channel_ms / (dft_height * dft_width):.2e} "
+          f"(目前 {template_matching.FFT_COST_PER_PIXEL:.2e})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+比較以 BGR 彩色、灰階、灰階 + 顏色確認三種模式匹配 detect/ 模板的耗時與誤判率。
+
+以 detect/ 中的其他圖片（不含與模板相同的圖片）隨機拼貼在平滑的背景上作為假畫面，對每張模板量測：
+- 找到：模板貼在固定位置時，是否在該位置達到信心值
+- 換色誤判：只貼上色相旋轉後的模板（形狀相同、顏色不同）時，是否仍達到信心值；
+  只統計換色後與原圖平均差異至少 MIN_COLOR_DIFFERENCE 的模板，灰色的圖片換色後沒有差別
+耗時包含把畫面轉為灰階；實際輪詢時灰階畫面在同一畫面的模板之間共用。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_gray.py [匹配方式] [信心值]
+"""
+import glob
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from capture import FrameViews
+from template_cache import load_template
+from template_matching import get_matcher
+
+DETECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'detect')
+MODES = ('color', 'gray', 'gray_verify')
+WIDTH, HEIGHT = 1920, 1080
+MIN_COLOR_DIFFERENCE = 10
+
+def timed(func, *args, repeat=3):
+    func(*args)  # 暖身
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def build_scene(templates, rng):
+    """平滑的隨機背景上隨機拼貼所有模板"""
+    background = rng.integers(0, 255, (HEIGHT // 16 + 1, WIDTH // 16 + 1, 3), dtype=np.uint8)
+    scene = cv2.resize(background, (WIDTH, HEIGHT), interpolation=cv2.INTER_LINEAR)
+    for template in templates:
+        template_height, template_width = template.shape[:2]
+        if template_height < HEIGHT and template_width < WIDTH:
+            x = int(rng.integers(0, WIDTH - template_width))
+            y = int(rng.integers(0, HEIGHT - template_height))
+            scene[y:y + template_height, x:x + template_width] = template
+    return scene
+
+def recolor(template, hue_shift=60):
+    """旋轉色相（OpenCV 的色相範圍為 0-179），形狀與明暗分佈不變"""
+    hsv = cv2.cvtColor(template, cv2.COLOR_BGR2HSV)
+    hsv[:, :, 0] = (hsv[:, :, 0].astype(np.int16) + hue_shift) % 180
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+def main():
+    matcher = sys.argv[1] if len(sys.argv) > 1 else 'full'
+    confidence = float(sys.argv[2]) if len(sys.argv) > 2 else 0.8
+    rng = np.random.default_rng(0)
+    paths = sorted(glob.glob(os.path.join(DETECT_DIR, '*.png')))
+    templates = [load_template(path) for path in paths]
+    origin = (WIDTH // 3, HEIGHT // 3)
+
+    print(f"畫面 {WIDTH}x{HEIGHT}，匹配方式 {matcher}，信心值 {confidence}")
+    print(f"{'模板':<28}" + "".join(f"{mode + ' ms':>16}" for mode in MODES) + "  找到 / 換色誤判（- 表示不統計）")
+    totals = {mode: 0.0 for mode in MODES}
+    found = {mode: 0 for mode in MODES}
+    false_positives = {mode: 0 for mode in MODES}
+    count = colorful = 0
+    for path, template in zip(paths, templates):
+        template_height, template_width = template.shape[:2]
+        if template_height >= HEIGHT // 2 or template_width >= WIDTH // 2:
+            continue
+        count += 1
+        others = [other for other in templates if not np.array_equal(other, template)]
+        background = build_scene(others, rng)
+        present = background.copy()
+        present[origin[1]:origin[1] + template_height, origin[0]:origin[0] + template_width] = template
+        recolored = background.copy()
+        recolored_template = recolor(template)
+        recolored[origin[1]:origin[1] + template_height, origin[0]:origin[0] + template_width] = recolored_template
+        color_matters = cv2.absdiff(template, recolored_template).mean() >= MIN_COLOR_DIFFERENCE
+        colorful += color_matters
+
+        row = f"{os.path.basename(path)[:26]:<28}"
+        marks = []
+        for mode in MODES:
+            match = get_matcher(matcher, mode)
+            (val, loc), elapsed = timed(lambda: match(present, template, FrameViews(present)))
+            hit = val >= confidence and loc == origin
+            wrong_val, _ = match(recolored, template, FrameViews(recolored))
+            false_positive = color_matters and wrong_val >= confidence
+            totals[mode] += elapsed
+            found[mode] += hit
+            false_positives[mode] += false_positive
+            row += f"{elapsed:16.1f}"
+            marks.append(f"{'O' if hit else 'X'}{'-' if not color_matters else '!' if false_positive else '.'}")
+        print(row + "  " + " ".join(marks))
+
+    print()
+    for mode in MODES:
+        print(f"{mode:<12} 總耗時 {totals[mode]:8.0f} ms（{totals['color'] / totals[mode]:.1f} 倍）"
+              f"  找到 {found[mode]}/{count}  換色誤判 {false_positives[mode]}/{colorful}")
+
+if __name__ == '__main__':
+    main()
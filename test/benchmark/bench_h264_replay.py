@@ -0,0 +1,115 @@
+"""
+以預先錄好的 H.264 短片測試 ADBStreamCaptureSource 的解碼流程，不需要連接設備。
+
+同一段短片 (data/screenrecord_360x640.h264) 分別經過兩條路徑播放：
+  - ADBStreamCaptureSource.from_file：直接讀取檔案
+  - 假 ADB server 的 exec:screenrecord：經過 adb_client.open_stream 與 ADB socket 協定
+每張取得的畫面都確認大小為 360x640，且內容與產生短片時的畫面（expected_frame）相符，
+並印出解碼速度。短片播放完畢後串流會自動重新開啟，因此會從第一張畫面重新開始。
+
+短片由 expected_frame 產生，以 --generate 重新產生（需要可執行的 ffmpeg 且支援 libx264，
+可用環境變數 FFMPEG 指定路徑）。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_h264_replay.py [每條路徑的畫面數]
+    python test/benchmark/bench_h264_replay.py --generate
+"""
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from fake_adb_server import FakeADBServer
+
+CLIP_PATH = os.path.join(os.path.dirname(__file__), 'data', 'screenrecord_360x640.h264')
+CLIP_WIDTH, CLIP_HEIGHT = 360, 640
+CLIP_FRAMES = 30
+# 解碼後每個像素與原畫面的平均差距上限（有損壓縮與 YUV 4:2:0 的誤差）
+MAX_MEAN_ERROR = 4.0
+
+def expected_frame(index):
+    """第 index 張畫面：四條色帶，加上依畫面序號向右移動的白色方塊"""
+    frame = np.zeros((CLIP_HEIGHT, CLIP_WIDTH, 3), dtype=np.uint8)
+    band_height = CLIP_HEIGHT // 4
+    for band, color in enumerate(((255, 0, 0), (0, 255, 0), (0, 0, 255), (0, 255, 255))):
+        frame[band * band_height:(band + 1) * band_height] = color
+    left = 20 + index * 10
+    frame[300:340, left:left + 40] = 255
+    return frame
+
+def generate():
+    """以 ffmpeg 把 expected_frame 編碼成 screenrecord 相同格式的 H.264 原始串流"""
+    os.makedirs(os.path.dirname(CLIP_PATH), exist_ok=True)
+    command = [
+        os.environ.get('FFMPEG', 'ffmpeg'), '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{CLIP_WIDTH}x{CLIP_HEIGHT}', '-r', '30', '-i', '-',
+        '-c:v', 'libx264', '-preset', 'veryslow', '-crf', '12', '-bf', '0', '-g', '10',
+        '-pix_fmt', 'yuv420p', '-f', 'h264', CLIP_PATH,
+    ]
+    frames = b''.join(expected_frame(index).tobytes() for index in range(CLIP_FRAMES))
+    subprocess.run(command, input=frames, check=True)
+    print(f"已產生 {CLIP_PATH} ({os.path.getsize(CLIP_PATH)} bytes)")
+
+def identify(frame, expected):
+    """
+    找出與解碼畫面最接近的原畫面
+
+    Returns:
+        tuple: (原畫面序號, 平均差距)
+    """
+    errors = [np.abs(frame.astype(np.int16) - reference).mean() for reference in expected]
+    index = int(np.argmin(errors))
+    return index, errors[index]
+
+def replay(name, source, count, expected):
+    """
+    從 source 取得 count 張不同的畫面並逐一檢查，返回不符合的畫面數
+    """
+    failures = 0
+    seen = set()
+    last_index = -1
+    start = time.perf_counter()
+    with source:
+        for _ in range(count):
+            deadline = time.monotonic() + source.frame_timeout
+            while source.frame_index == last_index and time.monotonic() < deadline:
+                time.sleep(0.001)
+            frame = source.grab()
+            last_index = source.frame_index
+            if frame.shape != (CLIP_HEIGHT, CLIP_WIDTH, 3):
+                print(f"  {name}: 畫面大小錯誤 {frame.shape}")
+                failures += 1
+                continue
+            index, error = identify(frame, expected)
+            seen.add(index)
+            if error > MAX_MEAN_ERROR:
+                print(f"  {name}: 畫面內容不符，最接近第 {index} 張，平均差距 {error:.2f}")
+                failures += 1
+        decoded = source.frame_index
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} 取得 {count} 張（對應 {len(seen)} 張不同的原畫面），"
+          f"解碼 {decoded} 張，{decoded / elapsed:.1f} 張/秒，不符合 {failures} 張")
+    return failures
+
+def main():
+    if '--generate' in sys.argv:
+        generate()
+        return
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    expected = [expected_frame(index).astype(np.int16) for index in range(CLIP_FRAMES)]
+
+    with FakeADBServer(width=CLIP_WIDTH, height=CLIP_HEIGHT, video_path=CLIP_PATH) as server:
+        os.environ['ANDROID_ADB_SERVER_PORT'] = str(server.port)
+        from capture import ADBStreamCaptureSource
+
+        failures = replay("from_file", ADBStreamCaptureSource.from_file(CLIP_PATH), count, expected)
+        failures += replay("假 ADB server screenrecord", ADBStreamCaptureSource(server.serial), count, expected)
+
+    print("全部畫面都相符" if not failures else f"共 {failures} 張畫面不符合")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
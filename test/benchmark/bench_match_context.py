@@ -0,0 +1,76 @@
+"""
+比較每次輪詢配置新陣列與使用 MatchContext 重複使用緩衝區的耗時與記憶體配置量。
+
+以 detect/ 中的模板在多張假畫面上輪流匹配（模擬 FrameProducer 的環形緩衝區），
+near 為只在上次位置附近匹配 (match_near)，
+以 tracemalloc 統計每次輪詢由 NumPy 配置的記憶體峰值（不含第一次輪詢），並印出 MatchContext 回報的每次輪詢配置次數。
+OpenCV 內部的暫存記憶體不經過 tracemalloc，不包含在內。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_match_context.py [畫面寬] [畫面高] [輪詢次數]
+"""
+import glob
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from capture import FrameViews, MatchContext
+from template_cache import load_template
+from template_matching import get_matcher, match_batch, match_near
+
+DETECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'detect')
+MATCHERS = ('full', 'pyramid', 'tiled', 'fft', 'prefilter', 'near')
+
+def near_matcher(image, template, views=None):
+    """在畫面中央附近匹配，模擬以上次找到的位置匹配"""
+    location = ((image.shape[1] - template.shape[1]) // 2, (image.shape[0] - template.shape[0]) // 2)
+    return match_near(image, template, location, views=views)
+
+def run(frames, templates, match, polls, context):
+    """
+    依序在各畫面上匹配所有模板，第一次輪詢視為暖身
+
+    Returns:
+        tuple: (每次輪詢毫秒, 每次輪詢新增的記憶體峰值 MB, 每次輪詢的配置次數)
+    """
+    allocations = []
+    allocated = elapsed = 0.0
+    tracemalloc.start()
+    for poll in range(polls + 1):
+        frame = frames[poll % len(frames)]
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        match_batch(frame, templates, match, FrameViews(frame, context))
+        if poll:
+            elapsed += time.perf_counter() - start
+            allocated += max(0, tracemalloc.get_traced_memory()[1] - before)
+        if context is not None:
+            allocations.append(context.end_poll())
+    tracemalloc.stop()
+    return elapsed / polls * 1000, allocated / polls / 1024 / 1024, allocations
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 3840
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 2160
+    polls = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(3)]
+    templates = [load_template(path) for path in sorted(glob.glob(os.path.join(DETECT_DIR, '*.png')))[:4]]
+
+    print(f"畫面 {width}x{height}，模板 {len(templates)} 張，輪詢 {polls} 次")
+    print(f"{'匹配方式':<12}{'每次配置 ms':>12}{'重用 ms':>10}{'每次配置 MB':>14}{'重用 MB':>10}  重用時每次輪詢的配置次數")
+    for name in MATCHERS:
+        match = near_matcher if name == 'near' else get_matcher(name)
+        plain_ms, plain_mb, _ = run(frames, templates, match, polls, None)
+        context = MatchContext()
+        reuse_ms, reuse_mb, allocations = run(frames, templates, match, polls, context)
+        print(f"{name:<12}{plain_ms:12.1f}{reuse_ms:10.1f}{plain_mb:14.1f}{reuse_mb:10.1f}  {allocations}")
+    print(context.summary())
+
+if __name__ == '__main__':
+    main()
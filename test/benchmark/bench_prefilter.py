@@ -0,0 +1,147 @@
+"""
+比較單色視窗預篩選 (match_prefilter) 與完整 matchTemplate (match_full) 的耗時與結果。
+
+假畫面有兩種：
+  - 拼貼：幾塊單色的面板上拼貼 detect/ 中的其他圖片，面板之間是平滑的隨機背景（預篩選通常無效）
+  - 單色背景：整片單色的選單背景上只有幾個圖示（預篩選有效的情況）
+模板貼到固定位置，除了原圖，也包含變暗、變暗加偏移與提高對比的版本（TM_CCOEFF_NORMED 對這些變化不敏感），
+確認預篩選的最高匹配值與完整匹配相同，且位置在完整匹配結果中也是最高分（重複的圖片可能同分），
+並印出被排除的單色視窗比例與耗時（包含取樣估計與計算相鄰像素差異的積分圖），
+以及 match_auto 依成本模型選擇後的耗時。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_prefilter.py [畫面寬] [畫面高]
+"""
+import glob
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from capture import FrameViews
+from template_cache import load_template
+from template_matching import match_auto, match_prefilter, prefilter_mask, prefilter_stats
+
+DETECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'detect')
+
+# 貼上模板時的亮度變化：(名稱, 倍率, 偏移)
+VARIANTS = (
+    ('原圖', 1.0, 0),
+    ('0.7 倍亮度', 0.7, 0),
+    ('0.5 倍 + 20', 0.5, 20),
+    ('1.3 倍對比 - 30', 1.3, -30),
+)
+
+def timed(func, *args, repeat=3):
+    func(*args)  # 暖身
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def build_scene(templates, width, height, rng):
+    """單色面板上隨機拼貼模板，面板之間是平滑的隨機背景"""
+    background = rng.integers(0, 255, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    scene = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+    for _ in range(6):
+        left, top = int(rng.integers(0, width * 2 // 3)), int(rng.integers(0, height * 2 // 3))
+        color = [int(value) for value in rng.integers(0, 255, 3)]
+        cv2.rectangle(scene, (left, top), (left + width // 3, top + height // 3), color, cv2.FILLED)
+    for template in templates:
+        template_height, template_width = template.shape[:2]
+        if template_height * 4 < height and template_width * 4 < width:
+            x = int(rng.integers(0, width - template_width))
+            y = int(rng.integers(0, height - template_height))
+            scene[y:y + template_height, x:x + template_width] = template
+    return scene
+
+def build_flat_scene(templates, width, height, rng, icons=3):
+    """整片單色的背景上只貼 icons 個模板，模擬只有幾個按鈕的選單"""
+    color = [int(value) for value in rng.integers(0, 255, 3)]
+    scene = np.full((height, width, 3), color, dtype=np.uint8)
+    for index in rng.permutation(len(templates))[:icons]:
+        template = templates[index]
+        template_height, template_width = template.shape[:2]
+        if template_height * 4 < height and template_width * 4 < width:
+            x = int(rng.integers(0, width - template_width))
+            y = int(rng.integers(0, height - template_height))
+            scene[y:y + template_height, x:x + template_width] = template
+    return scene
+
+SCENES = (
+    ('拼貼', build_scene),
+    ('單色背景', build_flat_scene),
+)
+
+def run_scene(scene_name, build, paths, templates, width, height, rng):
+    """
+    以 build 產生的假畫面比較每個模板的結果與耗時
+
+    Returns:
+        tuple: (結果相同的畫面數, 比較的畫面數)
+    """
+    print(f"\n[{scene_name}]")
+    print(f"{'模板':<28}{'full ms':>10}{'篩選 ms':>10}{'auto ms':>10}{'排除':>9}  "
+          + " / ".join(variant for variant, _, _ in VARIANTS))
+    same = checked = 0
+    total_full = total_prefilter = total_auto = 0.0
+    for path, template in zip(paths, templates):
+        template_height, template_width = template.shape[:2]
+        if template_height >= height // 2 or template_width >= width // 2:
+            continue
+        others = [other for other in templates if not np.array_equal(other, template)]
+        background = build(others, width, height, rng)
+        origin = (width // 3, height // 3)
+        marks = []
+        for name, gain, offset in VARIANTS:
+            scene = background.copy()
+            pasted = cv2.convertScaleAbs(template, alpha=gain, beta=offset)
+            scene[origin[1]:origin[1] + template_height, origin[0]:origin[0] + template_width] = pasted
+
+            result = cv2.matchTemplate(scene, template, cv2.TM_CCOEFF_NORMED)
+            _, full_val, _, _ = cv2.minMaxLoc(result)
+            val, loc = match_prefilter(scene, template, FrameViews(scene))
+            identical = abs(val - full_val) < 1e-4 and abs(result[loc[1], loc[0]] - full_val) < 1e-4
+            same += identical
+            checked += 1
+            marks.append(f"{full_val:.3f}" + ("" if identical else f" 不同 {val:.3f}"))
+
+        # 耗時以原圖的畫面量測
+        scene = background.copy()
+        scene[origin[1]:origin[1] + template_height, origin[0]:origin[0] + template_width] = template
+        _, full_ms = timed(cv2.matchTemplate, scene, template, cv2.TM_CCOEFF_NORMED)
+        _, prefilter_ms = timed(lambda: match_prefilter(scene, template, FrameViews(scene)))
+        _, auto_ms = timed(lambda: match_auto(scene, template, FrameViews(scene)))
+        mask = prefilter_mask(scene, template)
+        pruned = 1 - np.count_nonzero(mask) / mask.size
+        total_full += full_ms
+        total_prefilter += prefilter_ms
+        total_auto += auto_ms
+        print(f"{os.path.basename(path)[:26]:<28}{full_ms:10.1f}{prefilter_ms:10.1f}{auto_ms:10.1f}{pruned:9.2%}  "
+              + " / ".join(marks))
+
+    print(f"{scene_name}：{same}/{checked} 個畫面結果相同，總耗時 full {total_full:.0f} ms / 篩選 {total_prefilter:.0f} ms"
+          f" / auto {total_auto:.0f} ms")
+    return same, checked
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1920
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1080
+    rng = np.random.default_rng(0)
+    paths = sorted(glob.glob(os.path.join(DETECT_DIR, '*.png')))
+    templates = [load_template(path) for path in paths]
+
+    print(f"畫面 {width}x{height}")
+    same = checked = 0
+    for name, build in SCENES:
+        scene_same, scene_checked = run_scene(name, build, paths, templates, width, height, rng)
+        same += scene_same
+        checked += scene_checked
+    print(f"\n共 {same}/{checked} 個畫面結果相同")
+    print(prefilter_stats.summary())
+
+if __name__ == '__main__':
+    main()
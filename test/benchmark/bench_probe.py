@@ -0,0 +1,62 @@
+"""
+比較像素探針 (PixelProbe) 與整張畫面模板匹配確認畫面狀態的耗時。
+
+以 detect/ 中的每張圖片為模板，貼到假畫面上的固定位置，從模板上均勻取 5 個像素作為探針，
+分別量測探針檢查與 match_full 的耗時，並確認探針在正確位置符合、在錯誤位置不符合。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_probe.py [畫面寬] [畫面高]
+"""
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from template_cache import load_template
+from template_matching import match_full
+from pixel_probe import PixelProbe, sample_probes
+
+DETECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'detect')
+
+def timed(func, *args, repeat=5):
+    func(*args)  # 暖身
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1920
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1080
+    rng = np.random.default_rng(0)
+
+    print(f"畫面 {width}x{height}")
+    print(f"{'模板':<28}{'match ms':>10}{'探針 us':>10}{'倍數':>10}  正確位置 / 錯誤位置")
+    ratios = []
+    for path in sorted(glob.glob(os.path.join(DETECT_DIR, '*.png'))):
+        template = load_template(path)
+        template_height, template_width = template.shape[:2]
+        if template_height >= height or template_width >= width:
+            continue
+        scene = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        origin = (width // 3, height // 3)
+        if origin[0] + template_width > width or origin[1] + template_height > height:
+            continue
+        scene[origin[1]:origin[1] + template_height, origin[0]:origin[0] + template_width] = template
+
+        points = [(template_width * i // 6, template_height * (i % 3 + 1) // 4) for i in range(1, 6)]
+        probe = PixelProbe(sample_probes(template, points, tolerance=8))
+        _, match_ms = timed(match_full, scene, template)
+        failed, probe_ms = timed(probe.check, scene, origin, repeat=2000)
+        wrong = probe.check(scene, (origin[0] + 7, origin[1] + 5))
+        ratios.append(match_ms / probe_ms)
+        print(f"{os.path.basename(path)[:26]:<28}{match_ms:10.1f}{probe_ms * 1000:10.1f}{match_ms / probe_ms:10.0f}"
+              f"  {'符合' if failed == 0 else f'{failed} 個不符合'} / {f'{wrong} 個不符合' if wrong else '誤判符合'}")
+
+    print(f"\n探針檢查比模板匹配快 {np.median(ratios):.0f} 倍（中位數）")
+
+if __name__ == '__main__':
+    main()
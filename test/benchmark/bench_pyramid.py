@@ -0,0 +1,78 @@
+"""
+比較完整解析度匹配 (full) 與金字塔匹配 (pyramid) 的速度與準確度。
+
+以 detect/ 中的每張圖片為模板，把它貼到由其他圖片拼成的假畫面上的隨機位置，
+再分別用兩種方式尋找，記錄耗時、找到的位置與匹配值。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_pyramid.py [畫面寬] [畫面高]
+"""
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from template_cache import load_template
+from template_matching import match_full, match_pyramid
+
+DETECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'detect')
+
+def build_scene(templates, width, height, rng):
+    """以其他模板拼貼出背景，模擬實際的遊戲畫面（不含目標模板，避免出現多個正確答案）"""
+    scene = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    for _ in range(40):
+        tile = templates[rng.integers(len(templates))]
+        tile_height, tile_width = tile.shape[:2]
+        if tile_height >= height or tile_width >= width:
+            continue
+        y = rng.integers(0, height - tile_height)
+        x = rng.integers(0, width - tile_width)
+        scene[y:y + tile_height, x:x + tile_width] = tile
+    return scene
+
+def timed(func, *args, repeat=5):
+    func(*args)  # 暖身
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1920
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1080
+    paths = sorted(glob.glob(os.path.join(DETECT_DIR, '*.png')))
+    templates = [load_template(path) for path in paths]
+    rng = np.random.default_rng(0)
+
+    print(f"畫面 {width}x{height}，模板 {len(paths)} 張")
+    print(f"{'模板':<28}{'full ms':>9}{'pyramid ms':>12}{'加速':>7}{'full 值':>9}{'pyramid 值':>12}  位置")
+    total_full = total_pyramid = 0.0
+    same_location = tested = 0
+    for index, (path, template) in enumerate(zip(paths, templates)):
+        template_height, template_width = template.shape[:2]
+        if template_height >= height or template_width >= width:
+            print(f"{os.path.basename(path)[:26]:<28}模板比畫面大，略過")
+            continue
+        scene = build_scene(templates[:index] + templates[index + 1:], width, height, rng)
+        y = rng.integers(0, height - template_height)
+        x = rng.integers(0, width - template_width)
+        scene[y:y + template_height, x:x + template_width] = template
+
+        (full_val, full_loc), full_ms = timed(match_full, scene, template)
+        (pyramid_val, pyramid_loc), pyramid_ms = timed(match_pyramid, scene, template)
+        total_full += full_ms
+        total_pyramid += pyramid_ms
+        same = abs(full_loc[0] - pyramid_loc[0]) <= 1 and abs(full_loc[1] - pyramid_loc[1]) <= 1
+        same_location += same
+        tested += 1
+        print(f"{os.path.basename(path)[:26]:<28}{full_ms:9.1f}{pyramid_ms:12.1f}{full_ms / pyramid_ms:7.1f}"
+              f"{full_val:9.3f}{pyramid_val:12.3f}  {'相同' if same else f'不同 {full_loc} / {pyramid_loc}'}")
+
+    print(f"\n總耗時 full {total_full:.1f} ms, pyramid {total_pyramid:.1f} ms, "
+          f"加速 {total_full / total_pyramid:.1f} 倍, 位置一致 {same_location}/{tested}")
+
+if __name__ == '__main__':
+    main()
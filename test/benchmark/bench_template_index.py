@@ -0,0 +1,72 @@
+"""
+比較直接解碼模板圖片與使用預先編譯的模板索引 (TemplateIndex) 的啟動時間。
+
+把 detect/ 中的圖片複製成指定數量的模板庫（放在暫存資料夾），依序量測：
+全部以 PIL 解碼、第一次建立索引、沒有變更時的增量檢查、修改一張圖片後的增量更新，
+以及新的程序（新的快取）由索引讀取全部模板的時間。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_template_index.py [模板數量]
+"""
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+import template_cache
+from template_cache import TemplateCache, build_template_index, load_template
+
+DETECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'detect')
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    sources = sorted(glob.glob(os.path.join(DETECT_DIR, '*.png')))
+    with tempfile.TemporaryDirectory() as work_dir:
+        directory = os.path.join(work_dir, 'detect')
+        index_path = os.path.join(work_dir, 'cache', 'template_index.bin')
+        os.makedirs(directory)
+        paths = []
+        for i in range(count):
+            path = os.path.join(directory, f"{i:04d}_{os.path.basename(sources[i % len(sources)])}")
+            shutil.copyfile(sources[i % len(sources)], path)
+            paths.append(path)
+
+        decoder = TemplateCache()
+        decoded, decode_ms = timed(lambda: [decoder.get(path) for path in paths])
+        print(f"模板 {count} 張")
+        print(f"{'直接解碼全部模板':<20}{decode_ms:10.1f} ms")
+
+        index, build_ms = timed(build_template_index, directory, index_path)
+        print(f"{'第一次建立索引':<20}{build_ms:10.1f} ms  {os.path.getsize(index_path) / 1024 / 1024:.1f} MB")
+        index, check_ms = timed(build_template_index, directory, index_path)
+        print(f"{'沒有變更的增量檢查':<20}{check_ms:10.1f} ms  {index.summary()}")
+
+        # 修改一張圖片：內容不同，需重新編譯這一張
+        with open(paths[0], 'ab') as f:
+            f.write(b'\0')
+        index, update_ms = timed(build_template_index, directory, index_path)
+        print(f"{'修改一張後增量更新':<20}{update_ms:10.1f} ms  {index.summary()}")
+
+        # 模擬新的程序：新的模板快取，只映射索引檔案
+        template_cache._shared_cache = None
+        _, open_ms = timed(build_template_index, directory, index_path)
+        loaded, load_ms = timed(lambda: [load_template(path) for path in paths])
+        print(f"{'新程序開啟索引':<20}{open_ms:10.1f} ms")
+        print(f"{'新程序讀取全部模板':<20}{load_ms:10.1f} ms  加速 {decode_ms / (open_ms + load_ms):.0f} 倍")
+        same = all(np.array_equal(a, b) for a, b in zip(loaded[1:], decoded[1:]))
+        print(f"結果與直接解碼{'相同' if same else '不同'}")
+        print(template_cache.get_template_cache().summary())
+        template_cache._shared_cache = None  # 釋放映射，暫存資料夾才能刪除
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+量測分塊平行匹配 (tiled) 在 1 到 N 個執行緒下的速度，並確認結果與單次 matchTemplate 相同。
+
+假畫面由 detect/ 中的圖片拼貼而成，預設為三台 4K 螢幕並排 (11520x2160)。
+
+執行方式（於專案根目錄）：
+    python test/benchmark/bench_tiled.py [畫面寬] [畫面高] [最大執行緒數]
+"""
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'modules'))
+
+from template_cache import load_template
+from template_matching import match_full, match_tiled, set_tile_workers
+
+DETECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'detect')
+
+def build_scene(templates, width, height, rng):
+    """以模板拼貼出假畫面"""
+    scene = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    for _ in range(width * height // 40000):
+        tile = templates[rng.integers(len(templates))]
+        tile_height, tile_width = tile.shape[:2]
+        if tile_height >= height or tile_width >= width:
+            continue
+        y = rng.integers(0, height - tile_height)
+        x = rng.integers(0, width - tile_width)
+        scene[y:y + tile_height, x:x + tile_width] = tile
+    return scene
+
+def timed(func, *args, repeat=3):
+    func(*args)  # 暖身
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 11520
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 2160
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    target = os.path.join(DETECT_DIR, 'first.png')
+    paths = sorted(glob.glob(os.path.join(DETECT_DIR, '*.png')))
+    # 背景不放目標模板，確保畫面中只有一個正確答案
+    templates = [load_template(path) for path in paths if os.path.basename(path) != 'first.png']
+    rng = np.random.default_rng(0)
+    scene = build_scene(templates, width, height, rng)
+    template = load_template(target)
+    y, x = height // 3, width * 2 // 3
+    scene[y:y + template.shape[0], x:x + template.shape[1]] = template
+
+    print(f"畫面 {width}x{height}，模板 first.png {template.shape[1]}x{template.shape[0]}，CPU 核心 {os.cpu_count()}")
+    (full_val, full_loc), full_ms = timed(match_full, scene, template)
+    print(f"{'單次 matchTemplate':<20}{full_ms:10.1f} ms  位置 {full_loc} 匹配值 {full_val:.4f}")
+
+    for workers in range(1, max_workers + 1):
+        set_tile_workers(workers)
+        (tiled_val, tiled_loc), tiled_ms = timed(match_tiled, scene, template)
+        same = tiled_loc == full_loc and abs(tiled_val - full_val) < 1e-4
+        print(f"{f'tiled {workers} 執行緒':<20}{tiled_ms:10.1f} ms  加速 {full_ms / tiled_ms:4.2f} 倍  "
+              f"{'結果相同' if same else f'結果不同 {tiled_loc} {tiled_val:.4f}'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+程序內的假 ADB server，實作 ADB server socket 協定中本工具會用到的部分，
+讓 adb_client、常駐 shell 與截圖流程在沒有設備的情況下也能測試與量測效能。
+
+支援：host:version、host:devices、host:connect、host:kill、host:transport(-any)，
+以及設備上的 exec:/shell: 服務（screencap、screencap -p、screenrecord、sh 互動模式）。
+"""
+import re
+import socket
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+
+class FakeADBServer:
+    def __init__(self, serial='emulator-5554', width=1080, height=2400, sdk_version=30, video_path=None):
+        """
+        Args:
+            serial (str): 假設備的序號
+            width, height (int): 假畫面的解析度
+            sdk_version (int): 回報的 Android SDK 版本（決定 screencap 標頭長度）
+            video_path (str): screenrecord 要送出的影像檔，None 表示不支援
+        """
+        self.serial = serial
+        self.sdk_version = sdk_version
+        self.video_path = video_path
+        self.taps = []  # 收到的點擊座標
+        self.request_count = 0
+        self.set_frame(np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8))
+        self._server = None
+        self._thread = None
+
+    def set_frame(self, frame):
+        """設定假設備目前的畫面 (BGR)"""
+        height, width = frame.shape[:2]
+        rgba = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+        header = struct.pack('<III', width, height, 1)
+        if self.sdk_version >= 28:
+            header += struct.pack('<I', 0)
+        self._raw_frame = header + rgba.tobytes()
+        self._png_frame = cv2.imencode('.png', frame)[1].tobytes()
+
+    @property
+    def port(self):
+        return self._server.getsockname()[1]
+
+    def start(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(64)
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    @staticmethod
+    def _recv_exactly(connection, size):
+        data = b''
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def _read_request(self, connection):
+        length = int(self._recv_exactly(connection, 4), 16)
+        self.request_count += 1
+        return self._recv_exactly(connection, length).decode('utf-8')
+
+    @staticmethod
+    def _reply(connection, text):
+        payload = text.encode('utf-8')
+        connection.sendall(b'OKAY' + f"{len(payload):04x}".encode('ascii') + payload)
+
+    @staticmethod
+    def _fail(connection, message):
+        payload = message.encode('utf-8')
+        connection.sendall(b'FAIL' + f"{len(payload):04x}".encode('ascii') + payload)
+
+    def _handle(self, connection):
+        with connection:
+            try:
+                request = self._read_request(connection)
+                if request == 'host:version':
+                    self._reply(connection, '0029')
+                elif request == 'host:devices':
+                    self._reply(connection, f"{self.serial}\tdevice\n")
+                elif request.startswith('host:connect:'):
+                    self._reply(connection, f"already connected to {request[len('host:connect:'):]}")
+                elif request.startswith('host:disconnect:'):
+                    self._reply(connection, "disconnected")
+                elif request == 'host:kill':
+                    connection.sendall(b'OKAY')
+                elif request in ('host:transport-any', f'host:transport:{self.serial}'):
+                    connection.sendall(b'OKAY')
+                    self._handle_service(connection, self._read_request(connection))
+                elif request.startswith('host:transport:'):
+                    self._fail(connection, f"device '{request[len('host:transport:'):]}' not found")
+                else:
+                    self._fail(connection, f"unknown request {request}")
+            except (ConnectionError, OSError):
+                pass
+
+    def _handle_service(self, connection, service):
+        kind, _, command = service.partition(':')
+        if kind not in ('exec', 'shell'):
+            self._fail(connection, f"unknown service {service}")
+            return
+        connection.sendall(b'OKAY')
+        if command == 'sh':
+            self._interactive_shell(connection)
+        elif command.startswith('screenrecord'):
+            self._send_video(connection)
+        else:
+            connection.sendall(self._run(command)[1])
+
+    def _send_video(self, connection):
+        if self.video_path is None:
+            return
+        with open(self.video_path, 'rb') as f:
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    return
+                connection.sendall(chunk)
+
+    def _run(self, command):
+        """模擬執行一行 shell 指令，返回 (結束碼, 輸出)"""
+        command = command.replace('2>&1', '').strip()
+        output = b''
+        for part in command.split('&&'):
+            part = part.strip()
+            if part == 'screencap':
+                output += self._raw_frame
+            elif part == 'screencap -p':
+                output += self._png_frame
+            elif part == 'getprop ro.build.version.sdk':
+                output += f"{self.sdk_version}\n".encode('ascii')
+            elif match := re.fullmatch(r'input tap (-?\d+) (-?\d+)', part):
+                self.taps.append((int(match.group(1)), int(match.group(2))))
+            elif match := re.fullmatch(r'sleep ([\d.]+)', part):
+                time.sleep(float(match.group(1)))
+            elif part == '':
+                continue
+            elif part.startswith('echo '):
+                output += part[5:].encode('utf-8') + b'\n'
+            else:
+                return 127, output + f"sh: {part}: not found\n".encode('utf-8')
+        return 0, output
+
+    def _interactive_shell(self, connection):
+        reader = connection.makefile('rb')
+        status = 0
+        while True:
+            line = reader.readline()
+            if not line:
+                return
+            line = line.decode('utf-8').strip()
+            if line == 'exit':
+                return
+            if line.startswith('echo ') and line.endswith('$?'):
+                connection.sendall(f"{line[5:-2]}{status}\n".encode('utf-8'))
+                continue
+            status, output = self._run(line)
+            connection.sendall(output)